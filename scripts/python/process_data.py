@@ -5,6 +5,7 @@ This script only handles data loading, cleaning, and reshaping.
 All analysis is done in R.
 """
 
+import argparse
 import sys
 from pathlib import Path
 import pandas as pd
@@ -13,7 +14,11 @@ import pandas as pd
 PROJECT_ROOT = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(PROJECT_ROOT / "src"))
 
-from medevac_interrater.data_loader import load_clean_data
+from medevac_interrater.cache import pyarrow_available
+from medevac_interrater.data_loader import load_long_data
+from medevac_interrater.handoff import HANDOFF_FILENAME, write_handoff
+from medevac_interrater.instrumentation import format_summary, span, tracing
+from medevac_interrater.physicians import PhysicianDimension
 
 
 def main():
@@ -31,9 +36,8 @@ def main():
     
     # Load and clean data
     print("📥 Loading and cleaning data...")
-    raw_df, long_df = load_clean_data(data_dir)
+    long_df = load_long_data(data_dir, cache_dir=data_dir / "processed" / ".cache")
     
-    print(f"   ✓ Loaded {len(raw_df)} physicians")
     print(f"   ✓ Reshaped to {len(long_df)} physician-vignette pairs")
     print(f"   ✓ {len(long_df['physician_id'].unique())} unique physicians")
     print(f"   ✓ {len(long_df['question'].unique())} unique questions")
@@ -41,8 +45,14 @@ def main():
     
     # Save processed data
     output_file = output_dir / "survey_data_processed.csv"
-    long_df.to_csv(output_file, index=False)
+    with span("write_csv", rows=len(long_df), path=str(output_file)):
+        long_df.to_csv(output_file, index=False)
     print(f"💾 Saved processed data to: {output_file}")
+    if pyarrow_available():
+        handoff_file = write_handoff(
+            long_df, output_dir / HANDOFF_FILENAME, PhysicianDimension.from_files(data_dir)
+        )
+        print(f"💾 Saved Arrow hand-off to: {handoff_file}")
     print()
     
     # Summary
@@ -63,6 +73,21 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--trace", type=Path, metavar="PATH",
+                        help="Write a JSON trace of per-stage timings")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="Also trace peak Python allocations per stage (slower)")
+    parser.add_argument("--timings", action="store_true",
+                        help="Print a per-stage timing summary")
+    args = parser.parse_args()
+    
+    if args.trace is None and not args.timings and not args.trace_memory:
+        main()
+    else:
+        with tracing(args.trace, trace_memory=args.trace_memory) as trace:
+            main()
+        if args.timings:
+            print(format_summary(trace))
 
 
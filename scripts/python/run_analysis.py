@@ -1,29 +1,120 @@
 #!/usr/bin/env python3
 """
 Main analysis script for medevac interrater reliability study.
+
+Usage:
+    run_analysis.py                         # analyze data/survey_results.csv
+    run_analysis.py --batch "exports/**/*.csv" [--output DIR] [--jobs N]
+    run_analysis.py --timings [--trace trace.json] [--trace-memory]
 """
 
+import argparse
 import sys
+import time
+from contextlib import nullcontext
 from pathlib import Path
 import pandas as pd
 import numpy as np
 
 # Add src to path
-PROJECT_ROOT = Path(__file__).parent.parent
+PROJECT_ROOT = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(PROJECT_ROOT / "src"))
 
-from medevac_interrater.data_loader import load_clean_data
+from medevac_interrater.batch import SUMMARY_FILENAME, run_batch
+from medevac_interrater.data_loader import load_long_data
+from medevac_interrater.instrumentation import format_summary, span, tracing
 from medevac_interrater.analysis import (
     calculate_percentage_agreement,
-    calculate_question_level_metrics,
-    calculate_agreement_by_class,
+    calculate_agreement_metrics,
     calculate_confidence_analysis,
+    calculate_fleiss_kappa_batch,
 )
 
 
+def run_batch_mode(source: str, output_dir: Path, n_jobs: int):
+    """Analyze every export matched by ``source`` and report progress."""
+    
+    print("=" * 80)
+    print("MEDEVAC INTERRATER RELIABILITY ANALYSIS - BATCH")
+    print("=" * 80)
+    print()
+    
+    start = time.perf_counter()
+    
+    def report(done, total, row):
+        status = "✓" if row["status"] == "ok" else "✗"
+        detail = f"{row['seconds']:.2f}s" if row["status"] == "ok" else row["error"]
+        print(f"   [{done}/{total}] {status} {row['survey']} ({detail})")
+    
+    summary = run_batch(
+        source,
+        output_dir,
+        n_jobs=n_jobs,
+        cache_dir=PROJECT_ROOT / "data" / "processed" / ".cache",
+        progress=report,
+    )
+    elapsed = time.perf_counter() - start
+    
+    if summary.empty:
+        print(f"No exports matched {source}")
+        return
+    
+    print()
+    print(summary.drop(columns=["path", "output_dir", "error"]).to_string(index=False))
+    print()
+    n_failed = int((summary["status"] != "ok").sum())
+    print(f"Analyzed {len(summary) - n_failed}/{len(summary)} exports in {elapsed:.2f}s "
+          f"({summary['seconds'].sum():.2f}s of worker time)")
+    print(f"💾 Summary saved to: {output_dir / SUMMARY_FILENAME}")
+    if n_failed:
+        sys.exit(1)
+
+
 def main():
     """Run the complete interrater reliability analysis."""
     
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--batch", metavar="SOURCE",
+                        help="Directory or glob of survey exports to analyze")
+    parser.add_argument("--output", type=Path, default=PROJECT_ROOT / "output",
+                        help="Output directory (default: output/)")
+    parser.add_argument("--jobs", type=int, default=None,
+                        help="Worker processes for batch mode (default: all CPUs)")
+    parser.add_argument("--trace", type=Path, metavar="PATH",
+                        help="Write a JSON trace of per-stage timings")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="Also trace peak Python allocations per stage (slower)")
+    parser.add_argument("--timings", action="store_true",
+                        help="Print a per-stage timing summary")
+    args = parser.parse_args()
+    
+    traced_run = args.trace is not None or args.timings or args.trace_memory
+    with (tracing(args.trace, trace_memory=args.trace_memory) if traced_run
+          else nullcontext()) as trace:
+        if args.batch is not None:
+            run_batch_mode(args.batch, args.output, args.jobs)
+        else:
+            run_single_mode(args.output)
+    
+    if args.timings:
+        print("=" * 80)
+        print("TIMINGS")
+        print("=" * 80)
+        print(format_summary(trace))
+        print()
+    if args.trace is not None:
+        print(f"💾 Trace saved to: {args.trace}")
+
+
+def save_csv(df, path):
+    """Write a result table, traced as its own stage."""
+    with span("write_csv", rows=len(df), path=str(path)):
+        df.to_csv(path, index=False)
+
+
+def run_single_mode(output_dir: Path):
+    """Analyze data/survey_results.csv and write the result tables."""
+    
     print("=" * 80)
     print("MEDEVAC INTERRATER RELIABILITY ANALYSIS")
     print("=" * 80)
@@ -31,21 +122,19 @@ def main():
     
     # Setup paths
     data_dir = PROJECT_ROOT / "data"
-    output_dir = PROJECT_ROOT / "output"
-    output_dir.mkdir(exist_ok=True)
+    output_dir.mkdir(parents=True, exist_ok=True)
     
     # Load and clean data
     print("📥 Loading and cleaning data...")
-    raw_df, long_df = load_clean_data(data_dir)
+    long_df = load_long_data(data_dir, cache_dir=data_dir / "processed" / ".cache")
     
-    print(f"   ✓ Loaded {len(raw_df)} physicians")
     print(f"   ✓ Reshaped to {len(long_df)} physician-vignette pairs")
     print(f"   ✓ {len(long_df['physician_id'].unique())} unique physicians")
     print(f"   ✓ {len(long_df['question'].unique())} unique questions")
     print()
     
     # Save cleaned data
-    long_df.to_csv(output_dir / "cleaned_data_long.csv", index=False)
+    save_csv(long_df, output_dir / "cleaned_data_long.csv")
     print(f"💾 Saved cleaned data to: {output_dir / 'cleaned_data_long.csv'}")
     print()
     
@@ -61,8 +150,8 @@ def main():
     print("=" * 80)
     print("QUESTION-LEVEL METRICS")
     print("=" * 80)
-    question_metrics = calculate_question_level_metrics(long_df)
-    question_metrics.to_csv(output_dir / "question_level_metrics.csv", index=False)
+    question_metrics, class_metrics = calculate_agreement_metrics(long_df)
+    save_csv(question_metrics, output_dir / "question_level_metrics.csv")
     print(question_metrics.to_string(index=False))
     print()
     print(f"💾 Saved to: {output_dir / 'question_level_metrics.csv'}")
@@ -72,8 +161,7 @@ def main():
     print("=" * 80)
     print("AGREEMENT BY VIGNETTE CLASS")
     print("=" * 80)
-    class_metrics = calculate_agreement_by_class(long_df)
-    class_metrics.to_csv(output_dir / "class_level_metrics.csv", index=False)
+    save_csv(class_metrics, output_dir / "class_level_metrics.csv")
     print(class_metrics.to_string(index=False))
     print()
     print(f"💾 Saved to: {output_dir / 'class_level_metrics.csv'}")
@@ -87,11 +175,11 @@ def main():
     
     print("\nConfidence by Decision:")
     print(conf_by_decision.to_string(index=False))
-    conf_by_decision.to_csv(output_dir / "confidence_by_decision.csv", index=False)
+    save_csv(conf_by_decision, output_dir / "confidence_by_decision.csv")
     
     print("\nConfidence by Vignette Class:")
     print(conf_by_class.to_string(index=False))
-    conf_by_class.to_csv(output_dir / "confidence_by_class.csv", index=False)
+    save_csv(conf_by_class, output_dir / "confidence_by_class.csv")
     print()
     print(f"💾 Saved to: {output_dir / 'confidence_by_decision.csv'}")
     print(f"💾 Saved to: {output_dir / 'confidence_by_class.csv'}")
@@ -102,7 +190,8 @@ def main():
     print("SUMMARY STATISTICS")
     print("=" * 80)
     print(f"Mean Percentage Agreement: {question_metrics['percentage_agreement'].mean():.3f}")
-    print(f"Mean Fleiss' Kappa: {question_metrics['fleiss_kappa'].mean():.3f}")
+    _, overall_kappa, _ = calculate_fleiss_kappa_batch(long_df)
+    print(f"Overall Fleiss' Kappa: {overall_kappa:.3f}")
     print(f"Mean Confidence: {long_df['confidence'].mean():.2f}")
     print(f"SD Confidence: {long_df['confidence'].std():.2f}")
     print()
@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+"""
+Benchmark the loader and agreement metrics on synthetic surveys.
+
+Equivalent to ``medevac-irr bench`` with the baseline in benchmarks/.
+
+Usage:
+    run_benchmarks.py                       # run and compare with the baseline
+    run_benchmarks.py --record              # run and save as the new baseline
+    run_benchmarks.py --tiers small medium large --repeat 3
+"""
+
+import sys
+from pathlib import Path
+
+# Add src to path
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / "src"))
+
+from medevac_interrater.cli import main
+
+BASELINE_PATH = PROJECT_ROOT / "benchmarks" / "baseline.json"
+
+
+if __name__ == "__main__":
+    sys.exit(main(["bench", "--baseline", str(BASELINE_PATH), *sys.argv[1:]]))
@@ -0,0 +1,7 @@
+"""Allow ``python -m medevac_interrater``."""
+
+import sys
+
+from .cli import main
+
+sys.exit(main())
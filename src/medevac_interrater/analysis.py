@@ -4,15 +4,186 @@ Interrater reliability analysis module.
 
 import pandas as pd
 import numpy as np
-from typing import Dict, Tuple, Optional
-from scipy import stats
+from typing import Callable, Dict, Tuple, Optional, Sequence
 from itertools import combinations
 
+from .instrumentation import traced
 
+# Decisions in order of escalating care, used where an ordering is needed
+DECISION_ORDER = ("Remain", "Commercial", "Medevac")
+
+
+def _deduplicate_ratings(df: pd.DataFrame) -> pd.DataFrame:
+    """Drop missing decisions and keep one (last) response per physician and question."""
+    df = df.dropna(subset=["decision"])
+    return df.drop_duplicates(subset=["physician_id", "question"], keep="last")
+
+
+def _encode_decisions(
+    decisions: pd.Series, categories: Optional[Sequence[str]] = None
+) -> Tuple[np.ndarray, pd.Index]:
+    """Map decisions to integer codes, in sorted order unless categories are given."""
+    if isinstance(decisions.dtype, pd.CategoricalDtype):
+        # Encode the distinct decisions only and broadcast through the codes
+        codes = decisions.cat.codes.to_numpy()
+        present = np.unique(codes[codes >= 0])
+        labels = pd.Series(decisions.cat.categories[present], dtype=object)
+        present_codes, categories = _encode_decisions(labels, categories)
+        lookup = np.full(len(decisions.cat.categories) + 1, -1, dtype=np.intp)
+        lookup[present] = present_codes
+        return lookup[codes], categories
+    
+    if categories is None:
+        return pd.factorize(decisions, sort=True)
+    
+    categories = pd.Index(categories)
+    codes = categories.get_indexer(decisions)
+    if (codes < 0).any():
+        unknown = sorted(set(decisions[codes < 0]))
+        raise ValueError(f"Decisions not in categories: {unknown}")
+    return codes, categories
+
+
+@traced
+def build_count_matrix(
+    df: pd.DataFrame, categories: Optional[Sequence[str]] = None
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Build the subject × category count matrix for a long-format dataframe.
+    
+    Each row of the matrix is one question (subject) and each column one
+    decision category; cell (i, j) holds the number of physicians who chose
+    category j on question i. Raters who skipped a question simply do not
+    contribute to that row. If a physician answered the same question more
+    than once, the last response is kept.
+    
+    Args:
+        df: Long-format dataframe with columns: physician_id, question, decision
+        categories: Optional fixed category order. Defaults to the sorted
+            unique decisions present in ``df``.
+        
+    Returns:
+        Tuple of (counts, questions, categories) where counts is an integer
+        array of shape (n_questions, n_categories)
+    """
+    df = _deduplicate_ratings(df)
+    q_codes, questions = pd.factorize(df["question"], sort=True)
+    c_codes, categories = _encode_decisions(df["decision"], categories)
+    
+    n_questions = len(questions)
+    n_categories = len(categories)
+    counts = np.bincount(
+        q_codes * n_categories + c_codes, minlength=n_questions * n_categories
+    ).reshape(n_questions, n_categories)
+    
+    return counts, np.asarray(questions), np.asarray(categories)
+
+
+@traced
+def build_rating_matrix(
+    df: pd.DataFrame, categories: Optional[Sequence[str]] = None
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Build the physician × question matrix of decision codes.
+    
+    Args:
+        df: Long-format dataframe with columns: physician_id, question, decision
+        categories: Optional fixed category order. Defaults to the sorted
+            unique decisions present in ``df``.
+        
+    Returns:
+        Tuple of (codes, physicians, questions, categories) where codes is an
+        integer array of shape (n_physicians, n_questions) holding the
+        category index of each decision, or -1 where the question was skipped
+    """
+    df = _deduplicate_ratings(df)
+    p_codes, physicians = pd.factorize(df["physician_id"], sort=True)
+    q_codes, questions = pd.factorize(df["question"], sort=True)
+    c_codes, categories = _encode_decisions(df["decision"], categories)
+    
+    codes = np.full((len(physicians), len(questions)), -1, dtype=np.int64)
+    codes[p_codes, q_codes] = c_codes
+    
+    return codes, np.asarray(physicians), np.asarray(questions), np.asarray(categories)
+
+
+def one_hot_ratings(codes: np.ndarray, n_categories: int) -> np.ndarray:
+    """
+    Expand a rating matrix into a one-hot tensor.
+    
+    Args:
+        codes: Physician × question matrix from :func:`build_rating_matrix`
+        n_categories: Number of decision categories
+        
+    Returns:
+        Array of shape (n_physicians, n_questions, n_categories); summing over
+        the physician axis gives the count matrix
+    """
+    return (codes[..., None] == np.arange(n_categories)).astype(np.float64)
+
+
+def _pairwise_agreement_terms(
+    counts: np.ndarray, self_pairs: Optional[np.ndarray] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Count agreeing pairs and total pairs per subject from a count matrix.
+    
+    Uses the closed form sum_j n_ij (n_ij - 1) / n_i (n_i - 1), so no rater
+    pairs are enumerated.
+    
+    Args:
+        counts: Count array of shape (..., n_subjects, n_categories)
+        self_pairs: Optional number of ordered pairs per subject formed
+            between copies of the same rater (as in a rater resample). These
+            always agree and are excluded from both counts.
+        
+    Returns:
+        Tuple of (agreeing_pairs, total_pairs), one entry per subject
+    """
+    counts = np.asarray(counts, dtype=np.float64)
+    n_i = counts.sum(axis=-1)
+    agreeing_pairs = (counts * (counts - 1)).sum(axis=-1)
+    total_pairs = n_i * (n_i - 1)
+    if self_pairs is not None:
+        agreeing_pairs = agreeing_pairs - self_pairs
+        total_pairs = total_pairs - self_pairs
+    return agreeing_pairs / 2, total_pairs / 2
+
+
+@traced
+def calculate_percentage_agreement_by_question(df: pd.DataFrame) -> pd.Series:
+    """
+    Calculate percentage agreement for every question in one pass.
+    
+    Args:
+        df: Long-format dataframe with columns: physician_id, question, decision
+        
+    Returns:
+        Series of percentage agreement (0-1) indexed by question. Questions
+        with fewer than two raters are NaN.
+    """
+    counts, questions, _ = build_count_matrix(df)
+    agreeing_pairs, total_pairs = _pairwise_agreement_terms(counts)
+    
+    with np.errstate(invalid="ignore", divide="ignore"):
+        agreement = np.where(total_pairs > 0, agreeing_pairs / total_pairs, np.nan)
+    
+    return pd.Series(
+        agreement,
+        index=pd.Index(questions, name="question"),
+        name="percentage_agreement",
+    )
+
+
+@traced
 def calculate_percentage_agreement(df: pd.DataFrame, question: Optional[int] = None) -> float:
     """
     Calculate percentage agreement for a given question or overall.
     
+    Agreement is the proportion of physician pairs, pooled over questions,
+    who made the same decision. Only pairs where both physicians answered
+    the question are counted.
+    
     Args:
         df: Long-format dataframe with columns: physician_id, question, decision
         question: Question number (1-20). If None, calculates overall agreement.
@@ -26,34 +197,16 @@ def calculate_percentage_agreement(df: pd.DataFrame, question: Optional[int] = N
     if len(df) == 0:
         return np.nan
     
-    # Count total pairs
-    physicians = df["physician_id"].unique()
-    n_physicians = len(physicians)
-    
-    if n_physicians < 2:
-        return np.nan
-    
-    # Count agreements
-    agreements = 0
-    total_pairs = 0
-    
-    for q in df["question"].unique():
-        q_data = df[df["question"] == q]
-        decisions = q_data.set_index("physician_id")["decision"].to_dict()
-        
-        # Compare all pairs
-        for p1, p2 in combinations(physicians, 2):
-            if p1 in decisions and p2 in decisions:
-                total_pairs += 1
-                if decisions[p1] == decisions[p2]:
-                    agreements += 1
+    counts, _, _ = build_count_matrix(df)
+    agreeing_pairs, total_pairs = _pairwise_agreement_terms(counts)
     
-    if total_pairs == 0:
+    if total_pairs.sum() == 0:
         return np.nan
     
-    return agreements / total_pairs
+    return agreeing_pairs.sum() / total_pairs.sum()
 
 
+@traced
 def calculate_cohens_kappa(df: pd.DataFrame, question: int) -> Tuple[float, float]:
     """
     Calculate Cohen's Kappa for a single question.
@@ -70,15 +223,6 @@ def calculate_cohens_kappa(df: pd.DataFrame, question: int) -> Tuple[float, floa
     if len(q_data) < 2:
         return np.nan, np.nan
     
-    # Reshape to matrix format (physicians × decisions)
-    pivot = q_data.pivot_table(
-        index="physician_id",
-        columns="decision",
-        values="decision",
-        aggfunc="count",
-        fill_value=0
-    )
-    
     # For Cohen's Kappa, we need 2 raters
     # If we have more, we'll calculate pairwise kappas and average
     physicians = q_data["physician_id"].unique()
@@ -140,150 +284,553 @@ def calculate_cohens_kappa(df: pd.DataFrame, question: int) -> Tuple[float, floa
         return avg_kappa, np.nan
 
 
-def calculate_fleiss_kappa(df: pd.DataFrame, question: int) -> float:
+def _group_sum(values: np.ndarray, groups: np.ndarray, n_groups: int) -> np.ndarray:
     """
-    Calculate Fleiss' Kappa for multiple raters on a single question.
+    Sum values over the last (subject) axis within each group.
     
     Args:
-        df: Long-format dataframe with columns: physician_id, question, decision
-        question: Question number (1-20)
+        values: Array whose last axis indexes subjects
+        groups: Integer group code per subject
+        n_groups: Number of groups
         
     Returns:
-        Fleiss' Kappa value
+        Array with the last axis replaced by one sum per group
     """
-    q_data = df[df["question"] == question].copy()
+    out = np.zeros(values.shape[:-1] + (n_groups,))
+    if len(groups) == 0:
+        return out
+    order = np.argsort(groups, kind="stable")
+    present, starts = np.unique(groups[order], return_index=True)
+    out[..., present] = np.add.reduceat(values[..., order], starts, axis=-1)
+    return out
+
+
+def fleiss_kappa_from_counts(
+    counts: np.ndarray,
+    groups: Optional[np.ndarray] = None,
+    weights: Optional[np.ndarray] = None,
+    self_pairs: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Calculate Fleiss' Kappa from a subject × category count matrix.
     
-    if len(q_data) < 2:
-        return np.nan
+    Subjects (questions) are pooled within each group. With a complete design
+    this is the statistic reported by R's ``irr::kappam.fleiss``; subjects
+    rated by a varying number of raters use the per-subject agreement
+    ``sum_j n_ij (n_ij - 1) / n_i (n_i - 1)``. Subjects with fewer than two
+    ratings are ignored.
     
-    # Get all unique decisions
-    decisions = sorted(q_data["decision"].unique())
-    n_categories = len(decisions)
-    n_raters = len(q_data["physician_id"].unique())
+    Leading axes of ``counts`` are treated as a batch (e.g. bootstrap
+    replicates), so many count matrices can be evaluated at once.
     
-    if n_categories < 2 or n_raters < 2:
-        return np.nan
+    Args:
+        counts: Count array of shape (..., n_subjects, n_categories)
+        groups: Optional integer group code per subject. If None, all
+            subjects form a single group.
+        weights: Optional subject weights of shape (..., n_subjects), e.g.
+            how often each subject was drawn in a resample
+        self_pairs: Optional ordered pairs per subject between copies of the
+            same rater, excluded from the observed agreement
+        
+    Returns:
+        Array of shape (..., n_groups) with one kappa per group (NaN where
+        chance agreement is 1 or the group has no usable subjects)
+    """
+    counts = np.asarray(counts, dtype=np.float64)
+    n_subjects = counts.shape[-2]
+    if groups is None:
+        groups = np.zeros(n_subjects, dtype=np.intp)
+    groups = np.asarray(groups)
+    n_groups = int(groups.max()) + 1 if len(groups) else 0
+    
+    agreeing_pairs, total_pairs = _pairwise_agreement_terms(counts, self_pairs)
+    usable = total_pairs > 0
+    if weights is None:
+        weights = usable.astype(np.float64)
+    else:
+        weights = np.where(usable, weights, 0.0)
     
-    # Create rating matrix: each row is a rater, each column is a category
-    rating_matrix = np.zeros((n_raters, n_categories))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # P_i: proportion of agreeing rater pairs for subject i
+        P_i = np.where(usable, agreeing_pairs / total_pairs, 0.0)
+        
+        # P_bar: (weighted) mean of P_i within each group
+        group_weight = _group_sum(weights, groups, n_groups)
+        P_bar = _group_sum(weights * P_i, groups, n_groups) / group_weight
+        
+        # P_j: proportion of all assignments to category j within each group
+        category_totals = _group_sum(
+            np.swapaxes(counts * weights[..., None], -1, -2), groups, n_groups
+        )
+        P_j = category_totals / category_totals.sum(axis=-2, keepdims=True)
+        
+        # P_e: expected agreement by chance
+        P_e = (P_j**2).sum(axis=-2)
+        
+        kappa = (P_bar - P_e) / (1 - P_e)
     
-    for idx, (_, row) in enumerate(q_data.iterrows()):
-        decision = row["decision"]
-        cat_idx = decisions.index(decision)
-        rating_matrix[idx, cat_idx] = 1
+    # Perfect chance agreement leaves kappa undefined
+    return np.where(np.isclose(P_e, 1) | (group_weight == 0), np.nan, kappa)
+
+
+def question_class_codes(
+    df: pd.DataFrame, questions: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Look up the vignette class of each question as integer codes.
     
-    # Calculate Fleiss' Kappa
-    # P_j: proportion of assignments to category j
-    P_j = np.sum(rating_matrix, axis=0) / n_raters
+    Args:
+        df: Long-format dataframe with columns: question, vignette_class
+        questions: Question numbers, e.g. from :func:`build_count_matrix`
+        
+    Returns:
+        Tuple of (class_codes, classes) with one code per question
+    """
+    question_class = df.drop_duplicates(subset="question").set_index("question")[
+        "vignette_class"
+    ]
+    class_codes, classes = pd.factorize(question_class.loc[questions], sort=True)
+    return class_codes, np.asarray(classes)
+
+
+@traced
+def calculate_fleiss_kappa_batch(
+    df: pd.DataFrame,
+) -> Tuple[pd.Series, float, pd.Series]:
+    """
+    Calculate Fleiss' Kappa per question, overall and per vignette class.
     
-    # P_i: proportion of agreement for subject i
-    P_i = np.sum(rating_matrix ** 2, axis=1) / (n_categories - 1)
+    All three are derived from a single question × decision count matrix.
+    Note that a single question is a single subject, for which Fleiss' Kappa
+    reduces to -1 / (n - 1) unless all raters agree (matching
+    ``irr::kappam.fleiss`` on a one-row matrix); the pooled overall and
+    per-class values are the informative ones.
     
-    # P_bar: mean of P_i
-    P_bar = np.mean(P_i)
+    Args:
+        df: Long-format dataframe with columns: physician_id, question,
+            decision, vignette_class
+        
+    Returns:
+        Tuple of (kappa_by_question, overall_kappa, kappa_by_class)
+    """
+    counts, questions, _ = build_count_matrix(df)
+    class_codes, classes = question_class_codes(df, questions)
+    
+    return _by_question_overall_class(
+        fleiss_kappa_from_counts,
+        counts,
+        questions,
+        class_codes,
+        classes,
+        "fleiss_kappa",
+    )
+
+
+def _by_question_overall_class(
+    statistic: Callable[..., np.ndarray],
+    counts: np.ndarray,
+    questions: np.ndarray,
+    class_codes: np.ndarray,
+    classes: np.ndarray,
+    name: str,
+) -> Tuple[pd.Series, float, pd.Series]:
+    """
+    Evaluate a grouped count-matrix statistic per question, overall and per class.
     
-    # P_e: expected agreement by chance
-    P_e = np.sum(P_j ** 2)
+    Args:
+        statistic: Function of (counts, groups) returning one value per group
+        counts: Question × category count matrix
+        questions: Question number per row of ``counts``
+        class_codes: Vignette class code per question
+        classes: Vignette class labels
+        name: Name given to the returned series
+        
+    Returns:
+        Tuple of (by_question, overall, by_class)
+    """
+    by_question = pd.Series(
+        statistic(counts, np.arange(len(questions))),
+        index=pd.Index(questions, name="question"),
+        name=name,
+    )
     
-    # Fleiss' Kappa
-    if P_e == 1:
-        return np.nan  # Perfect chance agreement
+    overall = statistic(counts, None)
+    overall = overall[0] if len(overall) else np.nan
     
-    kappa = (P_bar - P_e) / (1 - P_e)
+    by_class = pd.Series(
+        statistic(counts, class_codes),
+        index=pd.Index(classes, name="vignette_class"),
+        name=name,
+    )
     
-    return kappa
+    return by_question, overall, by_class
 
 
-def calculate_agreement_by_class(df: pd.DataFrame) -> pd.DataFrame:
+@traced
+def calculate_fleiss_kappa(df: pd.DataFrame, question: int) -> float:
     """
-    Calculate agreement metrics by vignette class.
+    Calculate Fleiss' Kappa for multiple raters on a single question.
     
     Args:
-        df: Long-format dataframe
+        df: Long-format dataframe with columns: physician_id, question, decision
+        question: Question number (1-20)
         
     Returns:
-        DataFrame with agreement metrics by vignette class
+        Fleiss' Kappa value
     """
-    results = []
+    q_data = df[df["question"] == question]
+    
+    if len(q_data) < 2:
+        return np.nan
+    
+    counts, _, _ = build_count_matrix(q_data)
     
-    for v_class in sorted(df["vignette_class"].unique()):
-        class_df = df[df["vignette_class"] == v_class]
+    return fleiss_kappa_from_counts(counts)[0]
+
+
+def gwet_ac1_from_counts(
+    counts: np.ndarray,
+    groups: Optional[np.ndarray] = None,
+    weights: Optional[np.ndarray] = None,
+    n_categories: Optional[int] = None,
+) -> np.ndarray:
+    """
+    Calculate Gwet's AC1 from a subject × category count matrix.
+    
+    Follows ``irrCAC::gwet.ac1.raw``: observed agreement is averaged over
+    subjects with at least two ratings, category prevalences over subjects
+    with at least one, so missing ratings need no imputation. Unlike Fleiss'
+    Kappa, AC1 is informative for a single subject. A group in which every
+    rating falls in one category has AC1 = 1.
+    
+    Args:
+        counts: Count array of shape (..., n_subjects, n_categories)
+        groups: Optional integer group code per subject. If None, all
+            subjects form a single group.
+        weights: Optional subject weights of shape (..., n_subjects)
+        n_categories: Number of possible categories. Defaults to the number
+            of categories used within each group, as ``irrCAC`` does.
         
-        # Calculate percentage agreement for each question in this class
-        questions = class_df["question"].unique()
-        agreements = []
+    Returns:
+        Array of shape (..., n_groups) with one AC1 per group
+    """
+    counts = np.asarray(counts, dtype=np.float64)
+    if groups is None:
+        groups = np.zeros(counts.shape[-2], dtype=np.intp)
+    groups = np.asarray(groups)
+    n_groups = int(groups.max()) + 1 if len(groups) else 0
+    if weights is None:
+        weights = np.ones(counts.shape[:-1])
+    
+    r_i = counts.sum(axis=-1)
+    agreeing_pairs, total_pairs = _pairwise_agreement_terms(counts)
+    pairable = total_pairs > 0
+    rated = r_i > 0
+    
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # p_a: mean proportion of agreeing pairs over subjects with >= 2 ratings
+        P_i = np.where(pairable, agreeing_pairs / total_pairs, 0.0)
+        pair_weight = np.where(pairable, weights, 0.0)
+        p_a = _group_sum(pair_weight * P_i, groups, n_groups) / _group_sum(
+            pair_weight, groups, n_groups
+        )
         
-        for q in questions:
-            q_df = class_df[class_df["question"] == q]
-            pa = calculate_percentage_agreement(q_df, question=None)
-            if not np.isnan(pa):
-                agreements.append(pa)
+        # pi_k: mean share of each subject's ratings in category k
+        rated_weight = np.where(rated, weights, 0.0)
+        shares = np.where(rated[..., None], counts / r_i[..., None], 0.0)
+        pi_k = (
+            _group_sum(
+                np.swapaxes(shares * rated_weight[..., None], -1, -2), groups, n_groups
+            )
+            / _group_sum(rated_weight, groups, n_groups)[..., None, :]
+        )
         
-        avg_agreement = np.mean(agreements) if agreements else np.nan
+        if n_categories is None:
+            q = (pi_k > 0).sum(axis=-2)
+        else:
+            q = np.full(pi_k.shape[:-2] + pi_k.shape[-1:], n_categories)
+        p_e = np.where(q > 1, (pi_k * (1 - pi_k)).sum(axis=-2) / (q - 1), 0.0)
         
-        # Calculate average Fleiss' Kappa
-        kappas = []
-        for q in questions:
-            kappa = calculate_fleiss_kappa(class_df, q)
-            if not np.isnan(kappa):
-                kappas.append(kappa)
+        return (p_a - p_e) / (1 - p_e)
+
+
+KRIPPENDORFF_LEVELS = ("nominal", "ordinal")
+
+
+def krippendorff_alpha_from_counts(
+    counts: np.ndarray,
+    groups: Optional[np.ndarray] = None,
+    level: str = "nominal",
+    weights: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Calculate Krippendorff's alpha from a unit × category count matrix.
+    
+    Each unit (question) contributes its coincidence matrix
+    ``(n_u n_u^T - diag(n_u)) / (m_u - 1)``; units with fewer than two
+    ratings are not pairable and drop out, which is how alpha handles
+    missing ratings. For ``level="ordinal"`` the columns of ``counts`` must
+    be in rank order. As with Fleiss' Kappa, alpha for a single unit is 0
+    unless all ratings agree.
+    
+    Args:
+        counts: Count array of shape (..., n_units, n_categories)
+        groups: Optional integer group code per unit. If None, all units
+            form a single group.
+        level: "nominal" or "ordinal" difference function
+        weights: Optional unit weights of shape (..., n_units)
+        
+    Returns:
+        Array of shape (..., n_groups) with one alpha per group (NaN where
+        there is no expected disagreement)
+    """
+    if level not in KRIPPENDORFF_LEVELS:
+        raise ValueError(f"level must be one of {KRIPPENDORFF_LEVELS}, got {level!r}")
+    
+    counts = np.asarray(counts, dtype=np.float64)
+    n_categories = counts.shape[-1]
+    if groups is None:
+        groups = np.zeros(counts.shape[-2], dtype=np.intp)
+    groups = np.asarray(groups)
+    n_groups = int(groups.max()) + 1 if len(groups) else 0
+    if weights is None:
+        weights = np.ones(counts.shape[:-1])
+    
+    m_u = counts.sum(axis=-1)
+    pairable = m_u >= 2
+    
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # Coincidence matrix per unit, summed within each group
+        per_unit = (
+            counts[..., :, None] * counts[..., None, :]
+            - counts[..., :, None] * np.eye(n_categories)
+        ) / np.where(pairable, m_u - 1, 1)[..., None, None]
+        per_unit = per_unit * np.where(pairable, weights, 0.0)[..., None, None]
+        coincidences = np.moveaxis(
+            _group_sum(np.moveaxis(per_unit, -3, -1), groups, n_groups), -1, -3
+        )
+        
+        n_c = coincidences.sum(axis=-1)
+        n = n_c.sum(axis=-1)
         
-        avg_kappa = np.mean(kappas) if kappas else np.nan
+        if level == "nominal":
+            delta = np.broadcast_to(1.0 - np.eye(n_categories), coincidences.shape)
+        else:
+            # Squared distance between ranks c and k from the marginals:
+            # (sum_{g=c}^{k} n_g - (n_c + n_k) / 2) ** 2
+            cumulative = np.cumsum(n_c, axis=-1)
+            low = np.minimum.outer(np.arange(n_categories), np.arange(n_categories))
+            high = np.maximum.outer(np.arange(n_categories), np.arange(n_categories))
+            between = cumulative[..., high] - cumulative[..., low] + n_c[..., low]
+            delta = (between - (n_c[..., :, None] + n_c[..., None, :]) / 2) ** 2
         
-        results.append({
-            "vignette_class": v_class,
-            "n_questions": len(questions),
-            "mean_percentage_agreement": avg_agreement,
-            "mean_fleiss_kappa": avg_kappa,
-        })
+        observed = (coincidences * delta).sum(axis=(-2, -1))
+        expected = (n_c[..., :, None] * n_c[..., None, :] * delta).sum(axis=(-2, -1))
+        alpha = 1 - (n - 1) * observed / expected
     
-    return pd.DataFrame(results)
+    return np.where(expected > 0, alpha, np.nan)
 
 
-def calculate_question_level_metrics(df: pd.DataFrame) -> pd.DataFrame:
+@traced
+def calculate_gwet_ac1_batch(
+    df: pd.DataFrame, categories: Optional[Sequence[str]] = None
+) -> Tuple[pd.Series, float, pd.Series]:
     """
-    Calculate interrater reliability metrics for each question.
+    Calculate Gwet's AC1 per question, overall and per vignette class.
     
     Args:
-        df: Long-format dataframe
+        df: Long-format dataframe with columns: physician_id, question,
+            decision, vignette_class
+        categories: Optional fixed set of possible decisions. If given, its
+            size is used as the number of categories everywhere; otherwise
+            only the categories used within each question or group count.
         
     Returns:
-        DataFrame with metrics for each question
+        Tuple of (ac1_by_question, overall_ac1, ac1_by_class)
     """
-    results = []
+    counts, questions, categories_used = build_count_matrix(df, categories)
+    class_codes, classes = question_class_codes(df, questions)
+    n_categories = None if categories is None else len(categories_used)
     
-    for q in sorted(df["question"].unique()):
-        q_df = df[df["question"] == q]
-        
-        # Percentage agreement
-        pa = calculate_percentage_agreement(q_df, question=None)
-        
-        # Fleiss' Kappa
-        fk = calculate_fleiss_kappa(q_df, q)
+    def statistic(counts: np.ndarray, groups: Optional[np.ndarray]) -> np.ndarray:
+        return gwet_ac1_from_counts(counts, groups, n_categories=n_categories)
+    
+    return _by_question_overall_class(
+        statistic, counts, questions, class_codes, classes, "gwet_ac1"
+    )
+
+
+@traced
+def calculate_krippendorff_alpha_batch(
+    df: pd.DataFrame,
+    level: str = "nominal",
+    categories: Optional[Sequence[str]] = None,
+) -> Tuple[pd.Series, float, pd.Series]:
+    """
+    Calculate Krippendorff's alpha per question, overall and per vignette class.
+    
+    Args:
+        df: Long-format dataframe with columns: physician_id, question,
+            decision, vignette_class
+        level: "nominal" or "ordinal"
+        categories: Category order. For ordinal alpha this defaults to
+            DECISION_ORDER (Remain < Commercial < Medevac).
         
-        # Decision distribution
-        decision_counts = q_df["decision"].value_counts().to_dict()
+    Returns:
+        Tuple of (alpha_by_question, overall_alpha, alpha_by_class)
+    """
+    if categories is None and level == "ordinal":
+        categories = DECISION_ORDER
+    counts, questions, _ = build_count_matrix(df, categories)
+    class_codes, classes = question_class_codes(df, questions)
+    
+    def statistic(counts: np.ndarray, groups: Optional[np.ndarray]) -> np.ndarray:
+        return krippendorff_alpha_from_counts(counts, groups, level=level)
+    
+    return _by_question_overall_class(
+        statistic,
+        counts,
+        questions,
+        class_codes,
+        classes,
+        f"krippendorff_alpha_{level}",
+    )
+
+
+@traced
+def calculate_agreement_metrics(df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Calculate question-level and class-level agreement metrics in one pass.
+    
+    Every question-level column comes from a single question × decision
+    count matrix, and the class table is rolled up from the question table
+    (plus the pooled Fleiss' Kappa from the same counts), so the cost is
+    linear in the number of rows.
+    
+    Args:
+        df: Long-format dataframe with columns: physician_id, question,
+            decision, question_type, vignette_class
         
-        # Get vignette info
-        vignette_info = q_df.iloc[0]
+    Returns:
+        Tuple of (question_metrics, class_metrics) as returned by
+        :func:`calculate_question_level_metrics` and
+        :func:`calculate_agreement_by_class`
+    """
+    counts, questions, categories = build_count_matrix(df)
+    vignette_info = (
+        df.drop_duplicates(subset="question")
+        .set_index("question")
+        .reindex(index=questions, columns=["question_type", "vignette_class"])
+        .reset_index(drop=True)
+    )
+    return agreement_metrics_from_counts(counts, questions, categories, vignette_info)
+
+
+def agreement_metrics_from_counts(
+    counts: np.ndarray,
+    questions: np.ndarray,
+    categories: np.ndarray,
+    vignette_info: pd.DataFrame,
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Question-level and class-level agreement metrics from a count matrix.
+    
+    Args:
+        counts: Question × category count matrix
+        questions: Question number per row of ``counts``
+        categories: Decision per column of ``counts``
+        vignette_info: Columns question_type and vignette_class, one row per
+            question in the order of ``questions``
         
-        result = {
-            "question": q,
+    Returns:
+        Tuple of (question_metrics, class_metrics), see
+        :func:`calculate_agreement_metrics`
+    """
+    agreeing_pairs, total_pairs = _pairwise_agreement_terms(counts)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        agreement = np.where(total_pairs > 0, agreeing_pairs / total_pairs, np.nan)
+    
+    class_codes, classes = pd.factorize(vignette_info["vignette_class"], sort=True)
+    classes = np.asarray(classes)
+    kappa_by_question, _, kappa_by_class = _by_question_overall_class(
+        fleiss_kappa_from_counts,
+        counts,
+        questions,
+        class_codes,
+        classes,
+        "fleiss_kappa",
+    )
+    
+    category_index = {category: j for j, category in enumerate(categories)}
+    decision_counts = {
+        f"decision_{decision.lower()}": (
+            counts[:, category_index[decision]]
+            if decision in category_index
+            else np.zeros(len(questions), dtype=counts.dtype)
+        )
+        for decision in ["Medevac", "Commercial", "Remain"]
+    }
+    
+    question_metrics = pd.DataFrame(
+        {
+            "question": questions,
             "question_type": vignette_info["question_type"],
             "vignette_class": vignette_info["vignette_class"],
-            "n_physicians": len(q_df["physician_id"].unique()),
-            "percentage_agreement": pa,
-            "fleiss_kappa": fk,
-            "decision_medevac": decision_counts.get("Medevac", 0),
-            "decision_commercial": decision_counts.get("Commercial", 0),
-            "decision_remain": decision_counts.get("Remain", 0),
+            "n_physicians": counts.sum(axis=1),
+            "percentage_agreement": agreement,
+            "fleiss_kappa": kappa_by_question.to_numpy(),
+            **decision_counts,
+        }
+    )
+    
+    by_class = question_metrics.groupby("vignette_class", observed=True, sort=True)
+    class_metrics = pd.DataFrame(
+        {
+            "n_questions": by_class.size(),
+            "mean_percentage_agreement": by_class["percentage_agreement"].mean(),
         }
+    )
+    class_metrics["fleiss_kappa"] = kappa_by_class.reindex(
+        class_metrics.index.astype(object)
+    ).to_numpy()
+    class_metrics = class_metrics.rename_axis("vignette_class").reset_index()
+    
+    return question_metrics, class_metrics
+
+
+@traced
+def calculate_agreement_by_class(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Calculate agreement metrics by vignette class.
+    
+    Args:
+        df: Long-format dataframe
         
-        results.append(result)
+    Returns:
+        DataFrame with columns: vignette_class, n_questions,
+        mean_percentage_agreement, fleiss_kappa (pooled over the class's
+        questions)
+    """
+    _, class_metrics = calculate_agreement_metrics(df)
+    return class_metrics
+
+
+@traced
+def calculate_question_level_metrics(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Calculate interrater reliability metrics for each question.
     
-    return pd.DataFrame(results)
+    Args:
+        df: Long-format dataframe
+        
+    Returns:
+        DataFrame with metrics for each question
+    """
+    question_metrics, _ = calculate_agreement_metrics(df)
+    return question_metrics
 
 
+@traced
 def calculate_confidence_analysis(df: pd.DataFrame) -> pd.DataFrame:
     """
     Analyze confidence ratings by decision and vignette class.
@@ -295,16 +842,19 @@ def calculate_confidence_analysis(df: pd.DataFrame) -> pd.DataFrame:
         DataFrame with confidence statistics
     """
     # Overall confidence by decision
-    conf_by_decision = df.groupby("decision")["confidence"].agg([
-        "mean", "std", "count"
-    ]).reset_index()
+    conf_by_decision = (
+        df.groupby("decision", observed=True)["confidence"]
+        .agg(["mean", "std", "count"])
+        .reset_index()
+    )
     conf_by_decision.columns = ["decision", "mean_confidence", "std_confidence", "n"]
     
     # Confidence by vignette class
-    conf_by_class = df.groupby("vignette_class")["confidence"].agg([
-        "mean", "std", "count"
-    ]).reset_index()
+    conf_by_class = (
+        df.groupby("vignette_class", observed=True)["confidence"]
+        .agg(["mean", "std", "count"])
+        .reset_index()
+    )
     conf_by_class.columns = ["vignette_class", "mean_confidence", "std_confidence", "n"]
     
     return conf_by_decision, conf_by_class
-
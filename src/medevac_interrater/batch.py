@@ -0,0 +1,267 @@
+"""
+Batch analysis of many survey exports.
+
+Each export (one site or wave of the same instrument) is loaded, cleaned and
+analyzed in a worker process. Results are written under a directory named
+after the export's path relative to the batch root, and one summary row per
+export is collected into a combined table. A failure in one export is
+recorded in its summary row and does not stop the others; if a worker
+process dies, the exports it took down with the pool are rerun one per
+process, so only the export that crashed is marked as failed.
+"""
+
+import glob
+import os
+import time
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ProcessPoolExecutor,
+    as_completed,
+    wait,
+)
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .analysis import (
+    calculate_agreement_metrics,
+    calculate_confidence_analysis,
+    calculate_fleiss_kappa_batch,
+    calculate_percentage_agreement,
+)
+from .data_loader import load_export
+from .instrumentation import traced
+
+SUMMARY_FILENAME = "batch_summary.csv"
+
+ProgressCallback = Callable[[int, int, Dict[str, object]], None]
+Job = Tuple[Path, str, Path]
+
+
+def discover_exports(source: Union[str, Path]) -> Tuple[List[Path], Path]:
+    """
+    Find the survey exports to analyze.
+
+    Args:
+        source: Directory (its ``*.csv`` files are used) or glob pattern;
+            ``**`` matches nested directories
+
+    Returns:
+        Tuple of (exports, root) with exports sorted by path and root the
+        deepest directory containing all of them
+    """
+    source_path = Path(source)
+    if source_path.is_dir():
+        exports = sorted(source_path.glob("*.csv"))
+        root = source_path
+    else:
+        exports = sorted(Path(p) for p in glob.glob(str(source), recursive=True))
+        exports = [p for p in exports if p.is_file()]
+        root = (
+            Path(os.path.commonpath([str(p.parent) for p in exports]))
+            if exports
+            else source_path.parent
+        )
+    return exports, root
+
+
+def survey_id(csv_path: Path, root: Path) -> str:
+    """Name of an export within a batch: its path relative to the root, without suffix."""
+    return Path(csv_path).relative_to(root).with_suffix("").as_posix()
+
+
+@traced
+def analyze_export(
+    csv_path: Path, output_dir: Path, cache_dir: Optional[Path] = None
+) -> Dict[str, object]:
+    """
+    Load, clean and analyze one export, writing its result tables.
+
+    Args:
+        csv_path: Path to the survey export
+        output_dir: Directory for this export's result tables
+        cache_dir: Optional long-format cache directory
+
+    Returns:
+        Summary metrics for the export
+
+    Raises:
+        ValueError: If the export contains no survey responses
+    """
+    long_df = load_export(csv_path, cache_dir=cache_dir)
+    if long_df.empty:
+        raise ValueError(f"No survey responses found in {csv_path}")
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    long_df.to_csv(output_dir / "cleaned_data_long.csv", index=False)
+
+    question_metrics, class_metrics = calculate_agreement_metrics(long_df)
+    question_metrics.to_csv(output_dir / "question_level_metrics.csv", index=False)
+    class_metrics.to_csv(output_dir / "class_level_metrics.csv", index=False)
+
+    conf_by_decision, conf_by_class = calculate_confidence_analysis(long_df)
+    conf_by_decision.to_csv(output_dir / "confidence_by_decision.csv", index=False)
+    conf_by_class.to_csv(output_dir / "confidence_by_class.csv", index=False)
+
+    _, overall_kappa, _ = calculate_fleiss_kappa_batch(long_df)
+
+    return {
+        "n_physicians": long_df["physician_id"].nunique(),
+        "n_questions": long_df["question"].nunique(),
+        "n_responses": len(long_df),
+        "percentage_agreement": calculate_percentage_agreement(long_df),
+        "fleiss_kappa": overall_kappa,
+        "mean_confidence": long_df["confidence"].mean(),
+    }
+
+
+def _run_export(
+    csv_path: Path, name: str, output_dir: Path, cache_dir: Optional[Path]
+) -> Dict[str, object]:
+    """Analyze one export, turning any error into a failed summary row."""
+    start = time.perf_counter()
+    row: Dict[str, object] = {
+        "survey": name,
+        "path": str(csv_path),
+        "output_dir": str(output_dir),
+    }
+    try:
+        row.update(analyze_export(csv_path, output_dir, cache_dir=cache_dir))
+        row["status"] = "ok"
+        row["error"] = None
+    except Exception as exc:
+        row["status"] = "failed"
+        row["error"] = f"{type(exc).__name__}: {exc}"
+    row["seconds"] = time.perf_counter() - start
+    return row
+
+
+def _crashed_row(job: Job, exc: BaseException) -> Dict[str, object]:
+    """Summary row of an export whose worker process died."""
+    csv_path, name, survey_dir = job
+    return {
+        "survey": name,
+        "path": str(csv_path),
+        "output_dir": str(survey_dir),
+        "status": "failed",
+        "error": f"{type(exc).__name__}: {exc}",
+        "seconds": np.nan,
+    }
+
+
+def _run_isolated(
+    jobs: List[Job],
+    n_workers: int,
+    cache_dir: Optional[Path],
+    record: Callable[[Dict[str, object]], None],
+) -> None:
+    """Run each export in its own process, at most ``n_workers`` at a time."""
+    pending = list(jobs)
+    running: Dict[Future, Tuple[Job, ProcessPoolExecutor]] = {}
+    try:
+        while pending or running:
+            while pending and len(running) < n_workers:
+                job = pending.pop(0)
+                executor = ProcessPoolExecutor(max_workers=1)
+                running[executor.submit(_run_export, *job, cache_dir)] = (job, executor)
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                job, executor = running.pop(future)
+                executor.shutdown()
+                try:
+                    record(future.result())
+                except Exception as exc:
+                    record(_crashed_row(job, exc))
+    finally:
+        for _, executor in running.values():
+            executor.shutdown(wait=False)
+
+
+@traced
+def run_batch(
+    source: Union[str, Path],
+    output_dir: Path,
+    n_jobs: Optional[int] = None,
+    cache_dir: Optional[Path] = None,
+    progress: Optional[ProgressCallback] = None,
+) -> pd.DataFrame:
+    """
+    Analyze every export matched by ``source`` in a process pool.
+
+    Each export's tables are written to ``output_dir / <survey id>`` and the
+    combined summary to ``output_dir / batch_summary.csv``.
+
+    Args:
+        source: Directory or glob pattern of exports, see :func:`discover_exports`
+        output_dir: Root directory for results
+        n_jobs: Number of worker processes (None uses all CPUs, 1 runs in
+            this process)
+        cache_dir: Optional long-format cache directory shared by all exports
+        progress: Optional callback called as ``progress(done, total, row)``
+            after each export finishes
+
+    Returns:
+        Summary dataframe with one row per export: survey, path, output_dir,
+        status, error, seconds and the summary metrics of successful exports
+    """
+    exports, root = discover_exports(source)
+    output_dir = Path(output_dir)
+    jobs: List[Job] = [
+        (csv_path, survey_id(csv_path, root), output_dir / survey_id(csv_path, root))
+        for csv_path in exports
+    ]
+
+    rows = []
+
+    def record(row: Dict[str, object]) -> None:
+        rows.append(row)
+        if progress is not None:
+            progress(len(rows), len(jobs), row)
+
+    if n_jobs == 1 or len(jobs) <= 1:
+        for csv_path, name, survey_dir in jobs:
+            record(_run_export(csv_path, name, survey_dir, cache_dir))
+    else:
+        n_workers = n_jobs or os.cpu_count() or 1
+        interrupted = []
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            futures = {
+                executor.submit(_run_export, *job, cache_dir): job for job in jobs
+            }
+            for future in as_completed(futures):
+                try:
+                    record(future.result())
+                except BrokenProcessPool:
+                    # A worker died (e.g. out of memory) and the pool failed
+                    # every export it had not finished, not just the culprit
+                    interrupted.append(futures[future])
+                except Exception as exc:
+                    record(_crashed_row(futures[future], exc))
+        if interrupted:
+            interrupted.sort(key=jobs.index)
+            _run_isolated(interrupted, n_workers, cache_dir, record)
+
+    columns = [
+        "survey",
+        "path",
+        "output_dir",
+        "status",
+        "error",
+        "seconds",
+        "n_physicians",
+        "n_questions",
+        "n_responses",
+        "percentage_agreement",
+        "fleiss_kappa",
+        "mean_confidence",
+    ]
+    summary = pd.DataFrame(rows, columns=columns).sort_values(
+        "survey", ignore_index=True
+    )
+    output_dir.mkdir(parents=True, exist_ok=True)
+    summary.to_csv(output_dir / SUMMARY_FILENAME, index=False)
+    return summary
@@ -0,0 +1,260 @@
+"""
+Benchmarks of the loader and agreement metrics on synthetic surveys.
+
+Each benchmark times one function on a synthetic export of a given size
+tier. Results can be saved as a baseline and later runs compared against
+it, flagging benchmarks that slowed down by more than a threshold.
+"""
+
+import json
+import platform
+import statistics
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from . import __version__
+from .analysis import (
+    build_count_matrix,
+    calculate_agreement_metrics,
+    calculate_cohens_kappa,
+    calculate_confidence_analysis,
+    calculate_fleiss_kappa,
+    calculate_fleiss_kappa_batch,
+    calculate_gwet_ac1_batch,
+    calculate_krippendorff_alpha_batch,
+    calculate_percentage_agreement,
+    calculate_percentage_agreement_by_question,
+)
+from .benchmark_settings import DEFAULT_THRESHOLD, SIZE_TIERS
+from .bootstrap import bootstrap_agreement
+from .data_loader import load_export, reshape_to_long_format
+from .incremental import AgreementState
+from .permutation import permutation_test_by_class
+from .synthetic import write_survey
+
+
+@dataclass(frozen=True)
+class Workload:
+    """Inputs shared by the benchmarks of one size tier."""
+
+    csv_path: Path
+    wide_df: pd.DataFrame
+    long_df: pd.DataFrame
+
+
+@dataclass(frozen=True)
+class Benchmark:
+    """A timed call on a workload, skipped above ``max_tier``."""
+
+    name: str
+    func: Callable[[Workload], Any]
+    max_tier: Optional[str] = None
+
+
+BENCHMARKS = [
+    Benchmark("load_export", lambda w: load_export(w.csv_path)),
+    Benchmark("reshape_to_long_format", lambda w: reshape_to_long_format(w.wide_df)),
+    Benchmark("build_count_matrix", lambda w: build_count_matrix(w.long_df)),
+    Benchmark(
+        "calculate_percentage_agreement",
+        lambda w: calculate_percentage_agreement(w.long_df),
+    ),
+    Benchmark(
+        "calculate_percentage_agreement_by_question",
+        lambda w: calculate_percentage_agreement_by_question(w.long_df),
+    ),
+    Benchmark("calculate_fleiss_kappa", lambda w: calculate_fleiss_kappa(w.long_df, 1)),
+    Benchmark(
+        "calculate_fleiss_kappa_batch",
+        lambda w: calculate_fleiss_kappa_batch(w.long_df),
+    ),
+    # Enumerates physician pairs with a frame lookup each
+    Benchmark(
+        "calculate_cohens_kappa",
+        lambda w: calculate_cohens_kappa(w.long_df, 1),
+        max_tier="small",
+    ),
+    Benchmark(
+        "calculate_gwet_ac1_batch", lambda w: calculate_gwet_ac1_batch(w.long_df)
+    ),
+    Benchmark(
+        "calculate_krippendorff_alpha_batch",
+        lambda w: calculate_krippendorff_alpha_batch(w.long_df),
+    ),
+    Benchmark(
+        "calculate_agreement_metrics", lambda w: calculate_agreement_metrics(w.long_df)
+    ),
+    Benchmark(
+        "calculate_confidence_analysis",
+        lambda w: calculate_confidence_analysis(w.long_df),
+    ),
+    Benchmark(
+        "AgreementState.add_responses",
+        lambda w: AgreementState().add_responses(w.long_df),
+    ),
+    Benchmark(
+        "bootstrap_agreement",
+        lambda w: bootstrap_agreement(w.long_df, n_boot=200, resample="both", seed=0),
+    ),
+    Benchmark(
+        "permutation_test_by_class",
+        lambda w: permutation_test_by_class(
+            w.long_df, n_permutations=200, max_exact=0, seed=0
+        ),
+    ),
+]
+
+
+def make_workload(n_physicians: int, directory: Path, seed: int = 0) -> Workload:
+    """
+    Generate the synthetic export for a size tier.
+
+    Args:
+        n_physicians: Number of respondents
+        directory: Directory to write the export to
+        seed: Random seed
+
+    Returns:
+        The export path with its wide and cleaned long-format frames
+    """
+    csv_path = write_survey(
+        Path(directory) / f"survey_{n_physicians}.csv",
+        n_physicians=n_physicians,
+        missing_rate=0.02,
+        seed=seed,
+    )
+    wide_df = pd.read_csv(csv_path)
+    return Workload(csv_path, wide_df, load_export(csv_path))
+
+
+def _tier_allowed(tier: str, max_tier: Optional[str]) -> bool:
+    """Whether a benchmark limited to ``max_tier`` runs on ``tier``."""
+    if max_tier is None:
+        return True
+    return SIZE_TIERS[tier] <= SIZE_TIERS[max_tier]
+
+
+def run_benchmarks(
+    tiers: Sequence[str] = ("small", "medium"),
+    names: Optional[Sequence[str]] = None,
+    repeat: int = 5,
+    seed: int = 0,
+) -> pd.DataFrame:
+    """
+    Time the benchmarks on each size tier.
+
+    Args:
+        tiers: Size tiers to run, keys of SIZE_TIERS
+        names: Benchmarks to run (all if None)
+        repeat: Timed calls per benchmark, after one warm-up call
+        seed: Seed of the synthetic surveys
+
+    Returns:
+        DataFrame with columns: benchmark, tier, n_physicians, n_responses,
+        best_seconds, median_seconds
+
+    Raises:
+        ValueError: If a tier or benchmark name is unknown
+    """
+    unknown_tiers = set(tiers) - set(SIZE_TIERS)
+    if unknown_tiers:
+        raise ValueError(f"Unknown size tiers: {sorted(unknown_tiers)}")
+    benchmarks = BENCHMARKS
+    if names is not None:
+        unknown = set(names) - {b.name for b in BENCHMARKS}
+        if unknown:
+            raise ValueError(f"Unknown benchmarks: {sorted(unknown)}")
+        benchmarks = [b for b in BENCHMARKS if b.name in names]
+
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        for tier in tiers:
+            workload = make_workload(SIZE_TIERS[tier], Path(directory), seed=seed)
+            for benchmark in benchmarks:
+                if not _tier_allowed(tier, benchmark.max_tier):
+                    continue
+                benchmark.func(workload)
+                timings = []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    benchmark.func(workload)
+                    timings.append(time.perf_counter() - start)
+                rows.append(
+                    {
+                        "benchmark": benchmark.name,
+                        "tier": tier,
+                        "n_physicians": SIZE_TIERS[tier],
+                        "n_responses": len(workload.long_df),
+                        "best_seconds": min(timings),
+                        "median_seconds": statistics.median(timings),
+                    }
+                )
+
+    return pd.DataFrame(rows)
+
+
+def save_baseline(results: pd.DataFrame, path: Path) -> None:
+    """
+    Record benchmark results as the baseline, with the environment they ran in.
+
+    Args:
+        results: Output of :func:`run_benchmarks`
+        path: JSON file to write
+    """
+    baseline = {
+        "environment": {
+            "package": __version__,
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "machine": platform.machine(),
+        },
+        "results": {
+            f"{row.benchmark}/{row.tier}": row.best_seconds
+            for row in results.itertuples()
+        },
+    }
+    Path(path).write_text(json.dumps(baseline, indent=2) + "\n")
+
+
+def load_baseline(path: Path) -> Dict[str, float]:
+    """Read the best time per ``benchmark/tier`` from a baseline file."""
+    return json.loads(Path(path).read_text())["results"]
+
+
+def compare_to_baseline(
+    results: pd.DataFrame,
+    baseline: Dict[str, float],
+    threshold: float = DEFAULT_THRESHOLD,
+    min_delta: float = 0.005,
+) -> pd.DataFrame:
+    """
+    Compare benchmark results with a baseline.
+
+    A benchmark regresses when its best time exceeds ``threshold`` times the
+    baseline and is also slower by more than ``min_delta`` seconds, so timer
+    noise on sub-millisecond benchmarks is not flagged.
+
+    Args:
+        results: Output of :func:`run_benchmarks`
+        baseline: Output of :func:`load_baseline`
+        threshold: Allowed slowdown ratio
+        min_delta: Smallest absolute slowdown (seconds) counted as a regression
+
+    Returns:
+        ``results`` with added columns baseline_seconds, ratio and regressed.
+        Benchmarks missing from the baseline have NaN ratio and never regress.
+    """
+    keys = results["benchmark"] + "/" + results["tier"]
+    compared = results.assign(baseline_seconds=keys.map(baseline).astype(float))
+    compared["ratio"] = compared["best_seconds"] / compared["baseline_seconds"]
+    compared["regressed"] = (compared["ratio"] > threshold) & (
+        compared["best_seconds"] - compared["baseline_seconds"] > min_delta
+    )
+    return compared
@@ -0,0 +1,11 @@
+"""
+Benchmark size tiers and regression threshold.
+
+Kept free of pandas and numpy so the command-line interface can offer them
+as choices and defaults without importing :mod:`.benchmark`.
+"""
+
+# Number of physicians per size tier (all tiers have 20 vignettes)
+SIZE_TIERS = {"small": 20, "medium": 500, "large": 5000}
+
+DEFAULT_THRESHOLD = 2.0
@@ -0,0 +1,345 @@
+"""
+Cluster-bootstrap confidence intervals for agreement and kappa.
+
+Resamples vignettes (within their class), physicians, or both. Each batch
+of replicates is evaluated as array operations on stacked count matrices:
+a physician resample is a matrix of draw counts multiplied into the one-hot
+rating tensor, and a vignette resample is a matrix of subject weights, which
+every pooled statistic is linear in. Batches are seeded from a single
+``SeedSequence`` so results do not depend on the number of workers.
+"""
+
+import math
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .analysis import (
+    _group_sum,
+    _pairwise_agreement_terms,
+    build_rating_matrix,
+    fleiss_kappa_from_counts,
+    one_hot_ratings,
+    question_class_codes,
+)
+from .instrumentation import traced
+
+RESAMPLE_UNITS = ("physicians", "vignettes", "both")
+CI_METHODS = ("percentile", "bca")
+
+StatKey = Tuple[str, str]
+
+_WORKER_STATE: Dict[str, object] = {}
+
+
+def batch_agreement_statistics(
+    counts: np.ndarray,
+    class_codes: np.ndarray,
+    n_classes: int,
+    weights: Optional[np.ndarray] = None,
+    self_pairs: Optional[np.ndarray] = None,
+) -> Dict[StatKey, np.ndarray]:
+    """
+    Evaluate agreement and kappa on a batch of count matrices.
+
+    Args:
+        counts: Count array of shape (n_batch, n_questions, n_categories)
+        class_codes: Vignette class code per question
+        n_classes: Number of vignette classes
+        weights: Optional question weights of shape (n_batch, n_questions)
+        self_pairs: Optional ordered pairs between copies of the same
+            physician, shape (n_batch, n_questions)
+
+    Returns:
+        Dictionary keyed by (level, metric) with arrays of shape
+        (n_batch, n_units): per-question agreement, per-class mean agreement
+        and pooled kappa, and overall agreement and kappa
+    """
+    agreeing_pairs, total_pairs = _pairwise_agreement_terms(counts, self_pairs)
+    if weights is None:
+        weights = np.ones(total_pairs.shape)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        question_agreement = np.where(
+            total_pairs > 0, agreeing_pairs / total_pairs, np.nan
+        )
+
+        # Class mean of the per-question agreement, skipping undefined questions
+        valid_weights = weights * ~np.isnan(question_agreement)
+        class_agreement = _group_sum(
+            valid_weights * np.nan_to_num(question_agreement), class_codes, n_classes
+        ) / _group_sum(valid_weights, class_codes, n_classes)
+
+        overall_agreement = (weights * agreeing_pairs).sum(axis=-1) / (
+            weights * total_pairs
+        ).sum(axis=-1)
+
+    return {
+        ("question", "percentage_agreement"): question_agreement,
+        ("class", "mean_percentage_agreement"): class_agreement,
+        ("class", "fleiss_kappa"): fleiss_kappa_from_counts(
+            counts, class_codes, weights, self_pairs
+        ),
+        ("overall", "percentage_agreement"): overall_agreement[..., None],
+        ("overall", "fleiss_kappa"): fleiss_kappa_from_counts(
+            counts, None, weights, self_pairs
+        ),
+    }
+
+
+def _draw_counts(n: int, size: int, rng: np.random.Generator) -> np.ndarray:
+    """Draw ``n`` resamples of ``size`` units and return how often each unit was drawn."""
+    draws = rng.integers(0, size, size=(n, size))
+    offsets = np.arange(n)[:, None] * size
+    return np.bincount((draws + offsets).ravel(), minlength=n * size).reshape(n, size)
+
+
+def _vignette_weights(
+    n: int, class_codes: np.ndarray, rng: np.random.Generator
+) -> np.ndarray:
+    """Resample questions within each vignette class and return their draw counts."""
+    weights = np.zeros((n, len(class_codes)))
+    for code in np.unique(class_codes):
+        positions = np.flatnonzero(class_codes == code)
+        weights[:, positions] = _draw_counts(n, len(positions), rng)
+    return weights
+
+
+def _init_worker(
+    onehot: np.ndarray, class_codes: np.ndarray, n_classes: int, resample: str
+) -> None:
+    """Store the shared rating tensor once per worker process."""
+    _WORKER_STATE.update(
+        onehot=onehot, class_codes=class_codes, n_classes=n_classes, resample=resample
+    )
+
+
+def _bootstrap_batch(seed: np.random.SeedSequence, n: int) -> Dict[StatKey, np.ndarray]:
+    """Generate and evaluate one batch of ``n`` bootstrap replicates."""
+    onehot = _WORKER_STATE["onehot"]
+    class_codes = _WORKER_STATE["class_codes"]
+    resample = _WORKER_STATE["resample"]
+    n_physicians, n_questions, n_categories = onehot.shape
+    rng = np.random.default_rng(seed)
+
+    self_pairs = None
+    if resample in ("physicians", "both"):
+        rater_weights = _draw_counts(n, n_physicians, rng).astype(np.float64)
+        counts = rater_weights @ onehot.reshape(n_physicians, -1)
+        counts = counts.reshape(n, n_questions, n_categories)
+        # A physician drawn w times forms w (w - 1) ordered pairs with itself
+        self_pairs = (rater_weights * (rater_weights - 1)) @ onehot.sum(axis=-1)
+    else:
+        counts = np.broadcast_to(onehot.sum(axis=0), (n, n_questions, n_categories))
+
+    weights = None
+    if resample in ("vignettes", "both"):
+        weights = _vignette_weights(n, class_codes, rng)
+
+    return batch_agreement_statistics(
+        counts, class_codes, _WORKER_STATE["n_classes"], weights, self_pairs
+    )
+
+
+def _jackknife_statistics(
+    onehot: np.ndarray,
+    class_codes: np.ndarray,
+    n_classes: int,
+    resample: str,
+    chunk_size: int = 256,
+) -> Dict[StatKey, np.ndarray]:
+    """Leave-one-out statistics over the resampled unit, for the BCa acceleration."""
+    total = onehot.sum(axis=0)
+    n_physicians, n_questions, _ = onehot.shape
+    n_units = n_questions if resample == "vignettes" else n_physicians
+
+    chunks: List[Dict[StatKey, np.ndarray]] = []
+    for start in range(0, n_units, chunk_size):
+        stop = min(start + chunk_size, n_units)
+        if resample == "vignettes":
+            weights = np.ones((stop - start, n_questions))
+            weights[np.arange(stop - start), np.arange(start, stop)] = 0
+            counts = np.broadcast_to(total, (stop - start,) + total.shape)
+            chunks.append(
+                batch_agreement_statistics(counts, class_codes, n_classes, weights)
+            )
+        else:
+            counts = total[None] - onehot[start:stop]
+            chunks.append(batch_agreement_statistics(counts, class_codes, n_classes))
+
+    return {key: np.concatenate([chunk[key] for chunk in chunks]) for key in chunks[0]}
+
+
+def _acceleration(jackknife: np.ndarray) -> np.ndarray:
+    """BCa acceleration constant from leave-one-out estimates (one per column)."""
+    with np.errstate(invalid="ignore", divide="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN columns
+        deviations = np.nanmean(jackknife, axis=0) - jackknife
+        numerator = np.nansum(deviations**3, axis=0)
+        denominator = 6 * np.nansum(deviations**2, axis=0) ** 1.5
+        return np.where(denominator > 0, numerator / denominator, 0.0)
+
+
+_norm_cdf = np.vectorize(lambda x: 0.5 * (1 + math.erf(x / math.sqrt(2))))
+_norm_ppf = np.vectorize(NormalDist().inv_cdf)
+
+
+def _percentile_interval(
+    replicates: np.ndarray, alpha: float
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Percentile interval per column, ignoring undefined replicates."""
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN columns
+        lower, upper = np.nanquantile(replicates, [alpha / 2, 1 - alpha / 2], axis=0)
+    return lower, upper
+
+
+def _bca_interval(
+    replicates: np.ndarray, estimate: np.ndarray, acceleration: np.ndarray, alpha: float
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Bias-corrected and accelerated interval per column."""
+    n_valid = (~np.isnan(replicates)).sum(axis=0)
+    ordered = np.sort(replicates, axis=0)  # NaN replicates sort last
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        below = (replicates < estimate).sum(axis=0) + 0.5 * (
+            replicates == estimate
+        ).sum(axis=0)
+        p0 = np.clip(below / n_valid, 1 / (n_valid + 1), n_valid / (n_valid + 1))
+    usable = (n_valid > 0) & ~np.isnan(estimate)
+    z0 = np.where(usable, _norm_ppf(np.where(usable, p0, 0.5)), np.nan)
+
+    bounds = []
+    for z_alpha in _norm_ppf(np.array([alpha / 2, 1 - alpha / 2])):
+        shifted = z0 + z_alpha
+        adjusted = _norm_cdf(z0 + shifted / (1 - acceleration * shifted))
+        position = np.clip(
+            np.round(adjusted * (n_valid - 1)), 0, np.maximum(n_valid - 1, 0)
+        )
+        position = np.where(usable, position, 0).astype(np.intp)
+        bound = np.take_along_axis(ordered, position[None], axis=0)[0]
+        bounds.append(np.where(usable, bound, np.nan))
+
+    return bounds[0], bounds[1]
+
+
+@traced
+def bootstrap_agreement(
+    df: pd.DataFrame,
+    n_boot: int = 10000,
+    resample: str = "physicians",
+    confidence_level: float = 0.95,
+    method: str = "percentile",
+    seed: Optional[int] = None,
+    n_jobs: Optional[int] = 1,
+    batch_size: int = 500,
+) -> pd.DataFrame:
+    """
+    Bootstrap confidence intervals for percentage agreement and Fleiss' Kappa.
+
+    Physicians are resampled with replacement; vignettes are resampled with
+    replacement within their class, so every replicate keeps the class
+    composition of the survey. ``"both"`` resamples the two independently
+    (two-way cluster bootstrap). Pairs formed between copies of the same
+    physician are excluded, so duplicated raters do not inflate agreement.
+    Per-question intervals are only reported when
+    physicians are resampled, since a vignette resample leaves each question's
+    own statistic unchanged.
+
+    Args:
+        df: Long-format dataframe with columns: physician_id, question,
+            decision, vignette_class
+        n_boot: Number of bootstrap replicates
+        resample: Unit to resample: "physicians", "vignettes" or "both"
+        confidence_level: Coverage of the intervals
+        method: "percentile" or "bca" (bias-corrected and accelerated, with
+            the acceleration from a leave-one-out jackknife over physicians,
+            or over vignettes when only vignettes are resampled)
+        seed: Seed for reproducible replicates
+        n_jobs: Number of worker processes (None uses all CPUs)
+        batch_size: Replicates evaluated per batch
+
+    Returns:
+        DataFrame with columns: level, unit, metric, estimate, std_error,
+        ci_lower, ci_upper
+    """
+    if resample not in RESAMPLE_UNITS:
+        raise ValueError(f"resample must be one of {RESAMPLE_UNITS}, got {resample!r}")
+    if method not in CI_METHODS:
+        raise ValueError(f"method must be one of {CI_METHODS}, got {method!r}")
+
+    codes, _, questions, categories = build_rating_matrix(df)
+    onehot = one_hot_ratings(codes, len(categories))
+    class_codes, classes = question_class_codes(df, questions)
+    n_classes = len(classes)
+
+    estimates = batch_agreement_statistics(
+        onehot.sum(axis=0)[None], class_codes, n_classes
+    )
+    if resample == "vignettes":
+        del estimates[("question", "percentage_agreement")]
+
+    sizes = [batch_size] * (n_boot // batch_size)
+    if n_boot % batch_size:
+        sizes.append(n_boot % batch_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    init_args = (onehot, class_codes, n_classes, resample)
+
+    if n_jobs == 1:
+        _init_worker(*init_args)
+        try:
+            results = [_bootstrap_batch(s, n) for s, n in zip(seeds, sizes)]
+        finally:
+            _WORKER_STATE.clear()
+    else:
+        with ProcessPoolExecutor(
+            max_workers=n_jobs or os.cpu_count(),
+            initializer=_init_worker,
+            initargs=init_args,
+        ) as executor:
+            results = list(executor.map(_bootstrap_batch, seeds, sizes))
+
+    jackknife = None
+    if method == "bca":
+        jackknife = _jackknife_statistics(onehot, class_codes, n_classes, resample)
+
+    alpha = 1 - confidence_level
+    units = {"question": questions, "class": classes, "overall": np.array(["overall"])}
+    tables = []
+
+    for key, estimate in estimates.items():
+        level, metric = key
+        estimate = estimate[0]
+        replicates = np.concatenate([result[key] for result in results])
+
+        if method == "bca":
+            lower, upper = _bca_interval(
+                replicates, estimate, _acceleration(jackknife[key]), alpha
+            )
+        else:
+            lower, upper = _percentile_interval(replicates, alpha)
+
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN columns
+            std_error = np.nanstd(replicates, axis=0, ddof=1)
+
+        tables.append(
+            pd.DataFrame(
+                {
+                    "level": level,
+                    "unit": units[level],
+                    "metric": metric,
+                    "estimate": estimate,
+                    "std_error": std_error,
+                    "ci_lower": lower,
+                    "ci_upper": upper,
+                }
+            )
+        )
+
+    return pd.concat(tables, ignore_index=True)
@@ -0,0 +1,150 @@
+"""
+Content-addressed on-disk cache for the cleaned long-format data.
+
+Entries are uncompressed Feather (Arrow IPC) files with dictionary-encoded
+text columns, read back through a memory map. The cache key covers the raw
+export's bytes, the package version and any other inputs the caller passes
+(such as the vignette classification), so a change to any of them misses
+the cache and the stale entry is replaced. Exports at different paths
+keep separate entries, so one cache directory can serve many surveys.
+"""
+
+import hashlib
+import json
+import os
+import warnings
+from pathlib import Path
+from typing import Any, Optional
+
+import pandas as pd
+
+from . import __version__
+from .instrumentation import traced
+
+CACHE_FORMAT_VERSION = 1
+CATEGORICAL_COLUMNS = ["vignette_label", "decision", "question_type", "vignette_class"]
+
+
+def pyarrow_available() -> bool:
+    """Whether the optional pyarrow dependency needed by the cache is installed."""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def file_digest(path: Path, block_size: int = 1 << 20) -> str:
+    """
+    Hash a file's contents without parsing it.
+
+    Args:
+        path: File to hash
+        block_size: Bytes read at a time
+
+    Returns:
+        SHA-256 hex digest
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_key(csv_path: Path, *inputs: Any) -> str:
+    """
+    Cache key for the cleaned data derived from an export.
+
+    Args:
+        csv_path: Raw survey export
+        *inputs: Other JSON-serializable inputs the cleaned data depends on
+
+    Returns:
+        Hex digest combining the file contents, package version and inputs
+    """
+    material = json.dumps(
+        [file_digest(csv_path), __version__, CACHE_FORMAT_VERSION, list(inputs)],
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def _entry_prefix(csv_path: Path) -> str:
+    """File name prefix shared by all cache entries of one export location."""
+    location = hashlib.sha256(str(Path(csv_path).resolve()).encode("utf-8")).hexdigest()
+    return f"{Path(csv_path).stem}-{location[:8]}"
+
+
+def cache_path(csv_path: Path, cache_dir: Path, key: str) -> Path:
+    """Location of the cache entry for an export and key."""
+    return Path(cache_dir) / f"{_entry_prefix(csv_path)}-{key[:24]}.feather"
+
+
+@traced
+def read_cached_long_data(
+    csv_path: Path, cache_dir: Path, *inputs: Any
+) -> Optional[pd.DataFrame]:
+    """
+    Load the cleaned long-format data for an export from the cache.
+
+    Args:
+        csv_path: Raw survey export
+        cache_dir: Cache directory
+        *inputs: Other inputs included in the cache key
+
+    Returns:
+        The cached dataframe, or None on a cache miss
+    """
+    import pyarrow.feather as feather
+
+    path = cache_path(csv_path, cache_dir, cache_key(csv_path, *inputs))
+    if not path.exists():
+        return None
+    return feather.read_table(path, memory_map=True).to_pandas()
+
+
+@traced
+def write_cached_long_data(
+    long_df: pd.DataFrame, csv_path: Path, cache_dir: Path, *inputs: Any
+) -> Path:
+    """
+    Store cleaned long-format data in the cache, replacing stale entries.
+
+    Args:
+        long_df: Cleaned long-format dataframe
+        csv_path: Raw survey export it was derived from
+        cache_dir: Cache directory
+        *inputs: Other inputs included in the cache key
+
+    Returns:
+        Path of the cache entry
+    """
+    import pyarrow.feather as feather
+
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    path = cache_path(csv_path, cache_dir, cache_key(csv_path, *inputs))
+
+    table = long_df.astype(
+        {col: "category" for col in CATEGORICAL_COLUMNS if col in long_df}
+    )
+    tmp_path = path.with_suffix(".tmp")
+    feather.write_feather(table, tmp_path, compression="uncompressed")
+    os.replace(tmp_path, path)
+
+    for stale in cache_dir.glob(f"{_entry_prefix(csv_path)}-*.feather"):
+        if stale != path:
+            stale.unlink()
+
+    return path
+
+
+def warn_cache_unavailable() -> None:
+    """Warn that caching was requested but pyarrow is not installed."""
+    warnings.warn(
+        "pyarrow is not installed; the long-format cache is disabled. "
+        "Install it with `pip install medevac-interrater[arrow]`.",
+        stacklevel=3,
+    )
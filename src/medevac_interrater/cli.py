@@ -0,0 +1,435 @@
+"""
+Command-line interface: ``medevac-irr <command>``.
+
+Commands:
+    explore   Show the column layout of a survey export
+    process   Clean and reshape an export for R (CSV and Arrow hand-off)
+    analyze   Compute the agreement and confidence tables (one export or a batch)
+    bench     Run the benchmark suite and compare it with a baseline
+    pipeline  Rerun the stale stages of the Python → R → Quarto workflow
+
+Only the standard library is imported at startup; pandas, numpy and the
+analysis modules are imported inside the commands that use them, so
+``--help`` and header inspection return immediately.
+"""
+
+import argparse
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from . import __version__
+from .benchmark_settings import DEFAULT_THRESHOLD, SIZE_TIERS
+
+DEFAULT_DATA_DIR = Path("data")
+DEFAULT_OUTPUT_DIR = Path("output")
+DEFAULT_BASELINE = Path("benchmarks") / "baseline.json"
+
+
+def _cache_dir(args: argparse.Namespace) -> Optional[Path]:
+    """Long-format cache directory, or None if caching is disabled."""
+    if args.no_cache:
+        return None
+    return args.cache_dir or args.data_dir / "processed" / ".cache"
+
+
+@contextmanager
+def _maybe_tracing(args: argparse.Namespace) -> Iterator[None]:
+    """Trace the block when any tracing flag is set, and report the trace."""
+    if args.trace is None and not args.timings and not args.trace_memory:
+        yield
+        return
+
+    from .instrumentation import format_summary, tracing
+
+    with tracing(args.trace, trace_memory=args.trace_memory) as trace:
+        yield
+    if args.timings:
+        print(format_summary(trace))
+    if args.trace is not None:
+        print(f"Trace saved to: {args.trace}")
+
+
+def cmd_explore(args: argparse.Namespace) -> int:
+    """Print the schema inferred from an export's header."""
+    from .schema import infer_schema, read_header, schema_path
+
+    columns = read_header(args.export)
+    schema = infer_schema(columns)
+    decision_cols, confidence_cols = schema.resolve()
+
+    print(f"{args.export}: {len(columns)} columns")
+    print(f"ID column: {schema.id_column or '(none)'}")
+    print(f"Questions: {len(schema.questions)}")
+    for q_num in schema.questions:
+        confidence = "confidence" if q_num in confidence_cols else "no confidence"
+        repeats = len(schema.candidates[q_num])
+        note = f", {repeats} candidate columns" if repeats > 1 else ""
+        text = " ".join(decision_cols[q_num].split())
+        print(f"  {q_num:3d}. {text[:70]} ({confidence}{note})")
+
+    if args.columns:
+        other = (
+            set(columns) - set(decision_cols.values()) - set(confidence_cols.values())
+        )
+        print("Other columns:")
+        for col in columns:
+            if col in other:
+                print(f"  - {col}")
+
+    if args.values:
+        import pandas as pd
+
+        df = pd.read_csv(args.export, usecols=list(decision_cols.values()), dtype=str)
+        print("Answers:")
+        for q_num in schema.questions:
+            counts = df[decision_cols[q_num]].value_counts()
+            answers = ", ".join(f"{value[:40]} ({n})" for value, n in counts.items())
+            print(f"  {q_num:3d}. {answers}")
+
+    if args.save_schema:
+        schema.save(schema_path(args.export))
+        print(f"Schema saved to: {schema_path(args.export)}")
+    return 0
+
+
+def cmd_process(args: argparse.Namespace) -> int:
+    """Write the cleaned long-format table and its Arrow hand-off file."""
+    from .cache import pyarrow_available
+    from .data_loader import load_long_data
+    from .handoff import HANDOFF_FILENAME, write_handoff
+    from .physicians import PhysicianDimension
+    from .instrumentation import span
+
+    output_dir = args.output or args.data_dir / "processed"
+    output_dir.mkdir(parents=True, exist_ok=True)
+    output_file = output_dir / "survey_data_processed.csv"
+
+    with _maybe_tracing(args):
+        long_df = load_long_data(args.data_dir, cache_dir=_cache_dir(args))
+        with span("write_csv", rows=len(long_df), path=str(output_file)):
+            long_df.to_csv(output_file, index=False)
+        handoff_file = output_dir / HANDOFF_FILENAME
+        if pyarrow_available():
+            physicians = PhysicianDimension.from_files(args.data_dir)
+            write_handoff(long_df, handoff_file, physicians)
+
+    print(
+        f"{len(long_df)} responses from {long_df['physician_id'].nunique()} physicians "
+        f"on {long_df['question'].nunique()} questions"
+    )
+    print(f"Saved to: {output_file}")
+    if handoff_file.exists():
+        print(f"Arrow hand-off saved to: {handoff_file}")
+    return 0
+
+
+def cmd_analyze(args: argparse.Namespace) -> int:
+    """Analyze one export, or every export of a batch."""
+    if args.batch is not None:
+        from .batch import SUMMARY_FILENAME, run_batch
+
+        def report(done: int, total: int, row: Dict[str, Any]) -> None:
+            detail = f"{row['seconds']:.2f}s" if row["status"] == "ok" else row["error"]
+            print(f"[{done}/{total}] {row['status']} {row['survey']} ({detail})")
+
+        with _maybe_tracing(args):
+            summary = run_batch(
+                args.batch,
+                args.output,
+                n_jobs=args.jobs,
+                cache_dir=_cache_dir(args),
+                progress=report,
+            )
+        if summary.empty:
+            print(f"No exports matched {args.batch}")
+            return 1
+        n_failed = int((summary["status"] != "ok").sum())
+        print(f"Analyzed {len(summary) - n_failed}/{len(summary)} exports")
+        print(f"Summary saved to: {args.output / SUMMARY_FILENAME}")
+        return 1 if n_failed else 0
+
+    from .batch import analyze_export
+
+    export = args.export or args.data_dir / "survey_results.csv"
+    with _maybe_tracing(args):
+        summary = analyze_export(export, args.output, cache_dir=_cache_dir(args))
+    for name, value in summary.items():
+        print(
+            f"{name}: {value:.3f}" if isinstance(value, float) else f"{name}: {value}"
+        )
+    print(f"Results saved to: {args.output}")
+    return 0
+
+
+def cmd_bench(args: argparse.Namespace) -> int:
+    """Run the benchmarks, record or compare with the baseline."""
+    from .benchmark import (
+        compare_to_baseline,
+        load_baseline,
+        run_benchmarks,
+        save_baseline,
+    )
+
+    results = run_benchmarks(tiers=args.tiers, names=args.only, repeat=args.repeat)
+
+    if args.record:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        save_baseline(results, args.baseline)
+        print(results.to_string(index=False))
+        print(f"\nBaseline saved to: {args.baseline}")
+        return 0
+
+    if not args.baseline.exists():
+        print(results.to_string(index=False))
+        print(f"\nNo baseline at {args.baseline}; run with --record to create one")
+        return 0
+
+    compared = compare_to_baseline(
+        results, load_baseline(args.baseline), threshold=args.threshold
+    )
+    print(compared.drop(columns=["n_physicians"]).to_string(index=False))
+    regressed = compared[compared["regressed"]]
+    if len(regressed):
+        print(
+            f"\n{len(regressed)} benchmark(s) slower than {args.threshold}x baseline:"
+        )
+        for row in regressed.itertuples():
+            print(f"   {row.benchmark} ({row.tier}): {row.ratio:.2f}x")
+        return 1
+    print("\nNo regressions")
+    return 0
+
+
+def cmd_pipeline(args: argparse.Namespace) -> int:
+    """Bring the workflow's outputs up to date."""
+    from .pipeline import Pipeline, default_stages
+
+    stages = default_stages(
+        engine=args.engine, reports=args.reports, n_boot=args.n_boot, seed=args.seed
+    )
+    pipeline = Pipeline(stages, root=args.root)
+
+    if args.dry_run:
+        stale = pipeline.plan(args.stages or None, force=args.force)
+        for name in stale:
+            print(f"would run {name}")
+        if not stale:
+            print("Everything is up to date")
+        return 0
+
+    def report(row: Dict[str, Any]) -> None:
+        detail = f" ({row['seconds']:.2f}s)" if row["status"] == "ran" else ""
+        error = f": {row['error']}" if row["error"] else ""
+        print(f"{row['status']:>7} {row['stage']}{detail}{error}")
+
+    summary = pipeline.run(
+        args.stages or None, jobs=args.jobs, force=args.force, progress=report
+    )
+    return 1 if summary["status"].isin(["failed", "skipped"]).any() else 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """The argument parser of all commands."""
+    parser = argparse.ArgumentParser(
+        prog="medevac-irr",
+        description="Interrater reliability analysis of medevac survey exports.",
+    )
+    parser.add_argument(
+        "--version", action="version", version=f"%(prog)s {__version__}"
+    )
+    commands = parser.add_subparsers(dest="command", metavar="COMMAND", required=True)
+
+    loading = argparse.ArgumentParser(add_help=False)
+    loading.add_argument(
+        "--data-dir",
+        type=Path,
+        default=DEFAULT_DATA_DIR,
+        help="Directory containing survey_results.csv (default: data/)",
+    )
+    loading.add_argument(
+        "--cache-dir",
+        type=Path,
+        help="Long-format cache (default: <data-dir>/processed/.cache)",
+    )
+    loading.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Do not read or write the long-format cache",
+    )
+    loading.add_argument(
+        "--trace",
+        type=Path,
+        metavar="PATH",
+        help="Write a JSON trace of per-stage timings",
+    )
+    loading.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="Also trace peak Python allocations per stage (slower)",
+    )
+    loading.add_argument(
+        "--timings", action="store_true", help="Print a per-stage timing summary"
+    )
+
+    explore = commands.add_parser("explore", help="Show the column layout of an export")
+    explore.add_argument(
+        "export",
+        type=Path,
+        nargs="?",
+        default=DEFAULT_DATA_DIR / "survey_results.csv",
+        help="Survey export (default: data/survey_results.csv)",
+    )
+    explore.add_argument(
+        "--columns", action="store_true", help="Also list the non-question columns"
+    )
+    explore.add_argument(
+        "--values",
+        action="store_true",
+        help="Also count the answers to each question (reads the data)",
+    )
+    explore.add_argument(
+        "--save-schema",
+        action="store_true",
+        help="Save the inferred schema next to the export",
+    )
+    explore.set_defaults(func=cmd_explore)
+
+    process = commands.add_parser(
+        "process", parents=[loading], help="Clean and reshape the export for R"
+    )
+    process.add_argument(
+        "--output", type=Path, help="Output directory (default: <data-dir>/processed)"
+    )
+    process.set_defaults(func=cmd_process)
+
+    analyze = commands.add_parser(
+        "analyze", parents=[loading], help="Compute agreement and confidence tables"
+    )
+    analyze.add_argument(
+        "export",
+        type=Path,
+        nargs="?",
+        help="Survey export (default: <data-dir>/survey_results.csv)",
+    )
+    analyze.add_argument(
+        "--batch",
+        metavar="SOURCE",
+        help="Directory or glob of exports to analyze instead",
+    )
+    analyze.add_argument(
+        "--output",
+        type=Path,
+        default=DEFAULT_OUTPUT_DIR,
+        help="Output directory (default: output/)",
+    )
+    analyze.add_argument(
+        "--jobs", type=int, help="Worker processes for --batch (default: all CPUs)"
+    )
+    analyze.set_defaults(func=cmd_analyze)
+
+    bench = commands.add_parser("bench", help="Run the benchmark suite")
+    bench.add_argument(
+        "--tiers",
+        nargs="+",
+        default=["small", "medium"],
+        choices=list(SIZE_TIERS),
+        help="Size tiers to run",
+    )
+    bench.add_argument(
+        "--only", nargs="+", metavar="NAME", help="Run only these benchmarks"
+    )
+    bench.add_argument(
+        "--repeat", type=int, default=5, help="Timed calls per benchmark (default: 5)"
+    )
+    bench.add_argument(
+        "--baseline",
+        type=Path,
+        default=DEFAULT_BASELINE,
+        help="Baseline file (default: benchmarks/baseline.json)",
+    )
+    bench.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="Allowed slowdown ratio (default: %(default)s)",
+    )
+    bench.add_argument(
+        "--record", action="store_true", help="Save the results as the new baseline"
+    )
+    bench.set_defaults(func=cmd_bench)
+
+    pipeline = commands.add_parser("pipeline", help="Rerun the stale workflow stages")
+    pipeline.add_argument(
+        "stages",
+        nargs="*",
+        metavar="STAGE",
+        help="Stages to bring up to date, with their dependencies " "(default: all)",
+    )
+    pipeline.add_argument(
+        "--root",
+        type=Path,
+        default=Path("."),
+        help="Project directory (default: current directory)",
+    )
+    pipeline.add_argument(
+        "--engine",
+        choices=["python", "r"],
+        default="python",
+        help="Compute the metric tables in Python or R (default: python)",
+    )
+    pipeline.add_argument(
+        "--reports",
+        nargs="*",
+        metavar="NAME",
+        default=[
+            "final_report2",
+            "02_descriptive_statistics",
+            "03_comparative_analysis",
+        ],
+        help="Quarto documents to render (default: all three)",
+    )
+    pipeline.add_argument(
+        "--n-boot",
+        type=int,
+        default=1000,
+        help="Bootstrap replicates of the model stage (default: 1000)",
+    )
+    pipeline.add_argument("--seed", type=int, default=0, help="Bootstrap seed")
+    pipeline.add_argument(
+        "--jobs", type=int, help="Concurrent stages (default: all CPUs)"
+    )
+    pipeline.add_argument(
+        "--force",
+        action="store_true",
+        help="Rerun the selected stages even if up to date",
+    )
+    pipeline.add_argument(
+        "--dry-run", action="store_true", help="List the stages that would run"
+    )
+    pipeline.set_defaults(func=cmd_pipeline)
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Run the command line.
+
+    Args:
+        argv: Arguments (defaults to ``sys.argv[1:]``)
+
+    Returns:
+        Process exit code
+    """
+    args = build_parser().parse_args(argv)
+    try:
+        return args.func(args)
+    except (FileNotFoundError, ValueError) as exc:
+        print(f"medevac-irr {args.command}: {exc}", file=sys.stderr)
+        return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
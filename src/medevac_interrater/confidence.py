@@ -0,0 +1,443 @@
+"""
+Reliability and derived features of the 1–10 confidence ratings.
+
+The physician × vignette confidence matrix is summarized with intraclass
+correlations (vignettes as subjects, physicians as raters) and with
+linear- or quadratic-weighted agreement, which gives partial credit to
+nearby ratings. All statistics are array operations over the matrix or
+its vignette × rating count matrix, with leading axes treated as a batch.
+
+The per-response features used by the models (confidence centered within
+physician, the physician's mean relative to the grand mean, and
+confidence tertiles) are grouped transforms of the long frame.
+"""
+
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .analysis import _by_question_overall_class, _group_sum, question_class_codes
+from .instrumentation import traced
+
+CONFIDENCE_LEVELS = tuple(range(1, 11))
+WEIGHT_SCHEMES = ("linear", "quadratic")
+MISSING_POLICIES = ("subjects", "raters")
+TERTILE_LABELS = ["Low", "Medium", "High"]
+
+
+def build_confidence_matrix(
+    df: pd.DataFrame,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Build the question × physician matrix of confidence ratings.
+
+    Args:
+        df: Long-format dataframe with columns: physician_id, question,
+            confidence
+
+    Returns:
+        Tuple of (ratings, questions, physicians) where ratings is a float
+        array of shape (n_questions, n_physicians) with NaN for missing
+        ratings. A repeated response keeps the last rating.
+    """
+    df = df.drop_duplicates(subset=["physician_id", "question"], keep="last")
+    q_codes, questions = pd.factorize(df["question"], sort=True)
+    p_codes, physicians = pd.factorize(df["physician_id"], sort=True)
+
+    ratings = np.full((len(questions), len(physicians)), np.nan)
+    ratings[q_codes, p_codes] = df["confidence"].to_numpy(
+        dtype=np.float64, na_value=np.nan
+    )
+    return ratings, np.asarray(questions), np.asarray(physicians)
+
+
+def confidence_count_matrix(
+    ratings: np.ndarray, levels: Sequence[int] = CONFIDENCE_LEVELS
+) -> np.ndarray:
+    """
+    Count the ratings of each subject at each confidence level.
+
+    Args:
+        ratings: Array of shape (..., n_subjects, n_raters), NaN where missing
+        levels: Possible rating values, in order
+
+    Returns:
+        Array of shape (..., n_subjects, n_levels)
+    """
+    levels = np.asarray(levels, dtype=np.float64)
+    return (ratings[..., None] == levels).sum(axis=-2).astype(np.float64)
+
+
+def agreement_weights(n_levels: int, scheme: str = "linear") -> np.ndarray:
+    """
+    Agreement weights between ordinal levels.
+
+    Args:
+        n_levels: Number of rating levels
+        scheme: "linear" (1 - |a - b| / (K - 1)) or "quadratic"
+            (1 - ((a - b) / (K - 1)) ** 2)
+
+    Returns:
+        Symmetric (n_levels, n_levels) matrix with ones on the diagonal
+    """
+    if scheme not in WEIGHT_SCHEMES:
+        raise ValueError(f"scheme must be one of {WEIGHT_SCHEMES}, got {scheme!r}")
+    distance = np.abs(np.subtract.outer(np.arange(n_levels), np.arange(n_levels)))
+    distance = distance / max(n_levels - 1, 1)
+    return 1 - (distance if scheme == "linear" else distance**2)
+
+
+def _weighted_pair_terms(
+    counts: np.ndarray, weights: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Weighted agreement and number of ordered rater pairs per subject."""
+    m = counts.sum(axis=-1)
+    agreement = np.einsum("...i,ij,...j->...", counts, weights, counts) - m
+    return agreement, m * (m - 1)
+
+
+def weighted_agreement_from_counts(
+    counts: np.ndarray, scheme: str = "linear", groups: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Weighted agreement from a subject × level count matrix.
+
+    The mean agreement weight over all pairs of ratings of the same
+    subject, with pairs pooled over the subjects of each group (as
+    percentage agreement pools agreeing pairs).
+
+    Args:
+        counts: Count array of shape (..., n_subjects, n_levels)
+        scheme: Weighting scheme, see :func:`agreement_weights`
+        groups: Optional integer group code per subject. If None, all
+            subjects form a single group.
+
+    Returns:
+        Array of shape (..., n_groups) (NaN where a group has no pairs)
+    """
+    counts = np.asarray(counts, dtype=np.float64)
+    if groups is None:
+        groups = np.zeros(counts.shape[-2], dtype=np.intp)
+    groups = np.asarray(groups)
+    n_groups = int(groups.max()) + 1 if len(groups) else 0
+
+    agreement, pairs = _weighted_pair_terms(
+        counts, agreement_weights(counts.shape[-1], scheme)
+    )
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return _group_sum(agreement, groups, n_groups) / _group_sum(
+            pairs, groups, n_groups
+        )
+
+
+def weighted_kappa_from_counts(
+    counts: np.ndarray, scheme: str = "linear", groups: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Multi-rater weighted kappa from a subject × level count matrix.
+
+    Fleiss' Kappa with agreement weights: the observed agreement is the
+    mean over subjects of their weighted pair agreement, and chance
+    agreement is ``p' W p`` for the pooled level proportions ``p`` of the
+    group. With identity weights this is Fleiss' Kappa.
+
+    Args:
+        counts: Count array of shape (..., n_subjects, n_levels)
+        scheme: Weighting scheme, see :func:`agreement_weights`
+        groups: Optional integer group code per subject. If None, all
+            subjects form a single group.
+
+    Returns:
+        Array of shape (..., n_groups) (NaN where chance agreement is 1 or
+        the group has no subject with two ratings)
+    """
+    counts = np.asarray(counts, dtype=np.float64)
+    if groups is None:
+        groups = np.zeros(counts.shape[-2], dtype=np.intp)
+    groups = np.asarray(groups)
+    n_groups = int(groups.max()) + 1 if len(groups) else 0
+    weights = agreement_weights(counts.shape[-1], scheme)
+
+    agreement, pairs = _weighted_pair_terms(counts, weights)
+    usable = pairs > 0
+    with np.errstate(invalid="ignore", divide="ignore"):
+        P_i = np.where(usable, agreement / pairs, 0.0)
+        P_bar = _group_sum(P_i, groups, n_groups) / _group_sum(
+            usable.astype(np.float64), groups, n_groups
+        )
+
+        level_totals = _group_sum(
+            np.swapaxes(counts * usable[..., None], -1, -2), groups, n_groups
+        )
+        p = level_totals / level_totals.sum(axis=-2, keepdims=True)
+        P_e = np.einsum("...ig,ij,...jg->...g", p, weights, p)
+
+        kappa = (P_bar - P_e) / (1 - P_e)
+
+    return np.where(np.isclose(P_e, 1), np.nan, kappa)
+
+
+def icc_from_ratings(ratings: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Shrout–Fleiss intraclass correlations of a complete rating matrix.
+
+    From the two-way ANOVA mean squares of subjects (MSR), raters (MSC),
+    residual (MSE) and within subjects (MSW), with k raters and n subjects:
+
+    - ICC(1) = (MSR - MSW) / (MSR + (k - 1) MSW), one-way random
+    - ICC(2,1) = (MSR - MSE) / (MSR + (k - 1) MSE + k (MSC - MSE) / n),
+      two-way random, absolute agreement
+    - ICC(3,1) = (MSR - MSE) / (MSR + (k - 1) MSE), two-way mixed,
+      consistency
+
+    These match ``irr::icc`` with ``unit = "single"``.
+
+    Args:
+        ratings: Array of shape (..., n_subjects, n_raters); any missing
+            rating makes the corresponding results NaN
+
+    Returns:
+        Dictionary of icc1, icc2_1 and icc3_1, each of shape (...)
+    """
+    ratings = np.asarray(ratings, dtype=np.float64)
+    n, k = ratings.shape[-2:]
+    grand_mean = ratings.mean(axis=(-2, -1), keepdims=True)
+    deviations = ratings - grand_mean
+
+    ss_total = (deviations**2).sum(axis=(-2, -1))
+    ss_subjects = k * (deviations.mean(axis=-1) ** 2).sum(axis=-1)
+    ss_raters = n * (deviations.mean(axis=-2) ** 2).sum(axis=-1)
+    ss_error = ss_total - ss_subjects - ss_raters
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ms_subjects = ss_subjects / (n - 1)
+        ms_raters = ss_raters / (k - 1)
+        ms_within = (ss_total - ss_subjects) / (n * (k - 1))
+        ms_error = ss_error / ((n - 1) * (k - 1))
+
+        return {
+            "icc1": (ms_subjects - ms_within) / (ms_subjects + (k - 1) * ms_within),
+            "icc2_1": (ms_subjects - ms_error)
+            / (ms_subjects + (k - 1) * ms_error + k * (ms_raters - ms_error) / n),
+            "icc3_1": (ms_subjects - ms_error) / (ms_subjects + (k - 1) * ms_error),
+        }
+
+
+def complete_ratings(
+    ratings: np.ndarray, missing: str = "subjects"
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Drop subjects or raters so that a rating matrix has no missing cells.
+
+    Args:
+        ratings: Array of shape (n_subjects, n_raters), NaN where missing
+        missing: "subjects" drops subjects with a missing rating (as
+            ``irr::icc`` does); "raters" drops raters with a missing rating
+
+    Returns:
+        Tuple of (complete, kept_subjects, kept_raters) with boolean masks
+        of the subjects and raters kept
+    """
+    if missing not in MISSING_POLICIES:
+        raise ValueError(f"missing must be one of {MISSING_POLICIES}, got {missing!r}")
+    observed = ~np.isnan(ratings)
+    kept_subjects = np.ones(ratings.shape[0], dtype=bool)
+    kept_raters = np.ones(ratings.shape[1], dtype=bool)
+    if missing == "subjects":
+        kept_subjects = observed.all(axis=1)
+    else:
+        kept_raters = observed.all(axis=0)
+    return ratings[np.ix_(kept_subjects, kept_raters)], kept_subjects, kept_raters
+
+
+@traced
+def calculate_confidence_icc(
+    df: pd.DataFrame, missing: str = "subjects"
+) -> pd.DataFrame:
+    """
+    Intraclass correlations of confidence, overall and per vignette class.
+
+    Vignettes are the subjects and physicians the raters, so the ICCs
+    measure how consistently physicians rank vignettes by confidence.
+    Missing ratings are removed by dropping whole subjects or raters, see
+    :func:`complete_ratings`.
+
+    Args:
+        df: Long-format dataframe with columns: physician_id, question,
+            confidence, vignette_class
+        missing: Missing-rating policy, "subjects" or "raters"
+
+    Returns:
+        DataFrame with columns: level, unit, n_subjects, n_raters, icc1,
+        icc2_1, icc3_1
+    """
+    ratings, questions, _ = build_confidence_matrix(df)
+    class_codes, classes = question_class_codes(df, questions)
+
+    groups = [("overall", "overall", np.ones(len(questions), dtype=bool))]
+    groups += [
+        ("class", label, class_codes == code) for code, label in enumerate(classes)
+    ]
+
+    rows = []
+    for level, unit, in_group in groups:
+        complete, _, _ = complete_ratings(ratings[in_group], missing)
+        n_subjects, n_raters = complete.shape
+        if n_subjects >= 2 and n_raters >= 2:
+            iccs = {
+                name: float(value) for name, value in icc_from_ratings(complete).items()
+            }
+        else:
+            iccs = {"icc1": np.nan, "icc2_1": np.nan, "icc3_1": np.nan}
+        rows.append(
+            {
+                "level": level,
+                "unit": unit,
+                "n_subjects": n_subjects,
+                "n_raters": n_raters,
+                **iccs,
+            }
+        )
+    return pd.DataFrame(rows)
+
+
+@traced
+def calculate_weighted_confidence_agreement(
+    df: pd.DataFrame, scheme: str = "linear"
+) -> pd.DataFrame:
+    """
+    Weighted agreement and kappa of confidence per question, class and overall.
+
+    Missing ratings simply contribute no pairs.
+
+    Args:
+        df: Long-format dataframe with columns: physician_id, question,
+            confidence, vignette_class
+        scheme: "linear" or "quadratic" agreement weights
+
+    Returns:
+        DataFrame with columns: level, unit, weighted_agreement,
+        weighted_kappa
+    """
+    ratings, questions, _ = build_confidence_matrix(df)
+    counts = confidence_count_matrix(ratings)
+    class_codes, classes = question_class_codes(df, questions)
+
+    columns = {}
+    for statistic, name in [
+        (weighted_agreement_from_counts, "weighted_agreement"),
+        (weighted_kappa_from_counts, "weighted_kappa"),
+    ]:
+        by_question, overall, by_class = _by_question_overall_class(
+            lambda counts, groups: statistic(counts, scheme, groups),
+            counts,
+            questions,
+            class_codes,
+            classes,
+            name,
+        )
+        columns[name] = np.concatenate(
+            [by_question.to_numpy(), by_class.to_numpy(), [overall]]
+        )
+
+    return pd.DataFrame(
+        {
+            "level": ["question"] * len(questions)
+            + ["class"] * len(classes)
+            + ["overall"],
+            "unit": list(questions) + list(classes) + ["overall"],
+            **columns,
+        }
+    )
+
+
+def center_within_physician(df: pd.DataFrame, column: str = "confidence") -> pd.Series:
+    """
+    Deviation of each rating from the physician's own mean rating.
+
+    Args:
+        df: Long-format dataframe with columns: physician_id and ``column``
+        column: Column to center
+
+    Returns:
+        Series aligned with ``df`` (NaN where the rating is missing)
+    """
+    return df[column] - df.groupby("physician_id")[column].transform("mean")
+
+
+def physician_mean_deviation(df: pd.DataFrame, column: str = "confidence") -> pd.Series:
+    """
+    The physician's mean rating relative to the grand mean, per response.
+
+    Args:
+        df: Long-format dataframe with columns: physician_id and ``column``
+        column: Column to average
+
+    Returns:
+        Series aligned with ``df``
+    """
+    return df.groupby("physician_id")[column].transform("mean") - df[column].mean()
+
+
+def tertiles_from_percentiles(percentile: np.ndarray) -> pd.Categorical:
+    """
+    Split percentile ranks at 1/3 and 2/3 into Low, Medium and High.
+
+    Args:
+        percentile: Percentile ranks in (0, 1], NaN where unranked
+
+    Returns:
+        Ordered categorical of :data:`TERTILE_LABELS` (NaN where unranked)
+    """
+    codes = np.clip(np.ceil(percentile * 3) - 1, 0, 2)
+    codes = np.where(np.isnan(codes), -1, codes).astype(np.int8)
+    return pd.Categorical.from_codes(codes, categories=TERTILE_LABELS, ordered=True)
+
+
+def confidence_tertiles(df: pd.DataFrame, within_physician: bool = True) -> pd.Series:
+    """
+    Assign each confidence rating to a Low, Medium or High tertile.
+
+    Ratings are ranked by their percentile (ties share their average rank)
+    within each physician, or across all responses, and split at 1/3 and
+    2/3.
+
+    Args:
+        df: Long-format dataframe with columns: physician_id, confidence
+        within_physician: Rank within each physician's own ratings
+
+    Returns:
+        Categorical series aligned with ``df`` (NaN where confidence is
+        missing)
+    """
+    confidence = df["confidence"]
+    if within_physician:
+        percentile = confidence.groupby(df["physician_id"]).rank(pct=True)
+    else:
+        percentile = confidence.rank(pct=True)
+    return pd.Series(
+        tertiles_from_percentiles(percentile.to_numpy()),
+        index=df.index,
+        name="confidence_tertile",
+    )
+
+
+@traced
+def add_confidence_features(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Add the derived confidence columns used by the models.
+
+    Args:
+        df: Long-format dataframe with columns: physician_id, confidence
+
+    Returns:
+        Copy of ``df`` with added columns confidence_within (deviation from
+        the physician's mean), confidence_between (physician mean minus the
+        grand mean) and confidence_tertile (within-physician tertile)
+    """
+    return df.assign(
+        confidence_within=center_within_physician(df),
+        confidence_between=physician_mean_deviation(df),
+        confidence_tertile=confidence_tertiles(df),
+    )
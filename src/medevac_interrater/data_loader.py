@@ -2,12 +2,51 @@
 Data loading and cleaning module for medevac interrater reliability study.
 """
 
+import warnings
 import pandas as pd
 from pathlib import Path
-from typing import Dict, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
 import numpy as np
 
+from .cache import (
+    pyarrow_available,
+    read_cached_long_data,
+    warn_cache_unavailable,
+    write_cached_long_data,
+)
+from .instrumentation import traced
+from .schema import SurveySchema, infer_schema, load_survey_schema
 
+LONG_FORMAT_COLUMNS = [
+    "physician_id",
+    "question",
+    "vignette_label",
+    "decision",
+    "confidence",
+    "question_type",
+    "vignette_class",
+]
+
+VIGNETTE_FIELDS = ["vignette_label", "question_type", "vignette_class"]
+
+# Substrings of raw answers mapped to standardized decisions, checked in order
+DECISION_MAP = {
+    "activate medevac immediately": "Medevac",
+    "activate medevac": "Medevac",
+    "medevac immediately": "Medevac",
+    "commercial flight next available": "Commercial",
+    "commercial flight": "Commercial",
+    "next commercial flight": "Commercial",
+    "remain in village (for ongoing observation or treatment, if necessary)": "Remain",
+    "remain in village": "Remain",
+    "remain": "Remain",
+}
+
+# Categories of the long-format decision column
+DECISIONS = sorted(set(DECISION_MAP.values()))
+
+
+@traced
 def load_survey_data(data_dir: Path) -> pd.DataFrame:
     """
     Load the raw survey results CSV.
@@ -67,23 +106,7 @@ def extract_decision_columns(df: pd.DataFrame) -> Dict[int, str]:
     Returns:
         Dictionary mapping question number to column name
     """
-    decision_cols = {}
-    for col in df.columns:
-        if col.startswith("Question ") and ":" in col:
-            # Extract question number from column name
-            try:
-                q_num = int(col.split(":")[0].replace("Question ", "").strip())
-                # Prefer columns with actual data (non-null values)
-                if q_num not in decision_cols:
-                    decision_cols[q_num] = col
-                else:
-                    # If we already have one, prefer the one with more data
-                    current_non_null = df[decision_cols[q_num]].notna().sum()
-                    new_non_null = df[col].notna().sum()
-                    if new_non_null > current_non_null:
-                        decision_cols[q_num] = col
-            except ValueError:
-                continue
+    decision_cols, _ = infer_schema(df.columns).resolve(df)
     return decision_cols
 
 
@@ -91,35 +114,15 @@ def extract_confidence_columns(df: pd.DataFrame) -> Dict[int, str]:
     """
     Extract confidence rating columns from the dataframe.
     
+    Confidence columns appear right after each question column.
+    
     Args:
         df: Raw survey dataframe
         
     Returns:
         Dictionary mapping question number to confidence column name
     """
-    confidence_cols = {}
-    base_pattern = "How confident are you of this decision"
-    
-    for col in df.columns:
-        if base_pattern in col:
-            # Try to find corresponding question number
-            # Confidence columns follow decision columns
-            # We'll need to match by position or use a different strategy
-            pass
-    
-    # Alternative: match by position
-    # Confidence columns appear right after each question column
-    question_cols = extract_decision_columns(df)
-    all_cols = list(df.columns)
-    
-    for q_num, q_col in question_cols.items():
-        q_idx = all_cols.index(q_col)
-        # Next column should be confidence
-        if q_idx + 1 < len(all_cols):
-            conf_col = all_cols[q_idx + 1]
-            if base_pattern in conf_col:
-                confidence_cols[q_num] = conf_col
-    
+    _, confidence_cols = infer_schema(df.columns).resolve(df)
     return confidence_cols
 
 
@@ -139,27 +142,18 @@ def clean_decision_value(value: str) -> str:
     value = str(value).strip()
     
     # Map to standardized values
-    decision_map = {
-        "activate medevac immediately": "Medevac",
-        "activate medevac": "Medevac",
-        "medevac immediately": "Medevac",
-        "commercial flight next available": "Commercial",
-        "commercial flight": "Commercial",
-        "next commercial flight": "Commercial",
-        "remain in village (for ongoing observation or treatment, if necessary)": "Remain",
-        "remain in village": "Remain",
-        "remain": "Remain",
-    }
-    
     value_lower = value.lower()
-    for key, standardized in decision_map.items():
+    for key, standardized in DECISION_MAP.items():
         if key in value_lower:
             return standardized
     
     return value  # Return as-is if no match
 
 
-def reshape_to_long_format(df: pd.DataFrame) -> pd.DataFrame:
+@traced
+def reshape_to_long_format(
+    df: pd.DataFrame, schema: Optional[SurveySchema] = None
+) -> pd.DataFrame:
     """
     Reshape survey data from wide to long format.
     
@@ -167,85 +161,346 @@ def reshape_to_long_format(df: pd.DataFrame) -> pd.DataFrame:
     
     Args:
         df: Raw survey dataframe
+        schema: Column layout of the export. Inferred from the header if None.
         
     Returns:
         Long-format dataframe with columns:
         - physician_id: Physician identifier
-        - question: Question number (1-20)
-        - decision: Decision made (Medevac, Commercial, Remain)
+        - question: Question number (1-20), int8
+        - decision: Decision made (Medevac, Commercial, Remain), categorical
         - confidence: Confidence rating (1-10)
+        - vignette_label, question_type, vignette_class: categorical
+        
+        Blank answers are skipped; answers that map to no decision are
+        dropped with a warning listing them.
+    """
+    if schema is None:
+        schema = infer_schema(df.columns)
+    decision_cols, confidence_cols = schema.resolve(df)
+    
+    return _reshape_columns(df, decision_cols, confidence_cols, schema.id_column)
+
+
+def _reshape_columns(
+    df: pd.DataFrame,
+    decision_cols: Dict[int, str],
+    confidence_cols: Dict[int, str],
+    id_column: Optional[str],
+) -> pd.DataFrame:
+    """
+    Reshape the given decision and confidence columns to long format.
+    
+    Args:
+        df: Raw survey dataframe (or a chunk of one)
+        decision_cols: Mapping of question number to decision column
+        confidence_cols: Mapping of question number to confidence column
+        id_column: Physician ID column, or None to use the row index
+        
+    Returns:
+        Long-format dataframe with columns LONG_FORMAT_COLUMNS
+    """
+    questions = [q_num for q_num in range(1, 21) if q_num in decision_cols]
+    n_questions = len(questions)
+    
+    if id_column is not None:
+        physician_ids = df[id_column].to_numpy()
+    else:
+        physician_ids = df.index.to_numpy()
+    
+    # Decision and confidence blocks are paired column-by-column, so raveling
+    # both row-major yields one (physician, question) record per cell
+    raw_codes, raw_values = pd.factorize(
+        df[[decision_cols[q_num] for q_num in questions]].to_numpy(dtype=object).ravel()
+    )
+    confidences = (
+        pd.DataFrame(
+            {
+                q_num: (
+                    pd.to_numeric(df[confidence_cols[q_num]], errors="coerce")
+                    if q_num in confidence_cols
+                    else np.nan
+                )
+                for q_num in questions
+            },
+            index=df.index,
+        )
+        .to_numpy(dtype=np.float64)
+        .ravel()
+    )
+    
+    decision_codes = _decision_codes(raw_codes, raw_values)
+    keep = decision_codes >= 0
+    question_index = np.tile(np.arange(n_questions), len(df))[keep]
+    
+    long_df = pd.DataFrame(
+        {
+            "physician_id": np.repeat(physician_ids, n_questions)[keep],
+            "question": np.asarray(questions, dtype=np.int8)[question_index],
+            "decision": pd.Categorical.from_codes(
+                decision_codes[keep], categories=DECISIONS
+            ),
+            "confidence": confidences[keep],
+        }
+    )
+    
+    # Attach vignette info through per-question codes
+    for field, (categories, codes_by_question) in _vignette_attributes().items():
+        long_df[field] = pd.Categorical.from_codes(
+            codes_by_question[questions][question_index], categories=categories
+        )
+    
+    return long_df[LONG_FORMAT_COLUMNS]
+
+
+def _decision_codes(raw_codes: np.ndarray, raw_values: np.ndarray) -> np.ndarray:
+    """
+    Standardize decisions, cleaning each distinct raw answer once.
+    
+    Args:
+        raw_codes: Index into ``raw_values`` per response, -1 where missing
+        raw_values: Distinct raw answers
+        
+    Returns:
+        Index into DECISIONS per response, -1 for missing, blank or
+        unmapped answers. Unmapped answers are reported with a warning.
+    """
+    # The extra trailing slot maps missing responses (-1) to -1
+    lookup = np.full(len(raw_values) + 1, -1, dtype=np.int8)
+    unmapped = []
+    for i, value in enumerate(raw_values):
+        if str(value).strip() == "":
+            continue
+        cleaned = clean_decision_value(value)
+        if cleaned in DECISIONS:
+            lookup[i] = DECISIONS.index(cleaned)
+        else:
+            unmapped.append(i)
+    
+    if unmapped:
+        n_responses = np.bincount(raw_codes[raw_codes >= 0], minlength=len(raw_values))
+        details = ", ".join(f"{raw_values[i]!r} ({n_responses[i]})" for i in unmapped)
+        warnings.warn(
+            f"Dropped responses with unrecognized decisions: {details}", stacklevel=3
+        )
+    
+    return lookup[raw_codes]
+
+
+def _vignette_attributes() -> Dict[str, Tuple[List[str], np.ndarray]]:
+    """
+    Categories and per-question codes of each vignette attribute.
+    
+    Categories cover every question the survey can contain, so frames built
+    from different chunks of an export share them and concatenate as
+    categoricals.
+    
+    Returns:
+        Dictionary mapping attribute name to (categories, codes) where codes
+        is indexed by question number
+    """
+    classification = get_vignette_classification()
+    fallback = {"question_type": "Unknown", "vignette_class": "Unknown"}
+    
+    attributes = {}
+    for field in VIGNETTE_FIELDS:
+        values = [
+            classification.get(q_num, {}).get(field, fallback.get(field, f"Q{q_num}"))
+            for q_num in range(1, 21)
+        ]
+        categories = sorted(set(values))
+        codes = np.full(21, -1, dtype=np.int8)
+        codes[1:] = [categories.index(value) for value in values]
+        attributes[field] = (categories, codes)
+    
+    return attributes
+
+
+def _count_responses(csv_path: Path, columns: List[str], chunksize: int) -> pd.Series:
+    """Count non-missing values per column by streaming only those columns."""
+    non_null = pd.Series(0, index=columns)
+    reader = pd.read_csv(
+        csv_path,
+        usecols=columns,
+        dtype={col: str for col in columns},
+        chunksize=chunksize,
+    )
+    for chunk in reader:
+        non_null = non_null + chunk.notna().sum()
+    return non_null
+
+
+def iter_long_chunks(
+    csv_path: Path,
+    chunksize: int = 50000,
+    schema: Optional[SurveySchema] = None,
+    id_dtype: str = "int64",
+) -> Iterator[pd.DataFrame]:
     """
-    decision_cols = extract_decision_columns(df)
-    confidence_cols = extract_confidence_columns(df)
-    vignette_info = get_vignette_classification()
+    Stream a survey export as long-format chunks.
     
-    records = []
+    Only the ID, decision and confidence columns are parsed, with explicit
+    dtypes, and at most ``chunksize`` respondents are held in memory at a
+    time. Concatenating the chunks gives the same table as
+    :func:`reshape_to_long_format` on the full export.
     
-    for idx, row in df.iterrows():
-        physician_id = row.get("Record ID", idx)
+    Args:
+        csv_path: Path to the survey export
+        chunksize: Number of respondents per chunk
+        schema: Column layout of the export. Loaded from the saved schema or
+            inferred from the header if None.
+        id_dtype: dtype of the physician ID column
         
-        for q_num in range(1, 21):
-            if q_num not in decision_cols:
-                continue
-            
-            decision_col = decision_cols[q_num]
-            decision = row.get(decision_col)
-            
-            # Skip if decision is missing
-            if pd.isna(decision) or str(decision).strip() == "":
-                continue
-            
-            # Get confidence
-            confidence = np.nan
-            if q_num in confidence_cols:
-                conf_col = confidence_cols[q_num]
-                conf_val = row.get(conf_col)
-                try:
-                    confidence = float(conf_val) if pd.notna(conf_val) else np.nan
-                except (ValueError, TypeError):
-                    confidence = np.nan
-            
-            # Clean decision
-            decision_clean = clean_decision_value(decision)
-            
-            # Skip if decision couldn't be cleaned
-            if pd.isna(decision_clean):
-                continue
-            
-            # Get vignette info
-            vignette = vignette_info.get(q_num, {})
-            
-            record = {
-                "physician_id": physician_id,
-                "question": q_num,
-                "vignette_label": vignette.get("vignette_label", f"Q{q_num}"),
-                "decision": decision_clean,
-                "confidence": confidence,
-                "question_type": vignette.get("question_type", "Unknown"),
-                "vignette_class": vignette.get("vignette_class", "Unknown"),
-            }
-            
-            records.append(record)
-    
-    long_df = pd.DataFrame(records)
+    Yields:
+        Long-format dataframes with columns LONG_FORMAT_COLUMNS
+    """
+    csv_path = Path(csv_path)
+    if schema is None:
+        header = pd.read_csv(csv_path, nrows=0).columns
+        schema = load_survey_schema(csv_path, header)
+    
+    # Repeated questions are resolved by response counts over the whole file
+    repeated = schema.repeated_columns
+    non_null = _count_responses(csv_path, repeated, chunksize) if repeated else None
+    decision_cols, confidence_cols = schema.resolve(non_null=non_null)
+    
+    dtype = {col: str for col in [*decision_cols.values(), *confidence_cols.values()]}
+    if schema.id_column is not None:
+        dtype[schema.id_column] = id_dtype
+    
+    reader = pd.read_csv(
+        csv_path, usecols=list(dtype), dtype=dtype, chunksize=chunksize
+    )
+    for chunk in reader:
+        yield _reshape_columns(chunk, decision_cols, confidence_cols, schema.id_column)
+
+
+@traced
+def write_long_format(csv_path: Path, output_path: Path, chunksize: int = 50000) -> int:
+    """
+    Reshape a survey export to long format on disk, chunk by chunk.
+    
+    Args:
+        csv_path: Path to the survey export
+        output_path: Path of the long-format CSV to write
+        chunksize: Number of respondents per chunk
+        
+    Returns:
+        Number of long-format rows written
+    """
+    n_rows = 0
+    for i, chunk in enumerate(iter_long_chunks(csv_path, chunksize=chunksize)):
+        chunk.to_csv(
+            output_path, index=False, mode="w" if i == 0 else "a", header=i == 0
+        )
+        n_rows += len(chunk)
+    if n_rows == 0:
+        pd.DataFrame(columns=LONG_FORMAT_COLUMNS).to_csv(output_path, index=False)
+    return n_rows
+
+
+def _cache_inputs() -> List[Dict[str, Dict[str, str]]]:
+    """Inputs other than the export that the cleaned long data depends on."""
+    classification = get_vignette_classification()
+    return [{str(q): info for q, info in classification.items()}]
+
+
+def _clean_long_data(raw_df: pd.DataFrame, schema: SurveySchema) -> pd.DataFrame:
+    """Reshape a raw export and drop rows without a decision."""
+    long_df = reshape_to_long_format(raw_df, schema=schema)
+    
+    # Remove rows with missing decisions
+    return long_df.dropna(subset=["decision"])
+
+
+@traced
+def load_long_data(data_dir: Path, cache_dir: Optional[Path] = None) -> pd.DataFrame:
+    """
+    Load the cleaned long-format data, using the on-disk cache if given.
+    
+    On a cache hit the raw export is hashed but not parsed. The cache is
+    keyed by the export's contents, the package version and the vignette
+    classification, so a change to any of them rebuilds the entry.
+    
+    Args:
+        data_dir: Path to data directory
+        cache_dir: Directory holding cached long-format tables. Requires
+            pyarrow; caching is skipped with a warning if it is missing.
+        
+    Returns:
+        Cleaned long-format dataframe
+    """
+    return load_export(Path(data_dir) / "survey_results.csv", cache_dir=cache_dir)
+
+
+@traced
+def load_export(csv_path: Path, cache_dir: Optional[Path] = None) -> pd.DataFrame:
+    """
+    Load the cleaned long-format data for a survey export at any path.
+    
+    Args:
+        csv_path: Path to the survey export
+        cache_dir: Directory holding cached long-format tables; see
+            :func:`load_long_data`
+        
+    Returns:
+        Cleaned long-format dataframe
+    """
+    return _load_long_data(Path(csv_path), cache_dir, raw_df=None)
+
+
+def _load_long_data(
+    csv_path: Path,
+    cache_dir: Optional[Path],
+    raw_df: Optional[pd.DataFrame],
+    save_schema: bool = False,
+) -> pd.DataFrame:
+    """Cached long data, parsing ``raw_df`` (or the export) only on a miss."""
+    if not csv_path.exists():
+        raise FileNotFoundError(f"Survey data not found at {csv_path}")
+    
+    if cache_dir is not None and not pyarrow_available():
+        warn_cache_unavailable()
+        cache_dir = None
+    
+    if cache_dir is not None:
+        cached = read_cached_long_data(csv_path, cache_dir, *_cache_inputs())
+        if cached is not None:
+            return cached
+    
+    if raw_df is None:
+        raw_df = pd.read_csv(csv_path)
+    schema = load_survey_schema(csv_path, raw_df.columns, save=save_schema)
+    long_df = _clean_long_data(raw_df, schema)
+    
+    if cache_dir is not None:
+        write_cached_long_data(long_df, csv_path, cache_dir, *_cache_inputs())
     return long_df
 
 
-def load_clean_data(data_dir: Path) -> Tuple[pd.DataFrame, pd.DataFrame]:
+@traced
+def load_clean_data(
+    data_dir: Path, save_schema: bool = False, cache_dir: Optional[Path] = None
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
     """
     Load and clean survey data.
     
     Args:
         data_dir: Path to data directory
+        save_schema: Save the inferred column layout next to the export so
+            later loads of the same instrument skip schema inference
+        cache_dir: Directory holding cached long-format tables; see
+            :func:`load_long_data`. The raw export is still parsed because
+            it is returned.
         
     Returns:
         Tuple of (raw_data, cleaned_long_data)
     """
+    data_dir = Path(data_dir)
     raw_df = load_survey_data(data_dir)
-    long_df = reshape_to_long_format(raw_df)
-    
-    # Remove rows with missing decisions
-    long_df = long_df.dropna(subset=["decision"])
-    
+    long_df = _load_long_data(
+        data_dir / "survey_results.csv",
+        cache_dir,
+        raw_df=raw_df,
+        save_schema=save_schema,
+    )
     return raw_df, long_df
-
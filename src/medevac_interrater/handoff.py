@@ -0,0 +1,228 @@
+"""
+Arrow IPC (Feather v2) hand-off of the processed long-format data.
+
+The processing step writes the cleaned responses, joined with the physician
+covariates, next to ``survey_data_processed.csv`` as an uncompressed Arrow
+IPC file with a fixed schema. Text columns are dictionary-encoded, so
+consumers get the categorical structure back instead of re-inferring types
+from text; R reads the file with ``arrow::read_ipc_file()``.
+
+:func:`read_handoff` memory-maps the file and wraps its buffers in a
+DataFrame without copying them, so loading takes the same time whatever the
+file size and pages are only read when a column is used.
+"""
+
+import os
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+if TYPE_CHECKING:
+    # pyarrow is optional and imported inside the functions that use it
+    import pyarrow as pa
+
+from . import __version__
+from .instrumentation import traced
+from .physicians import PhysicianDimension
+
+HANDOFF_FILENAME = "survey_data_processed.arrow"
+HANDOFF_FORMAT_VERSION = 1
+
+# Column name → Arrow type name; "dictionary" columns are int8-indexed strings
+# (at most 127 categories), ordered when the written categorical is ordered
+HANDOFF_COLUMNS: Dict[str, str] = {
+    "physician_id": "int64",
+    "question": "int8",
+    "vignette_label": "dictionary",
+    "decision": "dictionary",
+    "confidence": "float32",
+    "question_type": "dictionary",
+    "vignette_class": "dictionary",
+    "years_experience": "float32",
+    "practice_location": "dictionary",
+    "rural_experience": "dictionary",
+}
+COVARIATE_COLUMNS = ["years_experience", "practice_location", "rural_experience"]
+
+_METADATA_KEY = b"medevac_interrater.handoff"
+
+
+def handoff_schema(ordered: Sequence[str] = ()) -> "pa.Schema":
+    """
+    The Arrow schema of hand-off files.
+
+    Args:
+        ordered: Dictionary columns whose categories are ordered
+
+    Returns:
+        ``pyarrow.Schema`` with the columns of :data:`HANDOFF_COLUMNS` and the
+        format version in its metadata
+    """
+    import pyarrow as pa
+
+    def arrow_type(name: str, kind: str) -> "pa.DataType":
+        if kind == "dictionary":
+            return pa.dictionary(pa.int8(), pa.string(), ordered=name in ordered)
+        return {"int64": pa.int64(), "int8": pa.int8(), "float32": pa.float32()}[kind]
+
+    return pa.schema(
+        [
+            pa.field(name, arrow_type(name, kind))
+            for name, kind in HANDOFF_COLUMNS.items()
+        ],
+        metadata={_METADATA_KEY: f"{HANDOFF_FORMAT_VERSION} {__version__}".encode()},
+    )
+
+
+def _to_arrow(values: pd.Series, kind: str) -> "pa.Array":
+    """One hand-off column as a single Arrow array."""
+    import pyarrow as pa
+
+    if kind == "dictionary":
+        values = values.astype("category")
+        if len(values.cat.categories) > np.iinfo(np.int8).max:
+            raise ValueError(
+                f"{values.name} has {len(values.cat.categories)} categories; "
+                f"hand-off dictionaries hold at most {np.iinfo(np.int8).max}"
+            )
+        categories = pa.array([str(c) for c in values.cat.categories], type=pa.string())
+        codes = values.cat.codes.to_numpy().astype(np.int8)
+        indices = pa.array(codes, mask=codes < 0, type=pa.int8())
+        return pa.DictionaryArray.from_arrays(
+            indices, categories, ordered=values.cat.ordered
+        )
+    if kind == "float32":
+        # Missing numbers are stored as NaN rather than nulls so the column has
+        # no validity bitmap and can be read without copying
+        return pa.array(
+            values.to_numpy(dtype=np.float32, na_value=np.nan), from_pandas=False
+        )
+    return pa.array(values.to_numpy(dtype=kind))
+
+
+@traced
+def write_handoff(
+    long_df: pd.DataFrame, path: Path, physicians: Optional[PhysicianDimension] = None
+) -> Path:
+    """
+    Write the long-format data as a hand-off file.
+
+    Args:
+        long_df: Cleaned long-format dataframe
+        path: Output file
+        physicians: Physician dimension providing the columns of
+            :data:`COVARIATE_COLUMNS` (written as missing if None)
+
+    Returns:
+        Path of the written file
+
+    Raises:
+        ValueError: If the long data lacks a required column, or a
+            categorical column has more categories than an int8 index holds
+    """
+    import pyarrow as pa
+
+    missing = [
+        col
+        for col in HANDOFF_COLUMNS
+        if col not in COVARIATE_COLUMNS and col not in long_df
+    ]
+    if missing:
+        raise ValueError(f"Long-format data is missing columns: {missing}")
+
+    table = long_df.reset_index(drop=True)
+    if physicians is not None:
+        table = physicians.join(table, COVARIATE_COLUMNS)
+    else:
+        table = table.assign(**{col: np.nan for col in COVARIATE_COLUMNS})
+
+    ordered = [
+        name
+        for name, kind in HANDOFF_COLUMNS.items()
+        if kind == "dictionary"
+        and isinstance(table[name].dtype, pd.CategoricalDtype)
+        and table[name].cat.ordered
+    ]
+    schema = handoff_schema(ordered)
+    arrow_table = pa.Table.from_arrays(
+        [_to_arrow(table[name], kind) for name, kind in HANDOFF_COLUMNS.items()],
+        schema=schema,
+    )
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    with pa.OSFile(str(tmp_path), "wb") as sink:
+        with pa.ipc.new_file(sink, schema) as writer:
+            # One record batch, so every column is one contiguous buffer
+            writer.write_table(arrow_table, max_chunksize=max(len(arrow_table), 1))
+    os.replace(tmp_path, path)
+    return path
+
+
+def _to_pandas(
+    column: "pa.ChunkedArray",
+) -> Union[pd.Series, pd.Categorical, np.ndarray]:
+    """A pandas-compatible view of a single-chunk Arrow column."""
+    import pyarrow as pa
+
+    if column.num_chunks != 1:
+        return column.to_pandas()
+    array = column.chunk(0)
+    if pa.types.is_dictionary(array.type):
+        if array.indices.null_count:
+            return array.to_pandas()
+        return pd.Categorical.from_codes(
+            array.indices.to_numpy(zero_copy_only=True),
+            categories=pd.Index(array.dictionary.to_pylist(), dtype="str"),
+            ordered=array.type.ordered,
+            validate=False,
+        )
+    if array.null_count:
+        return array.to_pandas()
+    return array.to_numpy(zero_copy_only=True)
+
+
+@traced
+def read_handoff(path: Path, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """
+    Load a hand-off file without copying its data.
+
+    Numeric columns and the codes of categorical columns are read-only views
+    of the memory-mapped file; assigning into them raises, so call
+    ``.copy()`` on the frame before modifying values in place. Columns
+    with missing categories are the exception and are copied.
+
+    Args:
+        path: Hand-off file
+        columns: Columns to load (default: all)
+
+    Returns:
+        Long-format dataframe with the hand-off columns
+
+    Raises:
+        FileNotFoundError: If the file does not exist
+        ValueError: If the file is not a hand-off file of this format version
+    """
+    import pyarrow as pa
+
+    path = Path(path)
+    if not path.exists():
+        raise FileNotFoundError(f"Hand-off file not found at {path}")
+
+    table = pa.ipc.open_file(pa.memory_map(str(path))).read_all()
+    tag = (table.schema.metadata or {}).get(_METADATA_KEY, b"").split()
+    if not tag or int(tag[0]) != HANDOFF_FORMAT_VERSION:
+        raise ValueError(
+            f"{path} is not a version {HANDOFF_FORMAT_VERSION} hand-off file"
+        )
+
+    names: List[str] = list(columns) if columns is not None else table.column_names
+    unknown = set(names) - set(table.column_names)
+    if unknown:
+        raise ValueError(f"Unknown hand-off columns: {sorted(unknown)}")
+    return pd.DataFrame(
+        {name: _to_pandas(table.column(name)) for name in names}, copy=False
+    )
@@ -0,0 +1,305 @@
+"""
+Incrementally maintained agreement and confidence statistics.
+
+:class:`AgreementState` keeps the per-question decision counts and the
+confidence sums needed by the question, class and confidence tables, so a
+survey that grows a few responses at a time can be updated in time
+proportional to the change rather than recomputed from the full long frame.
+"""
+
+import json
+import math
+from pathlib import Path
+from typing import Any, Dict, Hashable, List, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .analysis import agreement_metrics_from_counts
+
+STATE_FORMAT_VERSION = 1
+
+# Confidence aggregates per group: [n_rows, n_rated, sum, sum of squares]
+_Aggregate = List[float]
+
+
+def _python_value(value: object) -> object:
+    """Convert numpy scalars to Python values (for JSON)."""
+    return value.item() if isinstance(value, np.generic) else value
+
+
+class AgreementState:
+    """
+    Running per-question decision counts and confidence sums.
+
+    One response is kept per physician and question; a later response to
+    the same question replaces the earlier one, as in
+    :func:`~medevac_interrater.analysis.build_count_matrix`. On data
+    without repeated responses the tables match
+    :func:`~medevac_interrater.analysis.calculate_question_level_metrics`,
+    :func:`~medevac_interrater.analysis.calculate_agreement_by_class` and
+    :func:`~medevac_interrater.analysis.calculate_confidence_analysis`.
+    """
+
+    def __init__(self) -> None:
+        # physician -> question -> (decision, confidence)
+        self._responses: Dict[Hashable, Dict[int, Tuple[str, float]]] = {}
+        # question -> decision -> count
+        self._counts: Dict[int, Dict[str, int]] = {}
+        # question -> (question_type, vignette_class), from its first response
+        self._vignettes: Dict[int, Tuple[str, str]] = {}
+        self._confidence: Dict[str, Dict[str, _Aggregate]] = {
+            "decision": {},
+            "vignette_class": {},
+        }
+
+    @property
+    def physicians(self) -> Set[Hashable]:
+        """IDs of the physicians with at least one response."""
+        return set(self._responses)
+
+    @property
+    def n_responses(self) -> int:
+        """Number of responses currently held."""
+        return sum(len(answers) for answers in self._responses.values())
+
+    def _update_confidence(
+        self, key: Tuple[str, str], confidence: float, sign: int
+    ) -> None:
+        """Add (sign=1) or remove (sign=-1) one confidence rating from a group."""
+        by, value = key
+        groups = self._confidence[by]
+        aggregate = groups.setdefault(value, [0, 0, 0.0, 0.0])
+        aggregate[0] += sign
+        if not math.isnan(confidence):
+            aggregate[1] += sign
+            aggregate[2] += sign * confidence
+            aggregate[3] += sign * confidence * confidence
+        if aggregate[0] == 0:
+            del groups[value]
+
+    def _add(
+        self,
+        physician: Hashable,
+        question: int,
+        decision: str,
+        confidence: float,
+        vignette: Tuple[str, str],
+    ) -> None:
+        """Add one response, replacing the physician's earlier answer if any."""
+        answers = self._responses.setdefault(physician, {})
+        if question in answers:
+            self._remove(physician, question)
+            answers = self._responses.setdefault(physician, {})
+
+        if question not in self._counts:
+            self._counts[question] = {}
+            self._vignettes[question] = vignette
+        counts = self._counts[question]
+        counts[decision] = counts.get(decision, 0) + 1
+
+        answers[question] = (decision, confidence)
+        self._update_confidence(("decision", decision), confidence, 1)
+        self._update_confidence(
+            ("vignette_class", self._vignettes[question][1]), confidence, 1
+        )
+
+    def _remove(self, physician: Hashable, question: int) -> None:
+        """Remove one response."""
+        answers = self._responses[physician]
+        decision, confidence = answers.pop(question)
+        if not answers:
+            del self._responses[physician]
+
+        counts = self._counts[question]
+        counts[decision] -= 1
+        if counts[decision] == 0:
+            del counts[decision]
+
+        self._update_confidence(("decision", decision), confidence, -1)
+        self._update_confidence(
+            ("vignette_class", self._vignettes[question][1]), confidence, -1
+        )
+        if not counts:
+            del self._counts[question]
+            del self._vignettes[question]
+
+    def add_responses(self, df: pd.DataFrame, skip_known: bool = False) -> int:
+        """
+        Add long-format responses.
+
+        Args:
+            df: Long-format dataframe with columns: physician_id, question,
+                decision, confidence, question_type, vignette_class
+            skip_known: Ignore rows from physicians already in the state,
+                e.g. when re-reading a growing export
+
+        Returns:
+            Number of responses added
+        """
+        df = df.dropna(subset=["decision"])
+        if skip_known:
+            df = df[~df["physician_id"].isin(list(self._responses))]
+
+        columns = [
+            "physician_id",
+            "question",
+            "decision",
+            "confidence",
+            "question_type",
+            "vignette_class",
+        ]
+        for physician, question, decision, confidence, q_type, v_class in zip(
+            *(df[col].tolist() for col in columns)
+        ):
+            self._add(
+                physician, int(question), decision, float(confidence), (q_type, v_class)
+            )
+        return len(df)
+
+    def remove_physician(self, physician_id: Hashable) -> int:
+        """
+        Remove all responses of a physician.
+
+        Args:
+            physician_id: Physician to remove
+
+        Returns:
+            Number of responses removed (0 if the physician is unknown)
+        """
+        questions = list(self._responses.get(physician_id, {}))
+        for question in questions:
+            self._remove(physician_id, question)
+        return len(questions)
+
+    def _count_matrix(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Question × decision count matrix in the layout of build_count_matrix."""
+        questions = np.array(sorted(self._counts), dtype=np.int64)
+        categories = np.array(
+            sorted(
+                {decision for counts in self._counts.values() for decision in counts}
+            ),
+            dtype=object,
+        )
+        category_index = {category: j for j, category in enumerate(categories)}
+        matrix = np.zeros((len(questions), len(categories)), dtype=np.int64)
+        for i, question in enumerate(questions):
+            for decision, n in self._counts[question].items():
+                matrix[i, category_index[decision]] = n
+        return matrix, questions, categories
+
+    def agreement_metrics(self) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Question-level and class-level agreement tables.
+
+        Returns:
+            Tuple of (question_metrics, class_metrics)
+        """
+        counts, questions, categories = self._count_matrix()
+        vignette_info = pd.DataFrame(
+            [self._vignettes[q] for q in questions],
+            columns=["question_type", "vignette_class"],
+        )
+        return agreement_metrics_from_counts(
+            counts, questions, categories, vignette_info
+        )
+
+    def question_level_metrics(self) -> pd.DataFrame:
+        """Question-level metrics, as calculate_question_level_metrics."""
+        question_metrics, _ = self.agreement_metrics()
+        return question_metrics
+
+    def agreement_by_class(self) -> pd.DataFrame:
+        """Class-level metrics, as calculate_agreement_by_class."""
+        _, class_metrics = self.agreement_metrics()
+        return class_metrics
+
+    def confidence_analysis(self) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Confidence by decision and by vignette class.
+
+        Returns:
+            Tuple of (conf_by_decision, conf_by_class), as
+            calculate_confidence_analysis
+        """
+        tables = []
+        for by in ["decision", "vignette_class"]:
+            rows = []
+            for value, (_, n, total, total_sq) in sorted(self._confidence[by].items()):
+                n = int(n)
+                mean = total / n if n else np.nan
+                if n > 1:
+                    variance = max(total_sq - total * total / n, 0.0) / (n - 1)
+                    std = math.sqrt(variance)
+                else:
+                    std = np.nan
+                rows.append((value, mean, std, n))
+            tables.append(
+                pd.DataFrame(
+                    rows, columns=[by, "mean_confidence", "std_confidence", "n"]
+                )
+            )
+        return tables[0], tables[1]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serializable form of the state."""
+        return {
+            "format_version": STATE_FORMAT_VERSION,
+            "responses": [
+                [
+                    _python_value(physician),
+                    question,
+                    decision,
+                    None if math.isnan(confidence) else confidence,
+                ]
+                for physician, answers in self._responses.items()
+                for question, (decision, confidence) in answers.items()
+            ],
+            "counts": {str(q): counts for q, counts in self._counts.items()},
+            "vignettes": {str(q): list(info) for q, info in self._vignettes.items()},
+            "confidence": self._confidence,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "AgreementState":
+        """
+        Rebuild a state from :meth:`to_dict` output.
+
+        Raises:
+            ValueError: If the data was written by an incompatible version
+        """
+        if data.get("format_version") != STATE_FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported agreement state format: {data.get('format_version')}"
+            )
+        state = cls()
+        for physician, question, decision, confidence in data["responses"]:
+            state._responses.setdefault(physician, {})[question] = (
+                decision,
+                np.nan if confidence is None else confidence,
+            )
+        state._counts = {int(q): dict(counts) for q, counts in data["counts"].items()}
+        state._vignettes = {
+            int(q): tuple(info) for q, info in data["vignettes"].items()
+        }
+        state._confidence = {
+            by: {value: list(aggregate) for value, aggregate in groups.items()}
+            for by, groups in data["confidence"].items()
+        }
+        return state
+
+    def save(self, path: Path) -> None:
+        """Write the state to a JSON file."""
+        Path(path).write_text(json.dumps(self.to_dict()))
+
+    @classmethod
+    def load(cls, path: Path) -> "AgreementState":
+        """Read a state written by :meth:`save`."""
+        return cls.from_dict(json.loads(Path(path).read_text()))
+
+    @classmethod
+    def load_or_create(cls, path: Optional[Path]) -> "AgreementState":
+        """Load the state at ``path`` if it exists, otherwise start empty."""
+        if path is not None and Path(path).exists():
+            return cls.load(path)
+        return cls()
@@ -0,0 +1,154 @@
+"""
+Leave-one-rater-out influence on agreement, kappa and confidence.
+
+Every statistic of the agreement tables is a function of the question ×
+decision count matrix, which is the sum of the physicians' one-hot rating
+matrices. Subtracting one physician's one-hot matrix from the total gives
+the counts without that physician, so the leave-one-out statistics of all
+physicians are evaluated as one stacked batch instead of one recompute per
+physician. Mean confidence is downdated the same way from per-physician
+sums and counts.
+"""
+
+import warnings
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .analysis import build_rating_matrix, one_hot_ratings, question_class_codes
+from .bootstrap import StatKey, _jackknife_statistics, batch_agreement_statistics
+from .instrumentation import traced
+
+CONFIDENCE_GROUPS = {"overall": None, "class": "vignette_class", "decision": "decision"}
+
+
+def _confidence_sums(
+    df: pd.DataFrame, physicians: np.ndarray
+) -> Dict[StatKey, Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """
+    Per-physician confidence sums and counts for each confidence level.
+
+    Returns:
+        Dictionary keyed by (level, "mean_confidence") of (sums, counts,
+        units), where sums and counts have shape (n_physicians, n_units)
+    """
+    rated = df.dropna(subset=["confidence"])
+    rows = pd.Index(physicians).get_indexer(rated["physician_id"])
+    keep = rows >= 0
+    rows, rated = rows[keep], rated[keep]
+    confidence = rated["confidence"].to_numpy(dtype=np.float64)
+
+    sums = {}
+    for level, column in CONFIDENCE_GROUPS.items():
+        if column is None:
+            codes, units = np.zeros(len(rated), dtype=np.intp), np.array(["overall"])
+        else:
+            codes, units = pd.factorize(rated[column].astype(str), sort=True)
+        shape = (len(physicians), len(units))
+        flat = rows * len(units) + codes
+        totals = np.bincount(flat, weights=confidence, minlength=shape[0] * shape[1])
+        counts = np.bincount(flat, minlength=shape[0] * shape[1])
+        sums[(level, "mean_confidence")] = (
+            totals.reshape(shape),
+            counts.reshape(shape).astype(np.float64),
+            np.asarray(units),
+        )
+    return sums
+
+
+@traced
+def rater_influence(
+    df: pd.DataFrame, chunk_size: int = 256
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Leave-one-rater-out statistics, influence and jackknife standard errors.
+
+    Covers per-question agreement, per-class mean agreement and Fleiss'
+    Kappa, overall agreement and kappa, and mean confidence overall, per
+    vignette class and per decision. The influence of a physician on a
+    statistic is the jackknife influence value (n - 1)(estimate -
+    estimate without the physician): positive when the physician raises it.
+
+    Args:
+        df: Long-format dataframe with columns: physician_id, question,
+            decision, confidence, vignette_class
+        chunk_size: Physicians whose leave-one-out counts are evaluated at once
+
+    Returns:
+        Tuple of (influence, summary). influence has one row per physician
+        and statistic with columns physician_id, level, unit, metric,
+        estimate_without, influence. summary has one row per statistic
+        with columns level, unit, metric, estimate, jackknife_bias,
+        jackknife_se, n_raters.
+    """
+    codes, physicians, questions, categories = build_rating_matrix(df)
+    onehot = one_hot_ratings(codes, len(categories))
+    class_codes, classes = question_class_codes(df, questions)
+    n_classes = len(classes)
+
+    units = {"question": questions, "class": classes, "overall": np.array(["overall"])}
+    estimates = {
+        key: value[0]
+        for key, value in batch_agreement_statistics(
+            onehot.sum(axis=0)[None], class_codes, n_classes
+        ).items()
+    }
+    leave_one_out = _jackknife_statistics(
+        onehot, class_codes, n_classes, "physicians", chunk_size
+    )
+    level_units = {key: units[key[0]] for key in estimates}
+
+    for key, (sums, counts, conf_units) in _confidence_sums(df, physicians).items():
+        with np.errstate(invalid="ignore", divide="ignore"):
+            estimates[key] = sums.sum(axis=0) / counts.sum(axis=0)
+            leave_one_out[key] = (sums.sum(axis=0) - sums) / (
+                counts.sum(axis=0) - counts
+            )
+        level_units[key] = conf_units
+
+    n = len(physicians)
+    influence_tables, summary_tables = [], []
+    for key, estimate in estimates.items():
+        level, metric = key
+        without = leave_one_out[key]
+        influence = (n - 1) * (estimate - without)
+        n_raters = (~np.isnan(without)).sum(axis=0)
+
+        with warnings.catch_warnings(), np.errstate(invalid="ignore"):
+            warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN columns
+            mean = np.nanmean(without, axis=0)
+            se = np.sqrt(
+                (n_raters - 1) / n_raters * np.nansum((without - mean) ** 2, axis=0)
+            )
+
+        influence_tables.append(
+            pd.DataFrame(
+                {
+                    "physician_id": np.repeat(physicians, without.shape[1]),
+                    "level": level,
+                    "unit": np.tile(level_units[key], n),
+                    "metric": metric,
+                    "estimate_without": without.ravel(),
+                    "influence": influence.ravel(),
+                }
+            )
+        )
+        summary_tables.append(
+            pd.DataFrame(
+                {
+                    "level": level,
+                    "unit": level_units[key],
+                    "metric": metric,
+                    "estimate": estimate,
+                    "jackknife_bias": (n_raters - 1) * (mean - estimate),
+                    "jackknife_se": np.where(n_raters > 1, se, np.nan),
+                    "n_raters": n_raters,
+                }
+            )
+        )
+
+    return (
+        pd.concat(influence_tables, ignore_index=True),
+        pd.concat(summary_tables, ignore_index=True),
+    )
@@ -0,0 +1,306 @@
+"""
+Lightweight per-stage timing and memory instrumentation.
+
+Loader and analysis functions are wrapped with :func:`traced`, and other
+stages (such as writing outputs) can be wrapped with :func:`span`. While
+tracing is off these cost one global lookup per call. While it is on, every
+span records wall time, CPU time, peak RSS, optionally the tracemalloc peak,
+and input/output row counts; the spans of a run can be saved as a JSON
+trace and summarized per stage.
+
+Example:
+    with tracing("trace.json") as trace:
+        long_df = load_long_data(data_dir)
+        with span("write_csv"):
+            long_df.to_csv(path)
+    print(format_summary(trace))
+"""
+
+import functools
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, TypeVar, cast
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None  # type: ignore[assignment]
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# ru_maxrss is reported in kilobytes on Linux and bytes on macOS
+_RSS_UNIT = 1 if sys.platform == "darwin" else 1024
+
+
+def _peak_rss_bytes() -> Optional[int]:
+    """Peak resident set size of this process so far."""
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * _RSS_UNIT
+
+
+def _row_count(obj: Any) -> Optional[int]:
+    """Rows of a dataframe or series, or of the first one in a tuple."""
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        return len(obj)
+    if isinstance(obj, tuple):
+        for item in obj:
+            if isinstance(item, (pd.DataFrame, pd.Series)):
+                return len(item)
+    return None
+
+
+@dataclass
+class SpanRecord:
+    """Measurements of one span."""
+
+    name: str
+    depth: int
+    parent: Optional[int]
+    start_seconds: float
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    peak_rss_bytes: Optional[int] = None
+    peak_traced_bytes: Optional[int] = None
+    rows_in: Optional[int] = None
+    rows_out: Optional[int] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class _OpenSpan:
+    """Bookkeeping for a span that has not finished."""
+
+    index: int
+    wall_start: float
+    cpu_start: float
+    traced_base: int = 0
+    traced_peak_before: int = 0
+    traced_peak: int = 0
+
+
+class Trace:
+    """The spans recorded during one traced run."""
+
+    def __init__(self, trace_memory: bool = False) -> None:
+        self.trace_memory = trace_memory
+        self.spans: List[SpanRecord] = []
+        self.started_at = datetime.now(timezone.utc).isoformat()
+        self._origin = time.perf_counter()
+        self._stack: List[_OpenSpan] = []
+
+    def open(
+        self, name: str, rows_in: Optional[int], attributes: Dict[str, Any]
+    ) -> None:
+        """Start a span nested in the currently open one."""
+        parent = self._stack[-1].index if self._stack else None
+        record = SpanRecord(
+            name=name,
+            depth=len(self._stack),
+            parent=parent,
+            start_seconds=time.perf_counter() - self._origin,
+            rows_in=rows_in,
+            attributes=dict(attributes),
+        )
+        self.spans.append(record)
+        frame = _OpenSpan(len(self.spans) - 1, time.perf_counter(), time.process_time())
+        if self.trace_memory and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            frame.traced_base = current
+            frame.traced_peak_before = peak
+            if hasattr(tracemalloc, "reset_peak"):
+                tracemalloc.reset_peak()
+        self._stack.append(frame)
+
+    def close(self, rows_out: Optional[int] = None) -> None:
+        """Finish the innermost open span."""
+        frame = self._stack.pop()
+        record = self.spans[frame.index]
+        record.wall_seconds = time.perf_counter() - frame.wall_start
+        record.cpu_seconds = time.process_time() - frame.cpu_start
+        record.peak_rss_bytes = _peak_rss_bytes()
+        record.rows_out = rows_out
+        if self.trace_memory and tracemalloc.is_tracing():
+            peak = max(tracemalloc.get_traced_memory()[1], frame.traced_peak)
+            record.peak_traced_bytes = max(peak - frame.traced_base, 0)
+            if self._stack:
+                # Resetting the peak for this span hid it from the parent
+                parent = self._stack[-1]
+                parent.traced_peak = max(
+                    parent.traced_peak, peak, frame.traced_peak_before
+                )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serializable form of the trace."""
+        return {
+            "started_at": self.started_at,
+            "argv": sys.argv,
+            "python": platform.python_version(),
+            "spans": [asdict(record) for record in self.spans],
+        }
+
+    def save(self, path: Path) -> None:
+        """Write the trace as JSON."""
+        Path(path).write_text(json.dumps(self.to_dict(), indent=2, default=str) + "\n")
+
+
+_ACTIVE: Optional[Trace] = None
+
+
+def active_trace() -> Optional[Trace]:
+    """The trace being recorded, or None when tracing is off."""
+    return _ACTIVE
+
+
+def enable(trace_memory: bool = False) -> Trace:
+    """
+    Start recording spans.
+
+    Args:
+        trace_memory: Also record the tracemalloc peak of each span. This
+            slows allocation-heavy code noticeably.
+
+    Returns:
+        The new trace
+    """
+    global _ACTIVE
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    _ACTIVE = Trace(trace_memory=trace_memory)
+    return _ACTIVE
+
+
+def disable() -> Optional[Trace]:
+    """Stop recording spans and return the finished trace."""
+    global _ACTIVE
+    trace, _ACTIVE = _ACTIVE, None
+    if trace is not None and trace.trace_memory and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    return trace
+
+
+@contextmanager
+def tracing(path: Optional[Path] = None, trace_memory: bool = False) -> Iterator[Trace]:
+    """
+    Record spans for the duration of a block.
+
+    Args:
+        path: Optional JSON file the trace is written to on exit
+        trace_memory: See :func:`enable`
+
+    Yields:
+        The trace being recorded
+    """
+    trace = enable(trace_memory=trace_memory)
+    try:
+        yield trace
+    finally:
+        disable()
+        if path is not None:
+            trace.save(path)
+
+
+@contextmanager
+def span(name: str, rows: Optional[int] = None, **attributes: Any) -> Iterator[None]:
+    """
+    Record a block as a span when tracing is on.
+
+    Args:
+        name: Stage name
+        rows: Optional number of input rows
+        **attributes: Extra JSON-serializable values stored with the span
+    """
+    trace = _ACTIVE
+    if trace is None:
+        yield
+        return
+    trace.open(name, rows, attributes)
+    try:
+        yield
+    finally:
+        trace.close()
+
+
+def traced(func: F) -> F:
+    """
+    Record each call of a function as a span when tracing is on.
+
+    The span is named ``<module>.<function>``; rows_in is the length of the
+    first dataframe argument and rows_out that of the returned dataframe.
+    """
+    name = f"{func.__module__.rsplit('.', 1)[-1]}.{func.__qualname__}"
+
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        trace = _ACTIVE
+        if trace is None:
+            return func(*args, **kwargs)
+        rows_in = next(
+            (len(arg) for arg in args if isinstance(arg, (pd.DataFrame, pd.Series))),
+            None,
+        )
+        trace.open(name, rows_in, {})
+        result = None
+        try:
+            result = func(*args, **kwargs)
+            return result
+        finally:
+            trace.close(_row_count(result))
+
+    return cast(F, wrapper)
+
+
+def summarize(trace: Trace) -> pd.DataFrame:
+    """
+    Aggregate a trace per span name.
+
+    Args:
+        trace: A recorded trace
+
+    Returns:
+        DataFrame with columns: span, calls, wall_seconds, cpu_seconds,
+        peak_rss_mb, peak_traced_mb, rows_in, rows_out, ordered by first
+        occurrence. Times are totals over calls; memory is the maximum.
+    """
+    columns = [
+        "span",
+        "calls",
+        "wall_seconds",
+        "cpu_seconds",
+        "peak_rss_mb",
+        "peak_traced_mb",
+        "rows_in",
+        "rows_out",
+    ]
+    if not trace.spans:
+        return pd.DataFrame(columns=columns)
+
+    spans = pd.DataFrame([asdict(record) for record in trace.spans])
+    summary = spans.groupby("name", sort=False).agg(
+        calls=("name", "size"),
+        wall_seconds=("wall_seconds", "sum"),
+        cpu_seconds=("cpu_seconds", "sum"),
+        peak_rss_mb=("peak_rss_bytes", "max"),
+        peak_traced_mb=("peak_traced_bytes", "max"),
+        rows_in=("rows_in", "max"),
+        rows_out=("rows_out", "max"),
+    )
+    summary[["peak_rss_mb", "peak_traced_mb"]] = (
+        summary[["peak_rss_mb", "peak_traced_mb"]].astype(float) / 2**20
+    )
+    summary[["rows_in", "rows_out"]] = summary[["rows_in", "rows_out"]].astype("Int64")
+    return summary.rename_axis("span").reset_index()[columns]
+
+
+def format_summary(trace: Trace) -> str:
+    """Per-stage summary of a trace as a printable table."""
+    return summarize(trace).to_string(index=False, float_format=lambda x: f"{x:.3f}")
@@ -0,0 +1,821 @@
+"""
+Mixed-effects model of medevac propensity.
+
+Fits the logistic model of the final report,
+``chose_medevac ~ vignette_type_collapsed + confidence_within +
+years_experience_centered + rural_experience + (1 | physician_id) +
+(1 | question)``, with crossed random intercepts for physicians and
+vignettes. The marginal likelihood is approximated with the Laplace
+method (``glmer``'s default): the random effects are integrated out around
+their conditional modes, which are found by penalized Newton iterations.
+Because the two random effects are crossed (each response belongs to one
+physician and one vignette), the random-effect Hessian is a diagonal
+physician block bordered by a small vignette block, whether or not some
+responses are missing, so each Newton step only factors a matrix of the
+vignette count.
+
+Intervals for the variance components, ICC and median odds ratio (MOR)
+come from a parametric bootstrap: responses are simulated from the fitted
+model and refitted starting from the original estimates, with batches of
+replicates spread over a process pool and seeded from a single
+``SeedSequence`` so the results do not depend on the number of workers.
+"""
+
+import math
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from statistics import NormalDist
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from scipy import linalg, optimize
+
+from .confidence import center_within_physician
+from .instrumentation import traced
+from .physicians import PhysicianDimension
+
+# Responses to these vignette types are pooled as the reference category
+VIGNETTE_TYPE_LEVELS = ["Possible/Ambiguous", "Never Medevac", "Always Medevac"]
+_COLLAPSED_TYPES = {
+    "Possible Medevac": "Possible/Ambiguous",
+    "Special Considerations": "Possible/Ambiguous",
+    "Never Medevac": "Never Medevac",
+    "Always Medevac": "Always Medevac",
+}
+
+# rural_experience from the practice location (as in the final report) or the survey
+RURAL_SOURCES = ("practice_location", "survey")
+
+FIXED_EFFECTS = [
+    "(Intercept)",
+    "vignette_type_collapsedNever Medevac",
+    "vignette_type_collapsedAlways Medevac",
+    "confidence_within",
+    "years_experience_centered",
+    "rural_experienceYes",
+]
+
+# Variance of the standard logistic distribution
+LOGISTIC_VARIANCE = math.pi**2 / 3
+
+_Z75 = NormalDist().inv_cdf(0.75)
+
+# Parameter blocks updated together by a damped Newton step, e.g. (beta, u)
+State = Tuple[np.ndarray, ...]
+
+_WORKER_STATE: Dict[str, object] = {}
+
+
+def load_physician_covariates(
+    data_dir: Path, rural_source: str = "practice_location"
+) -> pd.DataFrame:
+    """
+    Join the physician covariate files.
+
+    Args:
+        data_dir: Directory containing physician_experience.csv,
+            practice_location.csv and rural_experience.csv
+        rural_source: How rural_experience is defined: "practice_location"
+            (Yes for Regional Hub or Mixed practice, as in the final report)
+            or "survey" (the self-reported answer in rural_experience.csv)
+
+    Returns:
+        DataFrame with one row per physician and columns: physician_id,
+        years_experience, practice_location, rural_experience
+
+    Raises:
+        ValueError: If rural_source is unknown
+    """
+    table = PhysicianDimension.from_files(data_dir).table
+    columns = ["years_experience", "practice_location", _rural_column(rural_source)]
+    return (
+        table[columns].rename(columns={columns[-1]: "rural_experience"}).reset_index()
+    )
+
+
+def _rural_column(rural_source: str) -> str:
+    """The physician dimension column for a rural_experience source."""
+    if rural_source not in RURAL_SOURCES:
+        raise ValueError(
+            f"rural_source must be one of {RURAL_SOURCES}, got {rural_source!r}"
+        )
+    return (
+        "rural_by_location"
+        if rural_source == "practice_location"
+        else "rural_experience"
+    )
+
+
+@traced
+def prepare_model_data(
+    df: pd.DataFrame,
+    data_dir: Path,
+    mapping_file: str = "medevac_normative_mapping_simplified.csv",
+    rural_source: str = "practice_location",
+) -> pd.DataFrame:
+    """
+    Build the model frame from the long-format responses.
+
+    Confidence is centered within physician and years of experience on the
+    grand mean, both over the joined responses. Responses with a missing
+    model variable are dropped.
+
+    Args:
+        df: Long-format dataframe with columns: physician_id, question,
+            decision, confidence
+        data_dir: Directory containing the covariate files and the
+            normative mapping
+        mapping_file: Normative mapping with a medevac_status_label column
+        rural_source: See :func:`load_physician_covariates`
+
+    Returns:
+        DataFrame with columns: physician_id, question, chose_medevac,
+        vignette_type_collapsed, confidence_within,
+        years_experience_centered, rural_experience
+    """
+    rural_column = _rural_column(rural_source)
+    mapping = pd.read_csv(Path(data_dir) / mapping_file)
+    physicians = PhysicianDimension.from_files(data_dir)
+
+    data = physicians.join(
+        df[["physician_id", "question", "decision", "confidence"]]
+        .dropna(subset=["decision"])
+        .assign(question=lambda d: d["question"].astype(np.int64))
+        .merge(
+            mapping[["question", "medevac_status_label"]], on="question", how="left"
+        ),
+        ["years_experience", rural_column],
+    ).rename(columns={rural_column: "rural_experience"})
+
+    data["chose_medevac"] = (data["decision"].astype(str) == "Medevac").astype(np.int64)
+    data["vignette_type_collapsed"] = pd.Categorical(
+        data["medevac_status_label"].map(_COLLAPSED_TYPES),
+        categories=VIGNETTE_TYPE_LEVELS,
+    )
+    data["confidence_within"] = center_within_physician(data)
+    data["years_experience_centered"] = (
+        data["years_experience"] - data["years_experience"].mean()
+    )
+
+    columns = [
+        "physician_id",
+        "question",
+        "chose_medevac",
+        "vignette_type_collapsed",
+        "confidence_within",
+        "years_experience_centered",
+        "rural_experience",
+    ]
+    return data[columns].dropna().reset_index(drop=True)
+
+
+def design_matrix(model_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Fixed-effects design matrix with treatment contrasts.
+
+    Args:
+        model_df: Output of :func:`prepare_model_data`
+
+    Returns:
+        DataFrame with one column per entry of FIXED_EFFECTS
+    """
+    vignette_type = model_df["vignette_type_collapsed"].astype(object)
+    return pd.DataFrame(
+        {
+            "(Intercept)": 1.0,
+            "vignette_type_collapsedNever Medevac": (
+                vignette_type == "Never Medevac"
+            ).astype(float),
+            "vignette_type_collapsedAlways Medevac": (
+                vignette_type == "Always Medevac"
+            ).astype(float),
+            "confidence_within": model_df["confidence_within"].astype(float),
+            "years_experience_centered": model_df["years_experience_centered"].astype(
+                float
+            ),
+            "rural_experienceYes": (
+                model_df["rural_experience"].astype(object) == "Yes"
+            ).astype(float),
+        },
+        index=model_df.index,
+    )
+
+
+@dataclass(frozen=True)
+class _Design:
+    """Response, fixed-effects design and grouping codes of a model."""
+
+    y: np.ndarray
+    X: np.ndarray
+    physician: np.ndarray
+    vignette: np.ndarray
+    n_physicians: int
+    n_vignettes: int
+
+    @property
+    def cell(self) -> np.ndarray:
+        """Flat physician × vignette index of each response."""
+        return self.physician * self.n_vignettes + self.vignette
+
+
+class _RandomEffectsHessian:
+    """
+    Factored Hessian ``I + Λ Z' W Z Λ`` of the spherical random effects.
+
+    The physician block is diagonal, so systems are solved by eliminating
+    it and factoring the Schur complement of the vignette block.
+    """
+
+    def __init__(self, design: _Design, sigma: np.ndarray, w: np.ndarray) -> None:
+        n_a, n_b = design.n_physicians, design.n_vignettes
+        self.d_a = 1 + sigma[0] ** 2 * np.bincount(design.physician, w, minlength=n_a)
+        d_b = 1 + sigma[1] ** 2 * np.bincount(design.vignette, w, minlength=n_b)
+        self.cross = (
+            sigma[0]
+            * sigma[1]
+            * np.bincount(design.cell, w, minlength=n_a * n_b).reshape(n_a, n_b)
+        )
+        schur = np.diag(d_b) - self.cross.T @ (self.cross / self.d_a[:, None])
+        self.schur = linalg.cho_factor(schur, lower=True)
+        self.n_a = n_a
+
+    def logdet(self) -> float:
+        """Log-determinant of the Hessian."""
+        return float(np.log(self.d_a).sum() + 2 * np.log(np.diag(self.schur[0])).sum())
+
+    def solve(self, rhs: np.ndarray) -> np.ndarray:
+        """Solve ``H x = rhs`` for a vector or a matrix of right-hand sides."""
+        d_a = self.d_a if rhs.ndim == 1 else self.d_a[:, None]
+        rhs_a, rhs_b = rhs[: self.n_a], rhs[self.n_a :]
+        x_b = linalg.cho_solve(self.schur, rhs_b - self.cross.T @ (rhs_a / d_a))
+        x_a = (rhs_a - self.cross @ x_b) / d_a
+        return np.concatenate([x_a, x_b])
+
+
+def _linear_predictor(
+    design: _Design, offset: np.ndarray, sigma: np.ndarray, u: np.ndarray
+) -> np.ndarray:
+    """``offset + Z Λ u`` for spherical random effects ``u``."""
+    n_a = design.n_physicians
+    return (
+        offset
+        + sigma[0] * u[:n_a][design.physician]
+        + sigma[1] * u[n_a:][design.vignette]
+    )
+
+
+def _penalized_loglik(y: np.ndarray, eta: np.ndarray, u: np.ndarray) -> float:
+    """Bernoulli log-likelihood minus half the squared norm of ``u``."""
+    return float(np.dot(y, eta) - np.logaddexp(0, eta).sum() - 0.5 * np.dot(u, u))
+
+
+def _random_effects_gradient(
+    design: _Design, sigma: np.ndarray, residual: np.ndarray, u: np.ndarray
+) -> np.ndarray:
+    """Gradient of the penalized log-likelihood with respect to ``u``."""
+    return (
+        np.concatenate(
+            [
+                sigma[0]
+                * np.bincount(
+                    design.physician, residual, minlength=design.n_physicians
+                ),
+                sigma[1]
+                * np.bincount(design.vignette, residual, minlength=design.n_vignettes),
+            ]
+        )
+        - u
+    )
+
+
+def _newton_step(
+    objective: Callable[[State], float],
+    state: State,
+    direction: State,
+    max_halvings: int = 30,
+) -> Tuple[State, float, float]:
+    """Take a Newton step, halving it until the objective does not decrease."""
+    current = objective(state)
+    step = 1.0
+    for _ in range(max_halvings):
+        candidate = tuple(s + step * d for s, d in zip(state, direction))
+        value = objective(candidate)
+        if value >= current - 1e-12:
+            return candidate, value, current
+        step /= 2
+    return state, current, current
+
+
+def _conditional_modes(
+    design: _Design,
+    beta: np.ndarray,
+    sigma: np.ndarray,
+    u: np.ndarray,
+    tol: float = 1e-10,
+    max_iter: int = 50,
+) -> Tuple[np.ndarray, _RandomEffectsHessian, float]:
+    """
+    Maximize the penalized log-likelihood over ``u`` for fixed parameters.
+
+    Returns:
+        Tuple of (u, Hessian at the mode, penalized log-likelihood)
+    """
+    offset = design.X @ beta
+
+    def objective(state: State) -> float:
+        return _penalized_loglik(
+            design.y, _linear_predictor(design, offset, sigma, state[0]), state[0]
+        )
+
+    for _ in range(max_iter):
+        mu = 1 / (1 + np.exp(-_linear_predictor(design, offset, sigma, u)))
+        hessian = _RandomEffectsHessian(design, sigma, mu * (1 - mu))
+        gradient = _random_effects_gradient(design, sigma, design.y - mu, u)
+        (u,), value, previous = _newton_step(
+            objective, (u,), (hessian.solve(gradient),)
+        )
+        if value - previous < tol:
+            break
+
+    mu = 1 / (1 + np.exp(-_linear_predictor(design, offset, sigma, u)))
+    return u, _RandomEffectsHessian(design, sigma, mu * (1 - mu)), objective((u,))
+
+
+def _fixed_effects_cross(
+    design: _Design, sigma: np.ndarray, w: np.ndarray
+) -> np.ndarray:
+    """Cross block ``Λ Z' W X`` of the joint Hessian."""
+    weighted = w[:, None] * design.X
+    by_physician = np.stack(
+        [
+            np.bincount(design.physician, weighted[:, j], minlength=design.n_physicians)
+            for j in range(design.X.shape[1])
+        ],
+        axis=1,
+    )
+    by_vignette = np.stack(
+        [
+            np.bincount(design.vignette, weighted[:, j], minlength=design.n_vignettes)
+            for j in range(design.X.shape[1])
+        ],
+        axis=1,
+    )
+    return np.concatenate([sigma[0] * by_physician, sigma[1] * by_vignette])
+
+
+def _joint_modes(
+    design: _Design,
+    sigma: np.ndarray,
+    beta: np.ndarray,
+    u: np.ndarray,
+    tol: float = 1e-10,
+    max_iter: int = 50,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Maximize the penalized log-likelihood jointly over ``beta`` and ``u``."""
+
+    def objective(state: State) -> float:
+        eta = _linear_predictor(design, design.X @ state[0], sigma, state[1])
+        return _penalized_loglik(design.y, eta, state[1])
+
+    for _ in range(max_iter):
+        mu = 1 / (1 + np.exp(-_linear_predictor(design, design.X @ beta, sigma, u)))
+        w = mu * (1 - mu)
+        hessian = _RandomEffectsHessian(design, sigma, w)
+        cross = _fixed_effects_cross(design, sigma, w)
+        grad_beta = design.X.T @ (design.y - mu)
+        grad_u = _random_effects_gradient(design, sigma, design.y - mu, u)
+
+        # Eliminate u from the joint Newton system
+        solved_cross = hessian.solve(cross)
+        solved_grad = hessian.solve(grad_u)
+        reduced = design.X.T @ (w[:, None] * design.X) - cross.T @ solved_cross
+        step_beta = np.linalg.solve(reduced, grad_beta - cross.T @ solved_grad)
+        step_u = solved_grad - solved_cross @ step_beta
+
+        (beta, u), value, previous = _newton_step(
+            objective, (beta, u), (step_beta, step_u)
+        )
+        if value - previous < tol:
+            break
+    return beta, u
+
+
+def _laplace_deviance(
+    design: _Design, beta: np.ndarray, sigma: np.ndarray, u: np.ndarray
+) -> Tuple[float, np.ndarray]:
+    """Laplace approximation of -2 log marginal likelihood, and the modes used."""
+    u, hessian, value = _conditional_modes(design, beta, sigma, u)
+    return -2 * value + hessian.logdet(), u
+
+
+def _fit(
+    design: _Design,
+    start: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+    max_iter: int = 500,
+) -> Dict[str, object]:
+    """
+    Laplace fit of the crossed random-intercept model.
+
+    Without a start, the variance parameters are first optimized with the
+    fixed effects profiled out at the joint penalized mode (``glmer``'s
+    ``nAGQ = 0`` stage), which then starts the full Laplace optimization.
+    """
+    n_random = design.n_physicians + design.n_vignettes
+    bounds = [(None, None)] * design.X.shape[1] + [(0, None)] * 2
+
+    if start is None:
+        u = np.zeros(n_random)
+        beta = np.zeros(design.X.shape[1])
+        profiled = {"beta": beta, "u": u}
+
+        def profiled_deviance(sigma: np.ndarray) -> float:
+            profiled["beta"], profiled["u"] = _joint_modes(
+                design, sigma, profiled["beta"], profiled["u"]
+            )
+            deviance, profiled["u"] = _laplace_deviance(
+                design, profiled["beta"], sigma, profiled["u"]
+            )
+            return deviance
+
+        sigma = optimize.minimize(
+            profiled_deviance, np.ones(2), method="L-BFGS-B", bounds=[(0, None)] * 2
+        ).x
+        beta, u = _joint_modes(design, sigma, profiled["beta"], profiled["u"])
+    else:
+        beta, sigma = (np.asarray(s, dtype=np.float64) for s in start)
+        u = np.zeros(n_random)
+
+    modes = {"u": u}
+
+    def deviance(params: np.ndarray) -> float:
+        deviance, modes["u"] = _laplace_deviance(
+            design, params[:-2], params[-2:], modes["u"]
+        )
+        return deviance
+
+    result = optimize.minimize(
+        deviance,
+        np.concatenate([beta, sigma]),
+        method="L-BFGS-B",
+        bounds=bounds,
+        options={"maxiter": max_iter},
+    )
+    beta, sigma = result.x[:-2], result.x[-2:]
+    value, u = _laplace_deviance(design, beta, sigma, modes["u"])
+    return {
+        "beta": beta,
+        "sigma": sigma,
+        "u": u,
+        "deviance": value,
+        "converged": bool(result.success),
+    }
+
+
+def _deviance_hessian(
+    design: _Design, params: np.ndarray, u: np.ndarray, step: float = 1e-4
+) -> np.ndarray:
+    """Central finite-difference Hessian of the Laplace deviance in (beta, sigma)."""
+    n = len(params)
+    steps = step * np.maximum(np.abs(params), 1.0)
+
+    def deviance(delta: np.ndarray) -> float:
+        x = params + delta
+        return _laplace_deviance(design, x[:-2], x[-2:], u)[0]
+
+    hessian = np.empty((n, n))
+    for i in range(n):
+        e_i = np.zeros(n)
+        e_i[i] = steps[i]
+        for j in range(i, n):
+            e_j = np.zeros(n)
+            e_j[j] = steps[j]
+            hessian[i, j] = hessian[j, i] = (
+                deviance(e_i + e_j)
+                - deviance(e_i - e_j)
+                - deviance(e_j - e_i)
+                + deviance(-e_i - e_j)
+            ) / (4 * steps[i] * steps[j])
+    return hessian
+
+
+def variance_component_summary(
+    var_physician: np.ndarray, var_vignette: np.ndarray
+) -> Dict[str, np.ndarray]:
+    """
+    ICC and median odds ratio of each random intercept.
+
+    The ICC of a component is its variance over the total latent variance
+    (both components plus the logistic variance π²/3); the MOR is
+    ``exp(sqrt(2 var) Φ⁻¹(0.75))``.
+
+    Args:
+        var_physician: Physician intercept variance (scalar or array)
+        var_vignette: Vignette intercept variance (scalar or array)
+
+    Returns:
+        Dictionary of var_physician, var_vignette, icc_physician,
+        icc_vignette, mor_physician and mor_vignette
+    """
+    var_physician = np.asarray(var_physician, dtype=np.float64)
+    var_vignette = np.asarray(var_vignette, dtype=np.float64)
+    total = var_physician + var_vignette + LOGISTIC_VARIANCE
+    return {
+        "var_physician": var_physician,
+        "var_vignette": var_vignette,
+        "icc_physician": var_physician / total,
+        "icc_vignette": var_vignette / total,
+        "mor_physician": np.exp(np.sqrt(2 * var_physician) * _Z75),
+        "mor_vignette": np.exp(np.sqrt(2 * var_vignette) * _Z75),
+    }
+
+
+@dataclass(frozen=True)
+class CrossedLogitFit:
+    """A fitted crossed random-intercept logistic model."""
+
+    coefficients: pd.Series
+    covariance: pd.DataFrame
+    sigma_physician: float
+    sigma_vignette: float
+    deviance: float
+    converged: bool
+    physician_effects: pd.Series
+    vignette_effects: pd.Series
+    design: _Design = field(repr=False)
+
+    @property
+    def n_obs(self) -> int:
+        """Number of responses."""
+        return len(self.design.y)
+
+    @property
+    def log_likelihood(self) -> float:
+        """Laplace-approximated log-likelihood."""
+        return -self.deviance / 2
+
+    @property
+    def aic(self) -> float:
+        """Akaike information criterion."""
+        return self.deviance + 2 * (len(self.coefficients) + 2)
+
+    @property
+    def bic(self) -> float:
+        """Bayesian information criterion."""
+        return self.deviance + math.log(self.n_obs) * (len(self.coefficients) + 2)
+
+    def fixed_effects(self, confidence_level: float = 0.95) -> pd.DataFrame:
+        """
+        Fixed effects with Wald tests and odds ratios.
+
+        Args:
+            confidence_level: Coverage of the Wald intervals
+
+        Returns:
+            DataFrame with columns: term, estimate, std_error, z_value,
+            p_value, odds_ratio, or_lower, or_upper
+        """
+        z_crit = NormalDist().inv_cdf(1 - (1 - confidence_level) / 2)
+        std_error = np.sqrt(np.diag(self.covariance.to_numpy()))
+        estimate = self.coefficients.to_numpy()
+        z_value = estimate / std_error
+        return pd.DataFrame(
+            {
+                "term": self.coefficients.index,
+                "estimate": estimate,
+                "std_error": std_error,
+                "z_value": z_value,
+                "p_value": [2 * (1 - NormalDist().cdf(abs(z))) for z in z_value],
+                "odds_ratio": np.exp(estimate),
+                "or_lower": np.exp(estimate - z_crit * std_error),
+                "or_upper": np.exp(estimate + z_crit * std_error),
+            }
+        )
+
+    def variance_components(self) -> Dict[str, float]:
+        """Variances, ICCs and MORs of the physician and vignette intercepts."""
+        summary = variance_component_summary(
+            self.sigma_physician**2, self.sigma_vignette**2
+        )
+        return {name: float(value) for name, value in summary.items()}
+
+
+def fit_crossed_logit(
+    y: np.ndarray,
+    X: pd.DataFrame,
+    physician: Sequence,
+    vignette: Sequence,
+    start: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+) -> CrossedLogitFit:
+    """
+    Fit a logistic model with crossed physician and vignette intercepts.
+
+    Args:
+        y: Binary response per row
+        X: Fixed-effects design matrix (its columns name the coefficients)
+        physician: Physician ID per row
+        vignette: Vignette ID per row
+        start: Optional (coefficients, (sigma_physician, sigma_vignette))
+            to start the Laplace optimization from, skipping the profiled
+            first stage
+
+    Returns:
+        The fitted model. As in ``glmer``, the fixed-effect covariance comes
+        from a finite-difference Hessian of the Laplace deviance; when a
+        variance is estimated at zero it falls back to the penalized
+        Hessian at the mode, conditional on the variances.
+    """
+    physician_codes, physicians = pd.factorize(pd.Series(physician), sort=True)
+    vignette_codes, vignettes = pd.factorize(pd.Series(vignette), sort=True)
+    design = _Design(
+        y=np.asarray(y, dtype=np.float64),
+        X=np.asarray(X, dtype=np.float64),
+        physician=physician_codes.astype(np.intp),
+        vignette=vignette_codes.astype(np.intp),
+        n_physicians=len(physicians),
+        n_vignettes=len(vignettes),
+    )
+    return _make_fit(
+        design, _fit(design, start), list(X.columns), physicians, vignettes
+    )
+
+
+def _make_fit(
+    design: _Design,
+    result: Dict[str, object],
+    terms: List[str],
+    physicians: pd.Index,
+    vignettes: pd.Index,
+) -> CrossedLogitFit:
+    """Assemble a CrossedLogitFit from a raw fit."""
+    beta, sigma, u = result["beta"], result["sigma"], result["u"]
+    n_beta = len(beta)
+
+    covariance = None
+    if (sigma > 0).all():
+        hessian = _deviance_hessian(design, np.concatenate([beta, sigma]), u)
+        try:
+            # The deviance is -2 log L, so its inverse Hessian is half the covariance
+            covariance = 2 * np.linalg.inv(hessian)[:n_beta, :n_beta]
+        except np.linalg.LinAlgError:
+            covariance = None
+        if covariance is not None and (np.diag(covariance) <= 0).any():
+            covariance = None
+    if covariance is None:
+        # Conditional on sigma: the joint penalized Hessian with u eliminated
+        mu = 1 / (1 + np.exp(-_linear_predictor(design, design.X @ beta, sigma, u)))
+        w = mu * (1 - mu)
+        cross = _fixed_effects_cross(design, sigma, w)
+        reduced = design.X.T @ (
+            w[:, None] * design.X
+        ) - cross.T @ _RandomEffectsHessian(design, sigma, w).solve(cross)
+        covariance = np.linalg.inv(reduced)
+
+    n_a = design.n_physicians
+    return CrossedLogitFit(
+        coefficients=pd.Series(beta, index=terms),
+        covariance=pd.DataFrame(covariance, index=terms, columns=terms),
+        sigma_physician=float(sigma[0]),
+        sigma_vignette=float(sigma[1]),
+        deviance=float(result["deviance"]),
+        converged=result["converged"],
+        physician_effects=pd.Series(sigma[0] * u[:n_a], index=physicians),
+        vignette_effects=pd.Series(sigma[1] * u[n_a:], index=vignettes),
+        design=design,
+    )
+
+
+@traced
+def fit_medevac_model(model_df: pd.DataFrame) -> CrossedLogitFit:
+    """
+    Fit the medevac propensity model of the final report.
+
+    Args:
+        model_df: Output of :func:`prepare_model_data`
+
+    Returns:
+        The fitted model
+    """
+    return fit_crossed_logit(
+        model_df["chose_medevac"],
+        design_matrix(model_df),
+        model_df["physician_id"],
+        model_df["question"],
+    )
+
+
+def _init_worker(design: _Design, beta: np.ndarray, sigma: np.ndarray) -> None:
+    """Store the fitted model once per worker process."""
+    _WORKER_STATE.update(design=design, beta=beta, sigma=sigma)
+
+
+def _bootstrap_batch(seed: np.random.SeedSequence, n: int) -> np.ndarray:
+    """Simulate and refit ``n`` replicates; returns their sigmas (NaN if a refit failed)."""
+    design = _WORKER_STATE["design"]
+    beta = _WORKER_STATE["beta"]
+    sigma = _WORKER_STATE["sigma"]
+    rng = np.random.default_rng(seed)
+    offset = design.X @ beta
+
+    sigmas = np.full((n, 2), np.nan)
+    for i in range(n):
+        u = rng.standard_normal(design.n_physicians + design.n_vignettes)
+        eta = _linear_predictor(design, offset, sigma, u)
+        y = (rng.random(len(eta)) < 1 / (1 + np.exp(-eta))).astype(np.float64)
+        replicate = _Design(
+            y,
+            design.X,
+            design.physician,
+            design.vignette,
+            design.n_physicians,
+            design.n_vignettes,
+        )
+        try:
+            with warnings.catch_warnings(), np.errstate(over="ignore"):
+                warnings.simplefilter("ignore", RuntimeWarning)
+                result = _fit(replicate, start=(beta, sigma))
+        except (np.linalg.LinAlgError, ValueError):
+            continue
+        if result["converged"]:
+            sigmas[i] = result["sigma"]
+    return sigmas
+
+
+@traced
+def bootstrap_variance_components(
+    fit: CrossedLogitFit,
+    n_boot: int = 1000,
+    confidence_level: float = 0.95,
+    seed: Optional[int] = None,
+    n_jobs: Optional[int] = 1,
+    batch_size: int = 50,
+) -> pd.DataFrame:
+    """
+    Parametric-bootstrap intervals for the variance components, ICC and MOR.
+
+    Each replicate draws new random intercepts and responses from the fitted
+    model and refits it, starting from the fitted estimates. Replicates whose
+    refit does not converge are dropped and counted.
+
+    Args:
+        fit: Output of :func:`fit_crossed_logit` or :func:`fit_medevac_model`
+        n_boot: Number of bootstrap replicates
+        confidence_level: Coverage of the percentile intervals
+        seed: Seed for reproducible replicates
+        n_jobs: Number of worker processes (None uses all CPUs)
+        batch_size: Replicates refitted per task
+
+    Returns:
+        DataFrame with columns: parameter, estimate, std_error, ci_lower,
+        ci_upper, n_valid
+    """
+    sizes = [batch_size] * (n_boot // batch_size)
+    if n_boot % batch_size:
+        sizes.append(n_boot % batch_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    init_args = (
+        fit.design,
+        fit.coefficients.to_numpy(),
+        np.array([fit.sigma_physician, fit.sigma_vignette]),
+    )
+
+    if n_jobs == 1:
+        _init_worker(*init_args)
+        try:
+            results = [_bootstrap_batch(s, n) for s, n in zip(seeds, sizes)]
+        finally:
+            _WORKER_STATE.clear()
+    else:
+        with ProcessPoolExecutor(
+            max_workers=n_jobs or os.cpu_count(),
+            initializer=_init_worker,
+            initargs=init_args,
+        ) as executor:
+            results = list(executor.map(_bootstrap_batch, seeds, sizes))
+
+    sigmas = np.concatenate(results)
+    sigmas = sigmas[~np.isnan(sigmas).any(axis=1)]
+    replicates = variance_component_summary(sigmas[:, 0] ** 2, sigmas[:, 1] ** 2)
+    estimates = fit.variance_components()
+
+    alpha = 1 - confidence_level
+    rows = []
+    for parameter, values in replicates.items():
+        if len(values):
+            lower, upper = np.quantile(values, [alpha / 2, 1 - alpha / 2])
+        else:
+            lower = upper = np.nan
+        rows.append(
+            {
+                "parameter": parameter,
+                "estimate": estimates[parameter],
+                "std_error": np.std(values, ddof=1) if len(values) > 1 else np.nan,
+                "ci_lower": lower,
+                "ci_upper": upper,
+                "n_valid": len(values),
+            }
+        )
+    return pd.DataFrame(rows)
@@ -0,0 +1,176 @@
+"""
+Physician × physician agreement and Cohen's Kappa matrices.
+
+Two physicians agree on a question when their one-hot decision vectors
+have a common entry, so with the ratings flattened to a physician ×
+(question, decision) matrix ``X``, ``X @ X.T`` counts the agreeing
+questions of every pair at once. The questions two physicians both
+answered, and each physician's decision counts on them (the margins of
+their Cohen's Kappa), are matrix products of the same kind. Vignette
+classes are handled by masking ``X`` per class and stacking the masked
+copies, so all classes share one batched product.
+"""
+
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .analysis import build_rating_matrix, one_hot_ratings, question_class_codes
+from .instrumentation import traced
+
+PAIRWISE_METRICS = ("percentage_agreement", "cohens_kappa", "n_shared")
+LINKAGE_METHODS = ("average", "complete", "single", "weighted")
+
+
+def pairwise_statistics(
+    onehot: np.ndarray, masks: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Pairwise agreement, Cohen's Kappa and shared questions from a one-hot tensor.
+
+    Args:
+        onehot: Array of shape (n_physicians, n_questions, n_categories)
+            from :func:`one_hot_ratings`
+        masks: Question masks of shape (n_units, n_questions); each unit's
+            statistics use the questions where its mask is 1
+
+    Returns:
+        Tuple of (agreement, kappa, n_shared), each of shape (n_units,
+        n_physicians, n_physicians). A pair's statistics use only the
+        questions both physicians answered; they are NaN where there are
+        none, and kappa is NaN where chance agreement is 1.
+    """
+    n_physicians, n_questions, n_categories = onehot.shape
+    answered = onehot.sum(axis=-1)
+    masked = onehot[None] * masks[:, None, :, None]
+
+    agreeing = (
+        masked.reshape(len(masks), n_physicians, -1)
+        @ onehot.reshape(n_physicians, -1).T
+    )
+    n_shared = (answered[None] * masks[:, None]) @ answered.T
+    # margins[u, r, s, c]: how often r chose c on the questions s also answered
+    margins = masked.transpose(0, 1, 3, 2) @ answered.T
+    margins = margins.transpose(0, 1, 3, 2)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        agreement = np.where(n_shared > 0, agreeing / n_shared, np.nan)
+        chance = (margins * margins.transpose(0, 2, 1, 3)).sum(axis=-1) / n_shared**2
+        kappa = np.where(
+            (n_shared > 0) & (chance < 1), (agreement - chance) / (1 - chance), np.nan
+        )
+    return agreement, kappa, n_shared
+
+
+@traced
+def pairwise_rater_matrices(
+    df: pd.DataFrame, by_class: bool = True
+) -> Dict[Tuple[str, str], pd.DataFrame]:
+    """
+    Physician × physician agreement and Cohen's Kappa, overall and per class.
+
+    Each pair is compared on the questions both physicians answered:
+    percentage agreement is the share of those questions with the same
+    decision, and Cohen's Kappa uses each physician's own decision
+    frequencies on them for chance agreement. The diagonal compares each
+    physician with themselves.
+
+    Args:
+        df: Long-format dataframe with columns: physician_id, question,
+            decision, and vignette_class when ``by_class`` is True
+        by_class: Also compute the matrices within each vignette class
+
+    Returns:
+        Dictionary keyed by (unit, metric), where unit is "overall" or a
+        vignette class and metric is one of :data:`PAIRWISE_METRICS`, of
+        square dataframes indexed by physician_id on both axes
+    """
+    codes, physicians, questions, categories = build_rating_matrix(df)
+    onehot = one_hot_ratings(codes, len(categories))
+
+    units = ["overall"]
+    masks = [np.ones(len(questions))]
+    if by_class:
+        class_codes, classes = question_class_codes(df, questions)
+        units += list(classes)
+        masks += [
+            (class_codes == code).astype(np.float64) for code in range(len(classes))
+        ]
+
+    statistics = pairwise_statistics(onehot, np.array(masks))
+    index = pd.Index(physicians, name="physician_id")
+    return {
+        (unit, metric): pd.DataFrame(values[i], index=index, columns=index.copy())
+        for metric, values in zip(PAIRWISE_METRICS, statistics)
+        for i, unit in enumerate(units)
+    }
+
+
+@traced
+def cluster_raters(
+    matrix: pd.DataFrame,
+    n_clusters: Optional[int] = None,
+    distance_threshold: Optional[float] = None,
+    method: str = "average",
+) -> Tuple[pd.DataFrame, np.ndarray]:
+    """
+    Hierarchically cluster physicians by a pairwise agreement or kappa matrix.
+
+    The distance between two physicians is 1 minus the matrix entry; pairs
+    without shared questions get the largest observed distance. Clusters
+    can be compared with practice location or other covariates through
+    :meth:`PhysicianDimension.join`.
+
+    Args:
+        matrix: A square matrix from :func:`pairwise_rater_matrices`
+        n_clusters: Cut the tree into this many clusters
+        distance_threshold: Cut the tree at this distance instead
+        method: Linkage method, one of :data:`LINKAGE_METHODS`
+
+    Returns:
+        Tuple of (clusters, linkage). clusters has columns physician_id,
+        cluster (numbered from 1) and leaf_order (position in the
+        dendrogram); linkage is the SciPy linkage matrix, e.g. for
+        ``scipy.cluster.hierarchy.dendrogram``.
+
+    Raises:
+        ValueError: If the matrix is not square or the arguments are invalid
+    """
+    from scipy.cluster import hierarchy
+    from scipy.spatial.distance import squareform
+
+    if method not in LINKAGE_METHODS:
+        raise ValueError(f"method must be one of {LINKAGE_METHODS}, got {method!r}")
+    if (n_clusters is None) == (distance_threshold is None):
+        raise ValueError("Give exactly one of n_clusters and distance_threshold")
+    if matrix.shape[0] != matrix.shape[1] or not matrix.index.equals(matrix.columns):
+        raise ValueError("matrix must be square with the same physicians on both axes")
+    if len(matrix) < 2:
+        raise ValueError("At least two physicians are needed for clustering")
+
+    distance = 1 - matrix.to_numpy(dtype=np.float64)
+    distance = (distance + distance.T) / 2
+    finite = distance[np.isfinite(distance)]
+    distance[~np.isfinite(distance)] = finite.max() if len(finite) else 1.0
+    np.fill_diagonal(distance, 0.0)
+    # Kappa below zero gives distances above 1, which linkage accepts;
+    # only rounding can push a distance below zero
+    distance = np.clip(distance, 0.0, None)
+
+    linkage = hierarchy.linkage(squareform(distance, checks=False), method=method)
+    if n_clusters is not None:
+        labels = hierarchy.fcluster(linkage, n_clusters, criterion="maxclust")
+    else:
+        labels = hierarchy.fcluster(linkage, distance_threshold, criterion="distance")
+
+    leaf_order = np.empty(len(matrix), dtype=np.int64)
+    leaf_order[hierarchy.leaves_list(linkage)] = np.arange(len(matrix))
+    clusters = pd.DataFrame(
+        {
+            "physician_id": matrix.index.to_numpy(),
+            "cluster": labels,
+            "leaf_order": leaf_order,
+        }
+    )
+    return clusters, linkage
@@ -0,0 +1,237 @@
+"""
+Permutation tests for differences in agreement between vignette classes.
+
+Class labels are shuffled across questions while each question keeps its own
+decision counts. For a chunk of permutations the label assignments form an
+(n_permutations × n_questions) matrix, and class statistics for every
+permutation are computed from it at once.
+"""
+
+import math
+from itertools import combinations, islice
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .analysis import (
+    _pairwise_agreement_terms,
+    build_count_matrix,
+    fleiss_kappa_from_counts,
+    question_class_codes,
+)
+from .instrumentation import traced
+
+PERMUTATION_METRICS = ("mean_percentage_agreement", "fleiss_kappa")
+
+
+def _class_statistics(
+    assignments: np.ndarray, counts: np.ndarray, n_classes: int
+) -> Dict[str, np.ndarray]:
+    """
+    Class statistics for a batch of class-label assignments.
+
+    Args:
+        assignments: Class code per question, shape (n_permutations, n_questions)
+        counts: Question × category count matrix
+        n_classes: Number of vignette classes
+
+    Returns:
+        Dictionary of metric name to (n_permutations, n_classes) arrays, plus
+        the number of questions contributing to each metric and class
+    """
+    agreeing_pairs, total_pairs = _pairwise_agreement_terms(counts)
+    defined = total_pairs > 0
+    with np.errstate(invalid="ignore", divide="ignore"):
+        question_agreement = np.where(defined, agreeing_pairs / total_pairs, 0.0)
+
+    shape = (len(assignments), n_classes)
+    agreement = np.empty(shape)
+    kappa = np.empty(shape)
+    n_defined = np.empty(shape)
+
+    for code in range(n_classes):
+        membership = (assignments == code).astype(np.float64)
+        n_defined[:, code] = membership @ defined
+        with np.errstate(invalid="ignore", divide="ignore"):
+            agreement[:, code] = (membership @ question_agreement) / n_defined[:, code]
+        kappa[:, code] = fleiss_kappa_from_counts(counts, weights=membership)[:, 0]
+
+    return {
+        "mean_percentage_agreement": agreement,
+        "fleiss_kappa": kappa,
+        "n_defined": n_defined,
+    }
+
+
+def _omnibus(statistics: np.ndarray, sizes: np.ndarray) -> np.ndarray:
+    """Size-weighted between-class sum of squares, ignoring undefined classes."""
+    weights = np.where(np.isnan(statistics), 0.0, sizes)
+    values = np.nan_to_num(statistics)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        grand_mean = (weights * values).sum(axis=-1, keepdims=True) / weights.sum(
+            axis=-1, keepdims=True
+        )
+    return (weights * (values - grand_mean) ** 2).sum(axis=-1)
+
+
+def _test_statistics(
+    class_stats: Dict[str, np.ndarray], pairs: List[Tuple[int, int]]
+) -> Dict[Tuple[str, str], np.ndarray]:
+    """Pairwise absolute differences and omnibus statistics per metric."""
+    tests = {}
+    for metric in PERMUTATION_METRICS:
+        values = class_stats[metric]
+        for i, j in pairs:
+            tests[(metric, f"{i}-{j}")] = np.abs(values[:, i] - values[:, j])
+        tests[(metric, "omnibus")] = _omnibus(values, class_stats["n_defined"])
+    return tests
+
+
+def count_distinct_assignments(class_codes: np.ndarray) -> int:
+    """
+    Number of distinct ways to relabel questions keeping the class sizes.
+
+    Args:
+        class_codes: Class code per question
+
+    Returns:
+        Multinomial coefficient n! / (n_1! ... n_k!)
+    """
+    total = math.factorial(len(class_codes))
+    for size in np.bincount(class_codes):
+        total //= math.factorial(int(size))
+    return total
+
+
+def _enumerate_assignments(class_codes: np.ndarray) -> Iterator[np.ndarray]:
+    """Yield every distinct class-label assignment with the observed class sizes."""
+    sizes = np.bincount(class_codes)
+    current = np.empty(len(class_codes), dtype=np.intp)
+
+    def assign(free: Tuple[int, ...], code: int) -> Iterator[np.ndarray]:
+        if code == len(sizes) - 1:
+            current[list(free)] = code
+            yield current.copy()
+            return
+        for chosen in combinations(free, int(sizes[code])):
+            current[list(chosen)] = code
+            taken = set(chosen)
+            remaining = tuple(p for p in free if p not in taken)
+            yield from assign(remaining, code + 1)
+
+    yield from assign(tuple(range(len(class_codes))), 0)
+
+
+def _chunks(iterator: Iterator[np.ndarray], chunk_size: int) -> Iterator[np.ndarray]:
+    """Stack an iterator of assignments into chunks."""
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield np.stack(chunk)
+
+
+def _random_chunks(
+    class_codes: np.ndarray,
+    n_permutations: int,
+    chunk_size: int,
+    rng: np.random.Generator,
+) -> Iterator[np.ndarray]:
+    """Yield random relabelings in chunks of at most ``chunk_size``."""
+    for start in range(0, n_permutations, chunk_size):
+        n = min(chunk_size, n_permutations - start)
+        order = rng.random((n, len(class_codes))).argsort(axis=1)
+        yield class_codes[order]
+
+
+@traced
+def permutation_test_by_class(
+    df: pd.DataFrame,
+    n_permutations: int = 10000,
+    max_exact: int = 20000,
+    chunk_size: int = 1000,
+    seed: Optional[int] = None,
+) -> pd.DataFrame:
+    """
+    Test whether agreement differs between vignette classes.
+
+    Class labels are permuted across questions, keeping the number of
+    questions per class. Pairwise tests use the absolute difference in the
+    class statistic; the omnibus test uses the between-class sum of squares
+    weighted by the number of questions in each class. When the number of
+    distinct relabelings is at most ``max_exact`` all of them are enumerated
+    and the p-value is exact; otherwise ``n_permutations`` random relabelings
+    are drawn and the p-value is (1 + exceedances) / (1 + n_permutations).
+
+    Args:
+        df: Long-format dataframe with columns: physician_id, question,
+            decision, vignette_class
+        n_permutations: Number of random relabelings for the Monte Carlo test
+        max_exact: Largest number of relabelings to enumerate exactly
+        chunk_size: Relabelings evaluated at a time (bounds memory)
+        seed: Seed for the Monte Carlo relabelings
+
+    Returns:
+        DataFrame with columns: metric, comparison, class_1, class_2,
+        observed, p_value, n_permutations, exact
+    """
+    counts, questions, _ = build_count_matrix(df)
+    class_codes, classes = question_class_codes(df, questions)
+    n_classes = len(classes)
+    pairs = list(combinations(range(n_classes), 2))
+
+    observed_stats = _class_statistics(class_codes[None], counts, n_classes)
+    observed = {
+        key: value[0] for key, value in _test_statistics(observed_stats, pairs).items()
+    }
+
+    n_distinct = count_distinct_assignments(class_codes)
+    exact = n_distinct <= max_exact
+    if exact:
+        chunks = _chunks(_enumerate_assignments(class_codes), chunk_size)
+        n_total = n_distinct
+    else:
+        rng = np.random.default_rng(seed)
+        chunks = _random_chunks(class_codes, n_permutations, chunk_size, rng)
+        n_total = n_permutations
+
+    exceedances = {key: 0 for key in observed}
+    for assignments in chunks:
+        permuted = _test_statistics(
+            _class_statistics(assignments, counts, n_classes), pairs
+        )
+        for key, values in permuted.items():
+            # Small tolerance so ties with the observed value count as exceedances
+            exceedances[key] += int((values >= observed[key] - 1e-12).sum())
+
+    rows = []
+    for key, value in observed.items():
+        metric, comparison = key
+        class_1 = class_2 = None
+        if comparison != "omnibus":
+            i, j = map(int, comparison.split("-"))
+            class_1, class_2 = classes[i], classes[j]
+            comparison = f"{class_1} vs {class_2}"
+
+        if np.isnan(value):
+            p_value = np.nan
+        elif exact:
+            p_value = exceedances[key] / n_total
+        else:
+            p_value = (1 + exceedances[key]) / (1 + n_total)
+
+        rows.append(
+            {
+                "metric": metric,
+                "comparison": comparison,
+                "class_1": class_1,
+                "class_2": class_2,
+                "observed": value,
+                "p_value": p_value,
+                "n_permutations": n_total,
+                "exact": exact,
+            }
+        )
+
+    return pd.DataFrame(rows)
@@ -0,0 +1,249 @@
+"""
+Physician dimension: the covariate files as one validated, indexed table.
+
+The covariates are spread over physician_experience.csv,
+practice_location.csv and rural_experience.csv, each keyed by
+physician_id. :class:`PhysicianDimension` reads them once into a typed
+table indexed by physician_id, adds derived fields, and records duplicate
+or missing IDs as issues. Joins to the long-format responses look up each
+response's row position in the index once and take the covariates by
+position, so no string merges are repeated and the joined columns can be
+sliced for subgroup analyses directly.
+"""
+
+import warnings
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .confidence import tertiles_from_percentiles
+
+# File name → covariate columns it provides
+COVARIATE_FILES: Dict[str, List[str]] = {
+    "physician_experience.csv": ["training_year", "years_experience"],
+    "practice_location.csv": ["practice_location"],
+    "rural_experience.csv": ["rural_experience"],
+}
+
+# Practice locations counted as rural experience in the final report
+RURAL_LOCATIONS = ("Regional Hub", "Mixed")
+YES_NO = ["No", "Yes"]
+
+
+def _experience_tertiles(years: pd.Series) -> pd.Categorical:
+    """Low, Medium or High thirds of the physicians by years of experience."""
+    return tertiles_from_percentiles(years.rank(pct=True).to_numpy())
+
+
+class PhysicianDimension:
+    """
+    One row of covariates per physician, indexed by physician_id.
+
+    Columns:
+        training_year: Year training was completed (nullable integer)
+        years_experience: Years in practice
+        practice_location: Referral Hub, Regional Hub or Mixed (categorical)
+        rural_experience: Self-reported rural experience, No/Yes
+        rural_by_location: Yes for a Regional Hub or Mixed practice, the
+            definition used in the final report
+        experience_tertile: Low/Medium/High thirds of years_experience
+
+    Attributes:
+        table: The covariate table
+        issues: Problems found while building the table, one row per
+            physician and problem, with columns physician_id, issue, source
+    """
+
+    def __init__(
+        self, table: pd.DataFrame, issues: Optional[pd.DataFrame] = None
+    ) -> None:
+        """
+        Args:
+            table: Covariates indexed by unique physician_id
+            issues: Problems found in the sources (default: none)
+
+        Raises:
+            ValueError: If the index has duplicate physician IDs
+        """
+        if not table.index.is_unique:
+            raise ValueError("Physician IDs of the dimension must be unique")
+        self.table = table
+        self.issues = (
+            issues
+            if issues is not None
+            else pd.DataFrame(columns=["physician_id", "issue", "source"])
+        )
+
+    @classmethod
+    def from_files(cls, data_dir: Path, strict: bool = False) -> "PhysicianDimension":
+        """
+        Load and validate the covariate files of a data directory.
+
+        A physician listed more than once in a file keeps its first row, and
+        one missing from some files gets missing values for their columns;
+        both are recorded in :attr:`issues` and reported with a warning.
+        Files that do not exist leave their columns missing.
+
+        Args:
+            data_dir: Directory containing the covariate files
+            strict: Raise instead of warning about duplicate or missing IDs
+
+        Returns:
+            The physician dimension
+
+        Raises:
+            ValueError: If ``strict`` and a file has duplicate or missing IDs
+        """
+        frames = {}
+        for filename, columns in COVARIATE_FILES.items():
+            path = Path(data_dir) / filename
+            if path.exists():
+                frames[filename] = pd.read_csv(path, usecols=["physician_id", *columns])
+
+        issues = []
+        for filename, frame in frames.items():
+            duplicated = frame.loc[frame["physician_id"].duplicated(), "physician_id"]
+            issues.extend((pid, "duplicate", filename) for pid in duplicated.unique())
+            frames[filename] = frame.drop_duplicates("physician_id").set_index(
+                "physician_id"
+            )
+
+        ids = pd.Index(
+            sorted(set().union(*(frame.index for frame in frames.values()))),
+            name="physician_id",
+            dtype=np.int64,
+        )
+        for filename, frame in frames.items():
+            issues.extend(
+                (pid, "missing", filename) for pid in ids.difference(frame.index)
+            )
+
+        columns = {}
+        for filename, names in COVARIATE_FILES.items():
+            frame = frames.get(filename)
+            for name in names:
+                columns[name] = (
+                    frame[name].reindex(ids)
+                    if frame is not None
+                    else pd.Series(np.nan, index=ids)
+                )
+        issues = pd.DataFrame(issues, columns=["physician_id", "issue", "source"])
+        dimension = cls(cls._typed_table(columns, ids), issues)
+        dimension._report(strict)
+        return dimension
+
+    @staticmethod
+    def _typed_table(columns: Dict[str, pd.Series], ids: pd.Index) -> pd.DataFrame:
+        """The dimension table from the raw covariate columns."""
+        location = columns["practice_location"].astype("category")
+        rural_by_location = np.where(location.isin(RURAL_LOCATIONS), "Yes", "No")
+        table = pd.DataFrame(
+            {
+                "training_year": columns["training_year"].astype("Int64"),
+                "years_experience": columns["years_experience"].astype(np.float64),
+                "practice_location": location,
+                "rural_experience": pd.Categorical(
+                    columns["rural_experience"], categories=YES_NO
+                ),
+                "rural_by_location": pd.Categorical(
+                    np.where(location.isna(), None, rural_by_location),
+                    categories=YES_NO,
+                ),
+            },
+            index=ids,
+        )
+        table["experience_tertile"] = _experience_tertiles(table["years_experience"])
+        return table
+
+    def _report(self, strict: bool) -> None:
+        """Warn about (or raise on) the recorded issues."""
+        if self.issues.empty:
+            return
+        details = "; ".join(
+            f"{issue} in {source}: {sorted(group['physician_id'].tolist())}"
+            for (issue, source), group in self.issues.groupby(["issue", "source"])
+        )
+        message = f"Physician covariate files have inconsistent IDs ({details})"
+        if strict:
+            raise ValueError(message)
+        warnings.warn(message, stacklevel=3)
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+    @property
+    def physician_ids(self) -> pd.Index:
+        """IDs of the physicians in the dimension."""
+        return self.table.index
+
+    def positions(self, physician_ids: Sequence[int]) -> np.ndarray:
+        """
+        Row positions of physicians in the table.
+
+        Args:
+            physician_ids: IDs to look up, e.g. a long frame's physician_id
+
+        Returns:
+            Integer array aligned with ``physician_ids``; -1 for IDs not in
+            the dimension
+        """
+        return self.table.index.get_indexer(np.asarray(physician_ids))
+
+    def join(
+        self,
+        df: pd.DataFrame,
+        columns: Optional[Sequence[str]] = None,
+        warn_missing: bool = True,
+    ) -> pd.DataFrame:
+        """
+        Add physician covariates to rows keyed by physician_id.
+
+        Args:
+            df: Frame with a physician_id column, e.g. long-format responses
+            columns: Covariates to add (default: all)
+            warn_missing: Warn about physicians of ``df`` without covariates
+
+        Returns:
+            Copy of ``df`` with the covariate columns appended (missing where
+            the physician is not in the dimension); categorical covariates
+            keep their categories
+        """
+        columns = list(columns) if columns is not None else list(self.table.columns)
+        positions = self.positions(df["physician_id"])
+        unknown = positions < 0
+        if warn_missing and unknown.any():
+            ids = sorted(pd.unique(df.loc[unknown, "physician_id"]).tolist())
+            listed = ", ".join(map(str, ids[:10])) + (", ..." if len(ids) > 10 else "")
+            warnings.warn(
+                f"No covariates for {len(ids)} physicians: {listed}", stacklevel=2
+            )
+
+        joined = df.copy()
+        for name in columns:
+            values = self.table[name].array.take(positions, allow_fill=True)
+            joined[name] = pd.Series(values, index=df.index)
+        return joined
+
+    def select(self, **criteria: object) -> pd.Index:
+        """
+        IDs of the physicians matching every criterion.
+
+        Args:
+            **criteria: Column name → value, or list of accepted values
+
+        Returns:
+            Matching physician IDs
+
+        Raises:
+            ValueError: If a criterion names an unknown column
+        """
+        unknown = set(criteria) - set(self.table.columns)
+        if unknown:
+            raise ValueError(f"Unknown physician columns: {sorted(unknown)}")
+        mask = np.ones(len(self.table), dtype=bool)
+        for name, value in criteria.items():
+            accepted = value if isinstance(value, (list, tuple, set)) else [value]
+            mask &= self.table[name].isin(accepted).to_numpy()
+        return self.table.index[mask]
@@ -0,0 +1,521 @@
+"""
+Content-hashed stage runner for the Python → R → Quarto workflow.
+
+Each :class:`Stage` declares the files it reads and writes. A stage is
+fresh when the hashes of its inputs and its own version string match the
+last successful run and its outputs are unchanged since; otherwise it is
+stale and reruns, which makes everything downstream of it stale too.
+Stages whose inputs are ready run concurrently in a thread pool (stages
+are mostly external processes or NumPy-heavy Python).
+
+The run state is a JSON file recording each stage's key and output
+hashes. File hashes are memoized on size and modification time, so an
+unchanged tree is checked without reading large files again.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Set
+
+import pandas as pd
+
+from . import __version__
+from .cache import file_digest
+
+STATE_FORMAT_VERSION = 1
+DEFAULT_STATE_PATH = Path(".pipeline") / "state.json"
+
+ProgressCallback = Callable[[Dict[str, object]], None]
+
+
+@dataclass(frozen=True)
+class Stage:
+    """
+    A step of the workflow.
+
+    Attributes:
+        name: Unique stage name
+        inputs: Files read by the stage, relative to the pipeline root
+        outputs: Files written by the stage, relative to the pipeline root
+        action: Called with the pipeline root to run the stage
+        version: Part of the stage key other than its input files (e.g. a
+            command line or parameters); changing it reruns the stage
+    """
+
+    name: str
+    inputs: Sequence[Path]
+    outputs: Sequence[Path]
+    action: Callable[[Path], None] = field(repr=False)
+    version: str = ""
+
+
+def command_stage(
+    name: str, command: Sequence[str], inputs: Sequence[Path], outputs: Sequence[Path]
+) -> Stage:
+    """
+    A stage that runs an external command in the pipeline root.
+
+    Args:
+        name: Unique stage name
+        command: Program and arguments
+        inputs: Files read by the command
+        outputs: Files written by the command
+
+    Returns:
+        The stage; its version is the command line
+    """
+    command = list(command)
+
+    def run(root: Path) -> None:
+        if shutil.which(command[0]) is None:
+            raise FileNotFoundError(f"{command[0]} is not installed or not on PATH")
+        subprocess.run(command, cwd=root, check=True)
+
+    return Stage(
+        name,
+        [Path(p) for p in inputs],
+        [Path(p) for p in outputs],
+        run,
+        version=json.dumps(command),
+    )
+
+
+class StaleOutputError(RuntimeError):
+    """A stage finished without writing all of its declared outputs."""
+
+
+class Pipeline:
+    """
+    A set of stages connected through their files.
+
+    A stage depends on every stage that writes one of its inputs.
+    """
+
+    def __init__(
+        self,
+        stages: Sequence[Stage],
+        root: Path = Path("."),
+        state_path: Optional[Path] = None,
+    ) -> None:
+        """
+        Args:
+            stages: Stages of the workflow
+            root: Directory the stage paths are relative to
+            state_path: Run state file (default: ``<root>/.pipeline/state.json``)
+
+        Raises:
+            ValueError: If stage names or outputs are not unique, or the
+                stages form a cycle
+        """
+        self.root = Path(root)
+        self.state_path = (
+            Path(state_path) if state_path else self.root / DEFAULT_STATE_PATH
+        )
+        self.stages = {stage.name: stage for stage in stages}
+        if len(self.stages) != len(stages):
+            raise ValueError("Stage names must be unique")
+
+        producers: Dict[Path, str] = {}
+        for stage in stages:
+            for output in stage.outputs:
+                if output in producers:
+                    raise ValueError(
+                        f"{output} is written by both {producers[output]} and {stage.name}"
+                    )
+                producers[output] = stage.name
+        self.dependencies: Dict[str, Set[str]] = {
+            stage.name: {producers[p] for p in stage.inputs if p in producers}
+            - {stage.name}
+            for stage in stages
+        }
+        self.order = self._topological_order()
+
+    def _topological_order(self) -> List[str]:
+        """Stage names with every stage after its dependencies."""
+        order: List[str] = []
+        remaining = dict(self.dependencies)
+        while remaining:
+            ready = [name for name, deps in remaining.items() if deps <= set(order)]
+            if not ready:
+                raise ValueError(f"Stages form a cycle: {sorted(remaining)}")
+            order.extend(ready)
+            for name in ready:
+                del remaining[name]
+        return order
+
+    def upstream(self, targets: Sequence[str]) -> Set[str]:
+        """The target stages and every stage they depend on."""
+        unknown = set(targets) - set(self.stages)
+        if unknown:
+            raise ValueError(f"Unknown stages: {sorted(unknown)}")
+        selected: Set[str] = set()
+        pending = list(targets)
+        while pending:
+            name = pending.pop()
+            if name not in selected:
+                selected.add(name)
+                pending.extend(self.dependencies[name])
+        return selected
+
+    def _load_state(self) -> Dict[str, Dict]:
+        """Stage records and file hash memo from the state file."""
+        if self.state_path.exists():
+            state = json.loads(self.state_path.read_text())
+            if state.get("format_version") == STATE_FORMAT_VERSION:
+                return state
+        return {"format_version": STATE_FORMAT_VERSION, "stages": {}, "files": {}}
+
+    def _save_state(self, state: Dict[str, Dict]) -> None:
+        """Write the state file atomically."""
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.state_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(state, indent=2, sort_keys=True) + "\n")
+        os.replace(tmp_path, self.state_path)
+
+    def _digest(self, path: Path, state: Dict[str, Dict]) -> Optional[str]:
+        """Content hash of a file (None if missing), memoized on size and mtime."""
+        full_path = self.root / path
+        try:
+            stat = full_path.stat()
+        except FileNotFoundError:
+            return None
+        memo = state["files"].get(str(path))
+        if memo is not None and memo[:2] == [stat.st_size, stat.st_mtime_ns]:
+            return memo[2]
+        digest = file_digest(full_path)
+        state["files"][str(path)] = [stat.st_size, stat.st_mtime_ns, digest]
+        return digest
+
+    def _stage_key(self, stage: Stage, state: Dict[str, Dict]) -> str:
+        """Hash of the stage's input contents and version."""
+        inputs = {}
+        for path in stage.inputs:
+            digest = self._digest(path, state)
+            if digest is None:
+                raise FileNotFoundError(
+                    f"Input of stage {stage.name} not found: {path}"
+                )
+            inputs[str(path)] = digest
+        material = json.dumps([stage.version, __version__, inputs], sort_keys=True)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def _is_fresh(self, stage: Stage, key: str, state: Dict[str, Dict]) -> bool:
+        """Whether the last run of the stage had this key and its outputs are untouched."""
+        record = state["stages"].get(stage.name)
+        if record is None or record["key"] != key:
+            return False
+        return all(
+            self._digest(path, state) == record["outputs"].get(str(path))
+            for path in stage.outputs
+        )
+
+    def plan(
+        self, targets: Optional[Sequence[str]] = None, force: bool = False
+    ) -> List[str]:
+        """
+        Stages a run would execute, in order, without running anything.
+
+        A stage whose inputs are missing is listed, as running it reports
+        the missing file.
+
+        Args:
+            targets: Stages to bring up to date (all if None)
+            force: Plan to run every selected stage
+
+        Returns:
+            Names of the stale stages and everything downstream of them
+        """
+        selected = self.upstream(targets) if targets is not None else set(self.stages)
+        state = self._load_state()
+        stale: Set[str] = set()
+        for name in self.order:
+            if name not in selected:
+                continue
+            stage = self.stages[name]
+            if force or self.dependencies[name] & stale:
+                stale.add(name)
+                continue
+            try:
+                fresh = self._is_fresh(stage, self._stage_key(stage, state), state)
+            except FileNotFoundError:
+                fresh = False
+            if not fresh:
+                stale.add(name)
+        return [name for name in self.order if name in stale]
+
+    def run(
+        self,
+        targets: Optional[Sequence[str]] = None,
+        jobs: Optional[int] = None,
+        force: bool = False,
+        progress: Optional[ProgressCallback] = None,
+    ) -> pd.DataFrame:
+        """
+        Bring the selected stages up to date.
+
+        Stages run as soon as everything they depend on is up to date, up
+        to ``jobs`` at a time. A failed stage is recorded and the stages
+        depending on it are skipped; independent stages still run.
+
+        Args:
+            targets: Stages to bring up to date, with their dependencies
+                (all if None)
+            jobs: Maximum concurrent stages (None uses all CPUs)
+            force: Rerun every selected stage
+            progress: Optional callback called with each stage's result row
+
+        Returns:
+            DataFrame with one row per selected stage: stage, status
+            ("ran", "fresh", "failed" or "skipped"), seconds, error
+        """
+        selected = self.upstream(targets) if targets is not None else set(self.stages)
+        state = self._load_state()
+        results: Dict[str, Dict[str, object]] = {}
+        reran: Set[str] = set()
+        running: Dict[Future, str] = {}
+        keys: Dict[str, str] = {}
+
+        def finish(
+            name: str, status: str, seconds: float = 0.0, error: Optional[str] = None
+        ) -> None:
+            results[name] = {
+                "stage": name,
+                "status": status,
+                "seconds": seconds,
+                "error": error,
+            }
+            if progress is not None:
+                progress(results[name])
+
+        def timed(stage: Stage) -> float:
+            start = time.perf_counter()
+            stage.action(self.root)
+            return time.perf_counter() - start
+
+        with ThreadPoolExecutor(max_workers=jobs or os.cpu_count()) as executor:
+            while len(results) < len(selected):
+                for name in self.order:
+                    if (
+                        name not in selected
+                        or name in results
+                        or name in running.values()
+                    ):
+                        continue
+                    deps = self.dependencies[name] & selected
+                    if not deps <= set(results):
+                        continue
+                    if any(
+                        results[dep]["status"] in ("failed", "skipped") for dep in deps
+                    ):
+                        finish(name, "skipped", error="an upstream stage failed")
+                        continue
+
+                    stage = self.stages[name]
+                    try:
+                        keys[name] = self._stage_key(stage, state)
+                    except FileNotFoundError as exc:
+                        finish(name, "failed", error=f"{type(exc).__name__}: {exc}")
+                        continue
+                    if not (force or deps & reran) and self._is_fresh(
+                        stage, keys[name], state
+                    ):
+                        finish(name, "fresh")
+                        continue
+                    running[executor.submit(timed, stage)] = name
+
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    stage = self.stages[name]
+                    try:
+                        seconds = future.result()
+                        outputs = {
+                            str(p): self._digest(p, state) for p in stage.outputs
+                        }
+                        missing = [p for p, digest in outputs.items() if digest is None]
+                        if missing:
+                            raise StaleOutputError(f"Outputs not written: {missing}")
+                    except Exception as exc:
+                        state["stages"].pop(name, None)
+                        finish(name, "failed", error=f"{type(exc).__name__}: {exc}")
+                    else:
+                        state["stages"][name] = {"key": keys[name], "outputs": outputs}
+                        reran.add(name)
+                        finish(name, "ran", seconds)
+                    self._save_state(state)
+
+        self._save_state(state)
+        return pd.DataFrame(
+            [results[name] for name in self.order if name in results],
+            columns=["stage", "status", "seconds", "error"],
+        )
+
+
+PROCESSED_CSV = Path("data") / "processed" / "survey_data_processed.csv"
+PROCESSED_ARROW = PROCESSED_CSV.with_suffix(".arrow")
+PHYSICIAN_FILES = [
+    Path("data") / "physician_experience.csv",
+    Path("data") / "practice_location.csv",
+    Path("data") / "rural_experience.csv",
+]
+COVARIATE_FILES = [
+    *PHYSICIAN_FILES,
+    Path("data") / "medevac_normative_mapping_simplified.csv",
+]
+METRIC_TABLES = [
+    "question_level_metrics.csv",
+    "class_level_metrics.csv",
+    "confidence_by_decision.csv",
+    "confidence_by_class.csv",
+]
+MODEL_TABLES = ["model_fixed_effects.csv", "model_variance_components.csv"]
+
+
+def _process(root: Path) -> None:
+    """Write the cleaned long-format table and its Arrow hand-off for R."""
+    from .data_loader import load_long_data
+    from .handoff import write_handoff
+    from .physicians import PhysicianDimension
+
+    long_df = load_long_data(root / "data")
+    (root / PROCESSED_CSV).parent.mkdir(parents=True, exist_ok=True)
+    long_df.to_csv(root / PROCESSED_CSV, index=False)
+    physicians = PhysicianDimension.from_files(root / "data")
+    write_handoff(long_df, root / PROCESSED_ARROW, physicians)
+
+
+def _metrics(root: Path) -> None:
+    """Write the agreement and confidence tables from the processed data."""
+    from .analysis import calculate_agreement_metrics, calculate_confidence_analysis
+
+    long_df = pd.read_csv(root / PROCESSED_CSV)
+    output_dir = root / "output"
+    output_dir.mkdir(parents=True, exist_ok=True)
+    tables = [
+        *calculate_agreement_metrics(long_df),
+        *calculate_confidence_analysis(long_df),
+    ]
+    for table, filename in zip(tables, METRIC_TABLES):
+        table.to_csv(output_dir / filename, index=False)
+
+
+def _model_stage(n_boot: int, seed: int) -> Callable[[Path], None]:
+    """Action fitting the propensity model and bootstrapping its variance components."""
+
+    def run(root: Path) -> None:
+        from .mixed_model import (
+            bootstrap_variance_components,
+            fit_medevac_model,
+            prepare_model_data,
+        )
+
+        long_df = pd.read_csv(root / PROCESSED_CSV)
+        fit = fit_medevac_model(prepare_model_data(long_df, root / "data"))
+        output_dir = root / "output"
+        output_dir.mkdir(parents=True, exist_ok=True)
+        fit.fixed_effects().to_csv(output_dir / MODEL_TABLES[0], index=False)
+        bootstrap_variance_components(
+            fit, n_boot=n_boot, seed=seed, n_jobs=None
+        ).to_csv(output_dir / MODEL_TABLES[1], index=False)
+
+    return run
+
+
+def default_stages(
+    engine: str = "python",
+    reports: Sequence[str] = (
+        "final_report2",
+        "02_descriptive_statistics",
+        "03_comparative_analysis",
+    ),
+    n_boot: int = 1000,
+    seed: int = 0,
+) -> List[Stage]:
+    """
+    The stages of the study workflow (see WORKFLOW.md).
+
+    - process: raw export → data/processed/survey_data_processed.csv and
+      its Arrow hand-off (.arrow)
+    - metrics: processed data → output/ agreement and confidence tables,
+      computed in Python or by scripts/r/run_analysis.R
+    - model: processed data and covariates → output/model_*.csv, the
+      propensity model's fixed effects and bootstrapped variance components
+    - report:<name>: ``quarto render`` of quarto/<name>.qmd
+
+    Args:
+        engine: "python" or "r" for the metrics stage
+        reports: Quarto documents (stems) to render
+        n_boot: Bootstrap replicates of the model stage
+        seed: Bootstrap seed
+
+    Returns:
+        The stages, for :class:`Pipeline`
+    """
+    if engine not in ("python", "r"):
+        raise ValueError(f"engine must be 'python' or 'r', got {engine!r}")
+
+    raw_csv = Path("data") / "survey_results.csv"
+    metric_outputs = [Path("output") / name for name in METRIC_TABLES]
+    model_outputs = [Path("output") / name for name in MODEL_TABLES]
+
+    stages = [
+        Stage(
+            "process",
+            [raw_csv, *PHYSICIAN_FILES],
+            [PROCESSED_CSV, PROCESSED_ARROW],
+            _process,
+        )
+    ]
+    if engine == "python":
+        stages.append(Stage("metrics", [PROCESSED_CSV], metric_outputs, _metrics))
+    else:
+        script = Path("scripts") / "r" / "run_analysis.R"
+        stages.append(
+            command_stage(
+                "metrics",
+                ["Rscript", str(script)],
+                [
+                    PROCESSED_CSV,
+                    PROCESSED_ARROW,
+                    script,
+                    Path("R") / "R" / "analysis.R",
+                ],
+                metric_outputs,
+            )
+        )
+    stages.append(
+        Stage(
+            "model",
+            [PROCESSED_CSV, *COVARIATE_FILES],
+            model_outputs,
+            _model_stage(n_boot, seed),
+            version=json.dumps({"n_boot": n_boot, "seed": seed}),
+        )
+    )
+
+    # The reports still compute their own agreement metrics and fit their own
+    # model (they also need its AIC, R² and likelihood), so they depend only on
+    # the processed data, not on the metric or model tables
+    for report in reports:
+        qmd = Path("quarto") / f"{report}.qmd"
+        outputs = [qmd.with_suffix(".pdf")]
+        if report.startswith("final_report"):
+            outputs.append(qmd.with_suffix(".html"))
+        stages.append(
+            command_stage(
+                f"report:{report}",
+                ["quarto", "render", str(qmd)],
+                [qmd, raw_csv, PROCESSED_CSV, *COVARIATE_FILES],
+                outputs,
+            )
+        )
+    return stages
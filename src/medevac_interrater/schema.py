@@ -0,0 +1,256 @@
+"""
+Survey export schema inference.
+
+Locates the decision, confidence and ID columns of a REDCap export from its
+header. Inference is a single pass over the header and is memoized on a hash
+of the header row, so repeated loads of the same instrument reuse it.
+"""
+
+import csv
+import hashlib
+import json
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:
+    # Only used in annotations, so inspecting a header does not import pandas
+    import pandas as pd
+
+CONFIDENCE_PATTERN = "How confident are you of this decision"
+ID_COLUMN = "Record ID"
+
+_SCHEMA_CACHE: Dict[str, "SurveySchema"] = {}
+
+
+@dataclass(frozen=True)
+class SurveySchema:
+    """
+    Column layout of a survey export.
+
+    Attributes:
+        header_hash: Hash of the header row the schema was inferred from
+        id_column: Physician ID column, or None if the export has none
+        candidates: Mapping of question number to the candidate
+            (decision_column, confidence_column) pairs, in header order.
+            Exports with several survey sections repeat a question, in which
+            case the candidate with the most responses is used.
+    """
+
+    header_hash: str
+    id_column: Optional[str]
+    candidates: Dict[int, List[Tuple[str, Optional[str]]]]
+
+    @property
+    def questions(self) -> List[int]:
+        """Question numbers present in the export, in ascending order."""
+        return sorted(self.candidates)
+
+    @property
+    def repeated_columns(self) -> List[str]:
+        """Decision columns of questions that appear more than once."""
+        return [
+            col
+            for pairs in self.candidates.values()
+            if len(pairs) > 1
+            for col, _ in pairs
+        ]
+
+    def resolve(
+        self,
+        df: Optional["pd.DataFrame"] = None,
+        non_null: Optional["pd.Series"] = None,
+    ) -> Tuple[Dict[int, str], Dict[int, str]]:
+        """
+        Choose one decision and confidence column per question.
+
+        Args:
+            df: Raw survey dataframe used to break ties between repeated
+                questions
+            non_null: Precomputed count of responses per repeated column,
+                used instead of ``df`` (e.g. when streaming an export). If
+                neither is given, the first occurrence is used.
+
+        Returns:
+            Tuple of (decision_columns, confidence_columns) mapping question
+            number to column name
+        """
+        repeated = self.repeated_columns
+        if non_null is None and df is not None and repeated:
+            non_null = df[repeated].notna().sum()
+
+        decision_cols = {}
+        confidence_cols = {}
+        for q_num, pairs in self.candidates.items():
+            chosen = pairs[0]
+            if non_null is not None and len(pairs) > 1:
+                # Prefer the candidate with the most data (first one on ties)
+                chosen = max(pairs, key=lambda pair: non_null[pair[0]])
+            decision_cols[q_num] = chosen[0]
+            if chosen[1] is not None:
+                confidence_cols[q_num] = chosen[1]
+
+        return decision_cols, confidence_cols
+
+    def to_dict(self) -> dict:
+        """Serialize the schema to a JSON-compatible dictionary."""
+        return {
+            "header_hash": self.header_hash,
+            "id_column": self.id_column,
+            "candidates": {
+                str(q_num): [list(pair) for pair in pairs]
+                for q_num, pairs in self.candidates.items()
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "SurveySchema":
+        """Rebuild a schema from :meth:`to_dict` output."""
+        return cls(
+            header_hash=data["header_hash"],
+            id_column=data["id_column"],
+            candidates={
+                int(q_num): [(pair[0], pair[1]) for pair in pairs]
+                for q_num, pairs in data["candidates"].items()
+            },
+        )
+
+    def save(self, path: Path) -> None:
+        """Write the schema as JSON."""
+        Path(path).write_text(json.dumps(self.to_dict(), indent=2))
+
+    @classmethod
+    def load(cls, path: Path) -> "SurveySchema":
+        """Read a schema written by :meth:`save`."""
+        return cls.from_dict(json.loads(Path(path).read_text()))
+
+
+def hash_header(columns: Sequence[str]) -> str:
+    """
+    Hash a header row.
+
+    Args:
+        columns: Column names in file order
+
+    Returns:
+        Hex digest identifying the header
+    """
+    return hashlib.sha256(
+        json.dumps([str(col) for col in columns]).encode("utf-8")
+    ).hexdigest()
+
+
+def read_header(csv_path: Path) -> List[str]:
+    """
+    Read the header row of an export without loading its data.
+
+    Repeated names get ``.1``, ``.2``, ... suffixes as ``pandas.read_csv``
+    gives them, so the result hashes the same as a loaded frame's columns.
+
+    Args:
+        csv_path: Path to the survey export
+
+    Returns:
+        Column names in file order
+    """
+    with open(csv_path, newline="", encoding="utf-8-sig") as f:
+        header = next(csv.reader(f), [])
+
+    # Mirrors the C parser: suffixes skip names already in the header
+    original = set(header)
+    counts: Dict[str, int] = {}
+    columns = []
+    for name in header:
+        col = name
+        count = counts.get(name, 0)
+        while count > 0:
+            counts[name] = count + 1
+            col = f"{name}.{count}"
+            count = count + 1 if col in original else counts.get(col, 0)
+        columns.append(col)
+        counts[col] = count + 1
+    return columns
+
+
+def _parse_question_number(col: str) -> Optional[int]:
+    """Return the question number of a decision column, or None."""
+    if not (isinstance(col, str) and col.startswith("Question ") and ":" in col):
+        return None
+    try:
+        return int(col.split(":")[0].replace("Question ", "").strip())
+    except ValueError:
+        return None
+
+
+def infer_schema(columns: Sequence[str]) -> SurveySchema:
+    """
+    Infer the survey schema from a header row.
+
+    Confidence columns are matched by position: each one immediately follows
+    its decision column.
+
+    Args:
+        columns: Column names in file order
+
+    Returns:
+        The (memoized) SurveySchema for this header
+    """
+    columns = list(columns)
+    key = hash_header(columns)
+    if key in _SCHEMA_CACHE:
+        return _SCHEMA_CACHE[key]
+
+    candidates: Dict[int, List[Tuple[str, Optional[str]]]] = {}
+    for idx, col in enumerate(columns):
+        q_num = _parse_question_number(col)
+        if q_num is None:
+            continue
+        next_col = columns[idx + 1] if idx + 1 < len(columns) else None
+        conf_col = (
+            next_col
+            if isinstance(next_col, str) and CONFIDENCE_PATTERN in next_col
+            else None
+        )
+        candidates.setdefault(q_num, []).append((col, conf_col))
+
+    schema = SurveySchema(
+        header_hash=key,
+        id_column=ID_COLUMN if ID_COLUMN in columns else None,
+        candidates=candidates,
+    )
+    _SCHEMA_CACHE[key] = schema
+    return schema
+
+
+def schema_path(csv_path: Path) -> Path:
+    """Location of the schema file saved next to a survey export."""
+    csv_path = Path(csv_path)
+    return csv_path.with_name(csv_path.stem + ".schema.json")
+
+
+def load_survey_schema(
+    csv_path: Path, columns: Sequence[str], save: bool = False
+) -> SurveySchema:
+    """
+    Get the schema for an export, reusing a saved schema when it matches.
+
+    Args:
+        csv_path: Path to the survey export
+        columns: Header row of the export
+        save: Write the schema next to the CSV unless an up-to-date one
+            is already there
+
+    Returns:
+        SurveySchema for the export
+    """
+    key = hash_header(columns)
+    path = schema_path(csv_path)
+    saved = SurveySchema.load(path) if path.exists() else None
+
+    if saved is not None and saved.header_hash == key:
+        return _SCHEMA_CACHE.setdefault(key, saved)
+
+    schema = infer_schema(columns)
+    if save:
+        schema.save(path)
+    return schema
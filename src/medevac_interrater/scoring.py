@@ -0,0 +1,376 @@
+"""
+Normative accuracy of medevac decisions.
+
+The normative mappings (``data/medevac_normative_mapping*.csv``) give each
+question a question_type, which fixes the acceptable decisions (e.g. "Clear
+Not Remain": Medevac or Commercial), and a medevac_normative_status, which
+says whether Medevac is among them. Both are checked against each other
+when the mapping is loaded. A decision is then scored as correct, as
+over-triage (more intensive than every acceptable decision), as
+under-triage (less intensive than every acceptable decision), or as
+another error; questions where every decision is acceptable are unscored.
+
+Scoring is a lookup of a precomputed question × decision outcome table on
+the physician × question decision codes, reduced to a physician × class ×
+outcome count tensor. Physician, class and covariate results are sums over
+this tensor, so resampling or permuting physicians only needs a matrix
+product with it.
+"""
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .analysis import build_rating_matrix
+from .data_loader import DECISIONS
+from .instrumentation import traced
+from .physicians import PhysicianDimension
+
+MAPPING_FILES = {
+    "full": "medevac_normative_mapping.csv",
+    "simplified": "medevac_normative_mapping_simplified.csv",
+}
+
+# Decisions ordered from least to most intensive
+DECISION_INTENSITY = {"Remain": 0, "Commercial": 1, "Medevac": 2}
+
+ACCEPTABLE_DECISIONS = {
+    "Clear Medevac": ("Medevac",),
+    "Clear Not Medevac": ("Commercial", "Remain"),
+    "Clear Commercial": ("Commercial",),
+    "Clear Remain": ("Remain",),
+    "Clear Not Remain": ("Medevac", "Commercial"),
+    "Conflict Between Physiology/Logistics": ("Medevac", "Remain"),
+    "Any Option": ("Medevac", "Commercial", "Remain"),
+}
+
+# Normative status → (Medevac acceptable, number of acceptable decisions or None)
+NORMATIVE_STATUSES = {
+    "medevac_only_correct": (True, 1),
+    "medevac_only_wrong": (False, None),
+    "medevac_one_of_two_correct": (True, 2),
+    "medevac_one_of_two_wrong": (False, 1),
+    "medevac_or_remain": (True, 2),
+    "ambiguous_all_plausible": (True, 3),
+}
+
+OUTCOMES = ["unscored", "correct", "over_triage", "under_triage", "other_error"]
+UNSCORED, CORRECT, OVER_TRIAGE, UNDER_TRIAGE, OTHER_ERROR = range(len(OUTCOMES))
+
+DEFAULT_COVARIATES = ["practice_location", "rural_experience", "experience_tertile"]
+
+
+@traced
+def load_normative_mapping(data_dir: Path, mapping: str = "simplified") -> pd.DataFrame:
+    """
+    Load and validate a normative mapping.
+
+    Args:
+        data_dir: Directory containing the mapping files
+        mapping: "full" or "simplified"
+
+    Returns:
+        DataFrame with columns: question, question_type,
+        medevac_normative_status, medevac_status_label
+
+    Raises:
+        ValueError: If the mapping name is unknown, or a question's type and
+            normative status are unknown or contradict each other
+    """
+    if mapping not in MAPPING_FILES:
+        raise ValueError(
+            f"mapping must be one of {sorted(MAPPING_FILES)}, got {mapping!r}"
+        )
+    df = pd.read_csv(Path(data_dir) / MAPPING_FILES[mapping])
+
+    for row in df.itertuples():
+        acceptable = ACCEPTABLE_DECISIONS.get(row.question_type)
+        if acceptable is None:
+            raise ValueError(
+                f"Question {row.question}: unknown type {row.question_type!r}"
+            )
+        if row.medevac_normative_status not in NORMATIVE_STATUSES:
+            raise ValueError(
+                f"Question {row.question}: unknown status {row.medevac_normative_status!r}"
+            )
+        medevac_ok, n_acceptable = NORMATIVE_STATUSES[row.medevac_normative_status]
+        if ("Medevac" in acceptable) != medevac_ok or n_acceptable not in (
+            None,
+            len(acceptable),
+        ):
+            raise ValueError(
+                f"Question {row.question}: status {row.medevac_normative_status!r} "
+                f"contradicts type {row.question_type!r}"
+            )
+    return df[
+        [
+            "question",
+            "question_type",
+            "medevac_normative_status",
+            "medevac_status_label",
+        ]
+    ]
+
+
+@dataclass(frozen=True)
+class NormativeKey:
+    """
+    Outcome of every decision on every question of a normative mapping.
+
+    Attributes:
+        questions: Question numbers
+        outcomes: Outcome code (index into OUTCOMES) of shape
+            (n_questions, n_decisions)
+        decisions: Decision categories, the columns of ``outcomes``
+        label_codes: Status label code per question
+        labels: Status labels (e.g. "Always Medevac")
+    """
+
+    questions: np.ndarray
+    outcomes: np.ndarray
+    decisions: np.ndarray
+    label_codes: np.ndarray
+    labels: np.ndarray
+
+    @classmethod
+    def from_mapping(
+        cls, mapping: pd.DataFrame, decisions: Sequence[str] = DECISIONS
+    ) -> "NormativeKey":
+        """
+        Build the key of a mapping from :func:`load_normative_mapping`.
+
+        Args:
+            mapping: Normative mapping
+            decisions: Decision categories, in the order of the decision codes
+
+        Returns:
+            The normative key
+        """
+        intensity = np.array([DECISION_INTENSITY[d] for d in decisions])
+        outcomes = np.empty((len(mapping), len(decisions)), dtype=np.int8)
+        for i, question_type in enumerate(mapping["question_type"]):
+            acceptable = np.isin(decisions, ACCEPTABLE_DECISIONS[question_type])
+            low, high = intensity[acceptable].min(), intensity[acceptable].max()
+            outcomes[i] = np.select(
+                [
+                    np.full(len(decisions), acceptable.all()),
+                    acceptable,
+                    intensity > high,
+                    intensity < low,
+                ],
+                [UNSCORED, CORRECT, OVER_TRIAGE, UNDER_TRIAGE],
+                OTHER_ERROR,
+            )
+        label_codes, labels = pd.factorize(mapping["medevac_status_label"])
+        return cls(
+            questions=mapping["question"].to_numpy(),
+            outcomes=outcomes,
+            decisions=np.asarray(decisions),
+            label_codes=label_codes,
+            labels=np.asarray(labels),
+        )
+
+    def rows(self, questions: np.ndarray) -> np.ndarray:
+        """
+        Rows of the key for question numbers.
+
+        Raises:
+            ValueError: If a question is not in the mapping
+        """
+        rows = pd.Index(self.questions).get_indexer(questions)
+        if (rows < 0).any():
+            raise ValueError(
+                f"Questions not in the normative mapping: {questions[rows < 0]}"
+            )
+        return rows
+
+
+def score_outcomes(
+    codes: np.ndarray, rows: np.ndarray, key: NormativeKey
+) -> np.ndarray:
+    """
+    Outcome of each decision in a rating matrix.
+
+    Args:
+        codes: Physician × question decision codes (-1 for skipped), with
+            decisions coded in the order of ``key.decisions``
+        rows: Key row of each question column, from :meth:`NormativeKey.rows`
+        key: Normative key
+
+    Returns:
+        int8 array like ``codes`` with the outcome code, -1 where skipped
+    """
+    outcomes = key.outcomes[rows, np.maximum(codes, 0)]
+    return np.where(codes >= 0, outcomes, -1).astype(np.int8)
+
+
+def score_counts(
+    outcomes: np.ndarray, label_codes: np.ndarray, n_labels: int
+) -> np.ndarray:
+    """
+    Count each physician's outcomes per status label.
+
+    Args:
+        outcomes: Physician × question outcome codes from :func:`score_outcomes`
+        label_codes: Status label code of each question column
+        n_labels: Number of status labels
+
+    Returns:
+        Array of shape (n_physicians, n_labels, len(OUTCOMES)). It is linear
+        in the physicians, so a batch of physician resamples (a draws ×
+        physicians matrix of counts) applies with ``np.tensordot``.
+    """
+    onehot = (outcomes[..., None] == np.arange(len(OUTCOMES))).astype(np.float64)
+    labels = (label_codes[:, None] == np.arange(n_labels)).astype(np.float64)
+    return np.einsum("pqo,ql->plo", onehot, labels)
+
+
+def accuracy_rates(counts: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Accuracy and triage error rates from outcome counts.
+
+    Args:
+        counts: Array whose last axis counts OUTCOMES (any leading shape)
+
+    Returns:
+        Dictionary with n_scored, accuracy, over_triage_rate and
+        under_triage_rate arrays of the leading shape (NaN where nothing
+        was scored)
+    """
+    n_scored = counts[..., CORRECT:].sum(axis=-1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return {
+            "n_scored": n_scored,
+            "accuracy": counts[..., CORRECT] / n_scored,
+            "over_triage_rate": counts[..., OVER_TRIAGE] / n_scored,
+            "under_triage_rate": counts[..., UNDER_TRIAGE] / n_scored,
+        }
+
+
+def _rate_table(counts: np.ndarray, index: Dict[str, object]) -> pd.DataFrame:
+    """Rows of index columns followed by the rates of ``counts``."""
+    rates = accuracy_rates(counts)
+    rates["n_scored"] = rates["n_scored"].astype(np.int64)
+    return pd.DataFrame({**index, **rates})
+
+
+@traced
+def score_responses(df: pd.DataFrame, mapping: pd.DataFrame) -> pd.DataFrame:
+    """
+    Score each decision against a normative mapping.
+
+    Args:
+        df: Long-format dataframe with columns: question, decision
+        mapping: Normative mapping from :func:`load_normative_mapping`
+
+    Returns:
+        Copy of ``df`` with medevac_status_label, outcome (categorical of
+        OUTCOMES) and correct (nullable boolean, missing when unscored)
+        columns
+
+    Raises:
+        ValueError: If a question is not in the mapping
+    """
+    key = NormativeKey.from_mapping(mapping)
+    rows = key.rows(df["question"].to_numpy())
+    decisions = pd.Categorical(df["decision"], categories=key.decisions).codes
+    outcome_codes = score_outcomes(decisions.astype(np.int64), rows, key)
+
+    scored = df.copy()
+    scored["medevac_status_label"] = pd.Categorical.from_codes(
+        key.label_codes[rows], categories=key.labels
+    )
+    scored["outcome"] = pd.Categorical.from_codes(outcome_codes, categories=OUTCOMES)
+    correct = pd.array(outcome_codes == CORRECT, dtype="boolean")
+    correct[outcome_codes <= UNSCORED] = pd.NA
+    scored["correct"] = correct
+    return scored
+
+
+@traced
+def calculate_normative_accuracy(
+    df: pd.DataFrame,
+    mapping: pd.DataFrame,
+    physicians: Optional[PhysicianDimension] = None,
+    covariates: Sequence[str] = DEFAULT_COVARIATES,
+) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """
+    Normative accuracy per physician, per status label and per covariate.
+
+    All three tables are sums of one physician × label × outcome count
+    tensor.
+
+    Args:
+        df: Long-format dataframe with columns: physician_id, question, decision
+        mapping: Normative mapping from :func:`load_normative_mapping`
+        physicians: Physician dimension for the covariate table (the table
+            is empty if None)
+        covariates: Physician dimension columns to break accuracy down by
+
+    Returns:
+        Tuple of (by_physician, by_class, by_covariate). by_physician has
+        columns physician_id, n_scored, accuracy, over_triage_rate,
+        under_triage_rate; by_class has level ("class" or "overall") and
+        unit (the status label) before the same measures; by_covariate has
+        covariate, value and n_physicians before them.
+
+    Raises:
+        ValueError: If a question is not in the mapping
+    """
+    key = NormativeKey.from_mapping(mapping)
+    codes, physician_ids, questions, _ = build_rating_matrix(
+        df, categories=key.decisions
+    )
+    rows = key.rows(questions)
+    counts = score_counts(
+        score_outcomes(codes, rows, key), key.label_codes[rows], len(key.labels)
+    )
+    per_physician = counts.sum(axis=1)
+
+    by_physician = _rate_table(per_physician, {"physician_id": physician_ids})
+
+    per_label = counts.sum(axis=0)
+    by_class = _rate_table(
+        np.vstack([per_label, per_label.sum(axis=0)]),
+        {
+            "level": ["class"] * len(key.labels) + ["overall"],
+            "unit": [*key.labels, "overall"],
+        },
+    )
+
+    tables = []
+    if physicians is not None:
+        joined = physicians.join(
+            pd.DataFrame({"physician_id": physician_ids}), covariates
+        )
+        for covariate in covariates:
+            group_codes, values = pd.factorize(joined[covariate], sort=True)
+            groups = (group_codes[:, None] == np.arange(len(values))).astype(np.float64)
+            tables.append(
+                _rate_table(
+                    groups.T @ per_physician,
+                    {
+                        "covariate": covariate,
+                        "value": np.asarray(values, dtype=object),
+                        "n_physicians": groups.sum(axis=0).astype(np.int64),
+                    },
+                )
+            )
+    columns = [
+        "covariate",
+        "value",
+        "n_physicians",
+        "n_scored",
+        "accuracy",
+        "over_triage_rate",
+        "under_triage_rate",
+    ]
+    by_covariate = (
+        pd.concat(tables, ignore_index=True)
+        if tables
+        else pd.DataFrame(columns=columns)
+    )
+    return by_physician, by_class, by_covariate
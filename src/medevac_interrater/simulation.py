@@ -0,0 +1,448 @@
+"""
+Monte Carlo precision and power for agreement and kappa.
+
+Simulates complete rating studies on the survey's vignette classes from
+:func:`get_vignette_classification`, with the survey's number of vignettes
+per class or a planned one. Each vignette has a true decision drawn from
+the category prevalences, and every physician picks it with the accuracy
+of the vignette's class, otherwise one of the other decisions uniformly.
+A batch of studies is generated and scored as
+stacked count matrices with :func:`batch_agreement_statistics`, and each
+study's standard errors come from a leave-one-physician-out jackknife that
+is evaluated in the same batch. Batches are seeded from a single
+``SeedSequence`` so results do not depend on the number of workers.
+"""
+
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist
+from typing import Dict, Mapping, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from .analysis import _group_sum
+from .bootstrap import StatKey, batch_agreement_statistics
+from .data_loader import DECISIONS, get_vignette_classification
+from .instrumentation import traced
+
+_WORKER_STATE: Dict[str, object] = {}
+
+
+def _design(
+    prevalence: Optional[Mapping[str, float]],
+    accuracy: Union[float, Mapping[str, float]],
+    vignettes_per_class: Union[None, int, Mapping[str, int]] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Resolve the study design and the simulation parameters to arrays.
+
+    A class keeps its survey questions, in survey order, up to its number
+    of vignettes; further vignettes are numbered after the survey's last
+    question.
+
+    Returns:
+        Dictionary with questions, class_codes, classes, prevalence (one
+        probability per decision) and accuracy (one per question)
+
+    Raises:
+        ValueError: If a prevalence, accuracy or vignette count is invalid
+    """
+    classification = get_vignette_classification()
+    survey = pd.Series(
+        {q: info["vignette_class"] for q, info in sorted(classification.items())}
+    )
+    classes = np.array(sorted(survey.unique()))
+
+    counts = survey.value_counts().to_dict()
+    if isinstance(vignettes_per_class, Mapping):
+        unknown = set(vignettes_per_class) - set(classes)
+        if unknown:
+            raise ValueError(
+                f"Unknown vignette classes in vignettes_per_class: {sorted(unknown)}"
+            )
+        counts.update(vignettes_per_class)
+    elif vignettes_per_class is not None:
+        counts = {c: vignettes_per_class for c in classes}
+    if min(int(counts[c]) for c in classes) < 1:
+        raise ValueError("Every vignette class needs at least one vignette")
+
+    questions, labels = [], []
+    next_question = int(survey.index.max()) + 1
+    for c in classes:
+        n = int(counts[c])
+        kept = list(survey.index[survey == c][:n])
+        added = list(range(next_question, next_question + n - len(kept)))
+        next_question += len(added)
+        questions += kept + added
+        labels += [c] * n
+    order = np.argsort(questions, kind="stable")
+    questions = np.array(questions)[order]
+    class_codes = pd.Index(classes).get_indexer(np.array(labels)[order])
+
+    if prevalence is None:
+        prevalence = {decision: 1.0 for decision in DECISIONS}
+    unknown = set(prevalence) - set(DECISIONS)
+    if unknown:
+        raise ValueError(f"Unknown decisions in prevalence: {sorted(unknown)}")
+    weights = np.array(
+        [prevalence.get(decision, 0.0) for decision in DECISIONS], dtype=float
+    )
+    if (weights < 0).any() or weights.sum() <= 0:
+        raise ValueError("prevalence must be non-negative with a positive total")
+
+    if isinstance(accuracy, Mapping):
+        unknown = set(accuracy) - set(classes)
+        if unknown:
+            raise ValueError(f"Unknown vignette classes in accuracy: {sorted(unknown)}")
+        missing = set(classes) - set(accuracy)
+        if missing:
+            raise ValueError(f"No accuracy for vignette classes: {sorted(missing)}")
+        by_class = np.array([accuracy[c] for c in classes], dtype=float)
+    else:
+        by_class = np.full(len(classes), float(accuracy))
+    if ((by_class < 0) | (by_class > 1)).any():
+        raise ValueError("accuracy must be in [0, 1]")
+
+    return {
+        "questions": questions,
+        "class_codes": class_codes,
+        "classes": classes,
+        "prevalence": weights / weights.sum(),
+        "accuracy": by_class[class_codes],
+    }
+
+
+def population_statistics(
+    probabilities: np.ndarray, class_codes: np.ndarray, n_classes: int
+) -> Dict[StatKey, np.ndarray]:
+    """
+    Agreement and kappa of infinitely many raters with the given choice probabilities.
+
+    These are the values the statistics of :func:`batch_agreement_statistics`
+    converge to as the number of physicians grows.
+
+    Args:
+        probabilities: Decision probabilities of shape (..., n_questions,
+            n_categories)
+        class_codes: Vignette class code per question
+        n_classes: Number of vignette classes
+
+    Returns:
+        Dictionary keyed by (level, metric), like
+        :func:`batch_agreement_statistics`
+    """
+    question_agreement = (probabilities**2).sum(axis=-1)
+    class_sizes = np.bincount(class_codes, minlength=n_classes)
+
+    def kappa(groups: np.ndarray, sizes: np.ndarray) -> np.ndarray:
+        n_groups = len(sizes)
+        observed = _group_sum(question_agreement, groups, n_groups) / sizes
+        margins = _group_sum(probabilities.swapaxes(-1, -2), groups, n_groups) / sizes
+        chance = (margins**2).sum(axis=-2)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(chance < 1, (observed - chance) / (1 - chance), np.nan)
+
+    single = np.zeros(len(class_codes), dtype=np.intp)
+    return {
+        ("question", "percentage_agreement"): question_agreement,
+        ("class", "mean_percentage_agreement"): (
+            _group_sum(question_agreement, class_codes, n_classes) / class_sizes
+        ),
+        ("class", "fleiss_kappa"): kappa(class_codes, class_sizes),
+        ("overall", "percentage_agreement"): question_agreement.mean(
+            axis=-1, keepdims=True
+        ),
+        ("overall", "fleiss_kappa"): kappa(single, np.array([len(class_codes)])),
+    }
+
+
+def _init_worker(
+    class_codes: np.ndarray,
+    n_classes: int,
+    prevalence: np.ndarray,
+    accuracy: np.ndarray,
+    missing_rate: float,
+) -> None:
+    """Store the simulation design once per worker process."""
+    _WORKER_STATE.update(
+        class_codes=class_codes,
+        n_classes=n_classes,
+        prevalence=prevalence,
+        accuracy=accuracy,
+        missing_rate=missing_rate,
+    )
+
+
+def _simulate_batch(
+    seed: np.random.SeedSequence, n: int, n_physicians: int
+) -> Dict[str, Dict[StatKey, np.ndarray]]:
+    """Simulate and evaluate one batch of ``n`` studies."""
+    class_codes = _WORKER_STATE["class_codes"]
+    n_classes = _WORKER_STATE["n_classes"]
+    prevalence = _WORKER_STATE["prevalence"]
+    accuracy = _WORKER_STATE["accuracy"]
+    n_questions, n_categories = len(class_codes), len(prevalence)
+    rng = np.random.default_rng(seed)
+    shape = (n, n_physicians, n_questions)
+
+    truth = rng.choice(n_categories, size=(n, n_questions), p=prevalence)
+    correct = rng.random(shape) < accuracy
+    # Shift away from the true decision to pick uniformly among the others
+    offset = rng.integers(1, n_categories, size=shape)
+    choices = np.where(
+        correct, truth[:, None], (truth[:, None] + offset) % n_categories
+    )
+    choices[rng.random(shape) < _WORKER_STATE["missing_rate"]] = -1
+
+    onehot = (choices[..., None] == np.arange(n_categories)).astype(np.float64)
+    counts = onehot.sum(axis=1)
+    estimates = batch_agreement_statistics(counts, class_codes, n_classes)
+
+    # Leave-one-physician-out counts of every study, evaluated as one batch
+    leave_one_out = batch_agreement_statistics(
+        (counts[:, None] - onehot).reshape(-1, n_questions, n_categories),
+        class_codes,
+        n_classes,
+    )
+    std_errors = {}
+    for key, values in leave_one_out.items():
+        values = values.reshape(n, n_physicians, -1)
+        n_valid = (~np.isnan(values)).sum(axis=1)
+        with warnings.catch_warnings(), np.errstate(invalid="ignore", divide="ignore"):
+            warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN columns
+            spread = np.nansum(
+                (values - np.nanmean(values, axis=1, keepdims=True)) ** 2, axis=1
+            )
+            std_errors[key] = np.where(
+                n_valid > 1, np.sqrt((n_valid - 1) / n_valid * spread), np.nan
+            )
+
+    probabilities = np.where(
+        np.arange(n_categories) == truth[..., None],
+        accuracy[:, None],
+        ((1 - accuracy) / (n_categories - 1))[:, None],
+    )
+    return {
+        "estimate": estimates,
+        "std_error": std_errors,
+        "true_value": population_statistics(probabilities, class_codes, n_classes),
+    }
+
+
+@traced
+def simulate_studies(
+    n_physicians: Sequence[int],
+    n_studies: int = 1000,
+    prevalence: Optional[Mapping[str, float]] = None,
+    accuracy: Union[float, Mapping[str, float]] = 0.7,
+    vignettes_per_class: Union[None, int, Mapping[str, int]] = None,
+    missing_rate: float = 0.0,
+    seed: Optional[int] = None,
+    n_jobs: Optional[int] = 1,
+    batch_size: int = 100,
+) -> pd.DataFrame:
+    """
+    Simulate rating studies and evaluate agreement and kappa on each.
+
+    Every study has the survey's vignette classes, with the survey's number
+    of vignettes in each unless ``vignettes_per_class`` plans another. A
+    vignette's true decision is drawn from ``prevalence``; each physician
+    chooses it with the accuracy of the vignette's class and otherwise one
+    of the other decisions uniformly, and skips it with ``missing_rate``.
+
+    Args:
+        n_physicians: Study sizes (number of physicians) to simulate
+        n_studies: Number of studies per study size
+        prevalence: Relative frequency of each true decision (uniform if
+            None); decisions left out never are the true decision
+        accuracy: Probability of choosing the true decision, either one
+            value or one per vignette class
+        vignettes_per_class: Vignettes in each class, either one count for
+            every class or counts for some classes (the others keep the
+            survey's). None uses the survey's design.
+        missing_rate: Probability that a physician skips a vignette
+        seed: Seed for reproducible studies
+        n_jobs: Number of worker processes (None uses all CPUs)
+        batch_size: Studies simulated per batch
+
+    Returns:
+        DataFrame with columns: n_physicians, n_vignettes (vignettes per
+        study), study, level, unit, metric, estimate, std_error (jackknife
+        over physicians), true_value (the value with infinitely many
+        physicians on the study's vignettes)
+
+    Raises:
+        ValueError: If the arguments are out of range
+    """
+    sizes_n = [int(n) for n in n_physicians]
+    if not sizes_n or min(sizes_n) < 2:
+        raise ValueError("Every study needs at least two physicians")
+    if n_studies < 1:
+        raise ValueError("n_studies must be positive")
+    if not 0 <= missing_rate < 1:
+        raise ValueError("missing_rate must be in [0, 1)")
+
+    design = _design(prevalence, accuracy, vignettes_per_class)
+    class_codes = design["class_codes"]
+    n_classes = len(design["classes"])
+
+    sizes = [batch_size] * (n_studies // batch_size)
+    if n_studies % batch_size:
+        sizes.append(n_studies % batch_size)
+    tasks = [
+        (batch_seed, n, n_phys)
+        for n_phys, size_seed in zip(
+            sizes_n, np.random.SeedSequence(seed).spawn(len(sizes_n))
+        )
+        for batch_seed, n in zip(size_seed.spawn(len(sizes)), sizes)
+    ]
+    init_args = (
+        class_codes,
+        n_classes,
+        design["prevalence"],
+        design["accuracy"],
+        missing_rate,
+    )
+
+    if n_jobs == 1:
+        _init_worker(*init_args)
+        try:
+            results = [_simulate_batch(*task) for task in tasks]
+        finally:
+            _WORKER_STATE.clear()
+    else:
+        with ProcessPoolExecutor(
+            max_workers=n_jobs or os.cpu_count(),
+            initializer=_init_worker,
+            initargs=init_args,
+        ) as executor:
+            results = list(executor.map(_simulate_batch, *zip(*tasks)))
+
+    units = {
+        "question": design["questions"],
+        "class": design["classes"],
+        "overall": np.array(["overall"]),
+    }
+    tables = []
+    for i, n_phys in enumerate(sizes_n):
+        batches = results[i * len(sizes) : (i + 1) * len(sizes)]
+        for key in batches[0]["estimate"]:
+            level, metric = key
+            columns = {
+                name: np.concatenate([batch[name][key] for batch in batches])
+                for name in ("estimate", "std_error", "true_value")
+            }
+            n_units = len(units[level])
+            tables.append(
+                pd.DataFrame(
+                    {
+                        "n_physicians": n_phys,
+                        "n_vignettes": len(design["questions"]),
+                        "study": np.repeat(np.arange(n_studies), n_units),
+                        "level": level,
+                        "unit": np.tile(units[level], n_studies),
+                        "metric": metric,
+                        **{name: values.ravel() for name, values in columns.items()},
+                    }
+                )
+            )
+
+    return pd.concat(tables, ignore_index=True)
+
+
+def _wald_bounds(studies: pd.DataFrame, confidence_level: float) -> pd.DataFrame:
+    """Add Wald interval bounds from each study's estimate and standard error."""
+    z = NormalDist().inv_cdf(0.5 + confidence_level / 2)
+    return studies.assign(
+        ci_lower=studies["estimate"] - z * studies["std_error"],
+        ci_upper=studies["estimate"] + z * studies["std_error"],
+    )
+
+
+@traced
+def precision_curve(
+    studies: pd.DataFrame, confidence_level: float = 0.95, target_width: float = 0.2
+) -> pd.DataFrame:
+    """
+    Summarise estimation precision by study size.
+
+    Each study's interval is the Wald interval estimate ± z × jackknife
+    standard error. Studies where a statistic is undefined are left out of
+    its summary.
+
+    Args:
+        studies: Output of :func:`simulate_studies`
+        confidence_level: Coverage of the per-study intervals
+        target_width: Interval width a study should achieve
+
+    Returns:
+        DataFrame with one row per study design and statistic and columns:
+        n_physicians, n_vignettes, level, unit, metric, true_value (mean
+        over studies), mean_estimate, bias, empirical_se (SD of the estimates),
+        mean_std_error, mean_ci_width, prob_within_target (share of studies
+        whose interval is at most ``target_width`` wide), coverage, n_studies
+    """
+    bounded = _wald_bounds(
+        studies.dropna(subset=["estimate", "std_error"]), confidence_level
+    )
+    bounded = bounded.assign(
+        error=bounded["estimate"] - bounded["true_value"],
+        ci_width=bounded["ci_upper"] - bounded["ci_lower"],
+        within_target=lambda d: d["ci_width"] <= target_width,
+        covered=lambda d: (d["ci_lower"] <= d["true_value"])
+        & (d["true_value"] <= d["ci_upper"]),
+    )
+    keys = ["n_physicians", "n_vignettes", "level", "unit", "metric"]
+    return (
+        bounded.groupby(keys, sort=False)
+        .agg(
+            true_value=("true_value", "mean"),
+            mean_estimate=("estimate", "mean"),
+            bias=("error", "mean"),
+            empirical_se=("estimate", "std"),
+            mean_std_error=("std_error", "mean"),
+            mean_ci_width=("ci_width", "mean"),
+            prob_within_target=("within_target", "mean"),
+            coverage=("covered", "mean"),
+            n_studies=("estimate", "size"),
+        )
+        .reset_index()
+    )
+
+
+@traced
+def power_curve(
+    studies: pd.DataFrame, null_value: float, alpha: float = 0.05
+) -> pd.DataFrame:
+    """
+    Power of a one-sided test that a statistic exceeds ``null_value``.
+
+    A study rejects H0: statistic <= ``null_value`` when its one-sided
+    lower Wald bound at level ``alpha`` lies above ``null_value``. Studies
+    where the statistic is undefined count as not rejecting.
+
+    Args:
+        studies: Output of :func:`simulate_studies`
+        null_value: Value under the null hypothesis (e.g. a kappa of 0.4)
+        alpha: Significance level
+
+    Returns:
+        DataFrame with one row per study design and statistic and columns:
+        n_physicians, n_vignettes, level, unit, metric, true_value (mean
+        over studies), power, n_studies
+    """
+    z = NormalDist().inv_cdf(1 - alpha)
+    rejects = (studies["estimate"] - z * studies["std_error"]) > null_value
+    keys = ["n_physicians", "n_vignettes", "level", "unit", "metric"]
+    return (
+        studies.assign(rejects=rejects)
+        .groupby(keys, sort=False)
+        .agg(
+            true_value=("true_value", "mean"),
+            power=("rejects", "mean"),
+            n_studies=("rejects", "size"),
+        )
+        .reset_index()
+    )
@@ -0,0 +1,132 @@
+"""
+Synthetic survey exports for testing and benchmarking.
+
+The generated frames have the layout of a REDCap export as read by
+``pandas.read_csv``: a ``Record ID`` column, a few demographic columns, and
+one ``Question N: ...`` column per vignette followed by its confidence
+column (``.1``, ``.2``, ... suffixes on the repeated confidence header).
+"""
+
+from pathlib import Path
+from typing import Any, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from .schema import ID_COLUMN
+
+# The confidence question header as it appears in the export
+CONFIDENCE_HEADER = (
+    "How confident are you of this decision (10 being very confident, "
+    "and 1 being not confident at all)"
+)
+
+# Raw answer text as exported, one per decision
+DEFAULT_ANSWERS = (
+    "Activate medevac immediately",
+    "Commercial flight next available",
+    "Remain in village (for ongoing observation or treatment, if necessary)",
+)
+
+MAX_VIGNETTES = 20
+
+
+def generate_survey(
+    n_physicians: int = 20,
+    n_vignettes: int = 20,
+    answers: Sequence[str] = DEFAULT_ANSWERS,
+    agreement: Union[float, Sequence[float]] = 0.7,
+    missing_rate: float = 0.0,
+    seed: Optional[int] = None,
+) -> pd.DataFrame:
+    """
+    Generate a wide survey export with a controllable agreement structure.
+
+    Each vignette has a modal answer. A physician gives it with probability
+    ``agreement`` (per vignette if a sequence) and otherwise picks one of
+    the other answers uniformly, so agreement near 1 gives near-unanimous
+    vignettes and ``1 / len(answers)`` gives chance-level agreement.
+    Confidence is higher on average for modal answers.
+
+    Args:
+        n_physicians: Number of respondents (rows)
+        n_vignettes: Number of questions, at most 20
+        answers: Raw answer text of each decision category
+        agreement: Probability of choosing the modal answer
+        missing_rate: Probability that a response (decision and
+            confidence) is left blank
+        seed: Random seed
+
+    Returns:
+        Wide dataframe with the column layout of a survey export
+
+    Raises:
+        ValueError: If the arguments are out of range
+    """
+    if not 1 <= n_vignettes <= MAX_VIGNETTES:
+        raise ValueError(f"n_vignettes must be between 1 and {MAX_VIGNETTES}")
+    if len(answers) < 2:
+        raise ValueError("At least two answers are needed")
+    if not 0 <= missing_rate < 1:
+        raise ValueError("missing_rate must be in [0, 1)")
+    agreement = np.broadcast_to(np.asarray(agreement, dtype=np.float64), (n_vignettes,))
+    if ((agreement < 0) | (agreement > 1)).any():
+        raise ValueError("agreement must be in [0, 1]")
+
+    rng = np.random.default_rng(seed)
+    n_answers = len(answers)
+    shape = (n_physicians, n_vignettes)
+
+    modal = rng.integers(n_answers, size=n_vignettes)
+    is_modal = rng.random(shape) < agreement
+    # Shift away from the modal answer to pick uniformly among the others
+    offset = rng.integers(1, n_answers, size=shape)
+    choices = np.where(is_modal, modal, (modal + offset) % n_answers)
+
+    confidence = np.clip(
+        np.round(rng.normal(np.where(is_modal, 8.0, 6.0), 1.5, size=shape)), 1, 10
+    )
+    missing = rng.random(shape) < missing_rate
+
+    decisions = np.asarray(answers, dtype=object)[choices]
+    decisions[missing] = np.nan
+    confidence[missing] = np.nan
+
+    columns = {
+        ID_COLUMN: np.arange(1, n_physicians + 1),
+        "What is your current degree? ": rng.choice(
+            ["MD/DO", "PA", "NP"], size=n_physicians
+        ),
+        "What year did you complete your clinical training? ": rng.integers(
+            1990, 2025, size=n_physicians
+        ),
+    }
+    for j in range(n_vignettes):
+        columns[f"Question {j + 1}: Synthetic vignette {j + 1}"] = decisions[:, j]
+        suffix = f".{j}" if j else ""
+        columns[CONFIDENCE_HEADER + suffix] = pd.array(confidence[:, j], dtype="Int64")
+
+    return pd.DataFrame(columns)
+
+
+def write_survey(path: Path, **kwargs: Any) -> Path:
+    """
+    Generate a survey export and write it as CSV.
+
+    The repeated confidence header is written without the ``.N`` suffixes,
+    as REDCap exports it.
+
+    Args:
+        path: Output CSV path
+        **kwargs: Arguments of :func:`generate_survey`
+
+    Returns:
+        The output path
+    """
+    df = generate_survey(**kwargs)
+    header = [
+        CONFIDENCE_HEADER if col.startswith(CONFIDENCE_HEADER) else col
+        for col in df.columns
+    ]
+    df.to_csv(path, index=False, header=header)
+    return Path(path)
@@ -0,0 +1,55 @@
+"""
+Shared fixtures for the test suite.
+"""
+
+from typing import Optional, Sequence
+
+import numpy as np
+import pandas as pd
+import pytest
+
+DECISIONS = ("Commercial", "Medevac", "Remain")
+
+
+def _make_long_df(
+    n_physicians: int,
+    n_questions: int,
+    seed: int,
+    n_classes: int = 2,
+    decisions: Sequence[str] = DECISIONS,
+    p: Optional[Sequence[float]] = None,
+    first_id: int = 0,
+    missing_confidence: Sequence[int] = (),
+    dropped: Sequence[int] = (),
+) -> pd.DataFrame:
+    """
+    Random long-format responses of a complete design, minus some rows.
+
+    Questions are split into ``n_classes`` consecutive blocks of vignette
+    classes A, B, ... Rows at the ``missing_confidence`` positions lose
+    their confidence and rows at the ``dropped`` positions are removed
+    (skipped answers); positions refer to the complete design.
+    """
+    rng = np.random.default_rng(seed)
+    n_rows = n_physicians * n_questions
+    df = pd.DataFrame(
+        {
+            "physician_id": np.repeat(
+                np.arange(first_id, first_id + n_physicians), n_questions
+            ),
+            "question": np.tile(np.arange(1, n_questions + 1), n_physicians),
+            "decision": rng.choice(list(decisions), size=n_rows, p=p),
+            "confidence": rng.integers(1, 11, size=n_rows).astype(float),
+        }
+    )
+    classes = np.array([chr(ord("A") + c) for c in range(n_classes)])
+    df["vignette_class"] = classes[(df["question"] - 1) * n_classes // n_questions]
+    df["question_type"] = "Type " + df["vignette_class"]
+    df.loc[list(missing_confidence), "confidence"] = np.nan
+    return df.drop(index=list(dropped)).reset_index(drop=True)
+
+
+@pytest.fixture
+def make_long_df():
+    """Factory of random long-format responses; see :func:`_make_long_df`."""
+    return _make_long_df
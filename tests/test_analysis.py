@@ -0,0 +1,301 @@
+"""
+Tests for the interrater reliability analysis module.
+"""
+
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from medevac_interrater.analysis import (
+    DECISION_ORDER,
+    build_count_matrix,
+    calculate_agreement_by_class,
+    calculate_agreement_metrics,
+    calculate_fleiss_kappa,
+    calculate_fleiss_kappa_batch,
+    calculate_gwet_ac1_batch,
+    calculate_krippendorff_alpha_batch,
+    calculate_percentage_agreement,
+    calculate_percentage_agreement_by_question,
+)
+
+
+@pytest.fixture
+def long_df():
+    """Small long-format dataset with one skipped response."""
+    rows = [
+        (1, 1, "Medevac"),
+        (2, 1, "Medevac"),
+        (3, 1, "Medevac"),
+        (4, 1, "Remain"),
+        (1, 2, "Commercial"),
+        (2, 2, "Remain"),
+        (3, 2, "Commercial"),
+        (1, 3, "Remain"),
+        (2, 3, "Remain"),
+        (3, 3, "Medevac"),
+        (4, 3, "Commercial"),
+    ]
+    df = pd.DataFrame(rows, columns=["physician_id", "question", "decision"])
+    classes = {1: "A", 2: "B", 3: "C"}
+    df["vignette_class"] = df["question"].map(classes)
+    return df
+
+
+def _brute_force_agreement(df):
+    """Reference pairwise agreement by explicit enumeration of rater pairs."""
+    agreements = 0
+    total_pairs = 0
+    for _, q_df in df.groupby("question"):
+        decisions = q_df["decision"].tolist()
+        for d1, d2 in combinations(decisions, 2):
+            total_pairs += 1
+            agreements += d1 == d2
+    return agreements / total_pairs
+
+
+def test_build_count_matrix(long_df):
+    counts, questions, categories = build_count_matrix(long_df)
+    assert list(questions) == [1, 2, 3]
+    assert list(categories) == ["Commercial", "Medevac", "Remain"]
+    np.testing.assert_array_equal(counts, [[0, 3, 1], [2, 0, 1], [1, 1, 2]])
+
+
+def test_build_count_matrix_fixed_categories(long_df):
+    counts, _, categories = build_count_matrix(
+        long_df, categories=["Medevac", "Commercial", "Remain", "Other"]
+    )
+    assert counts.shape == (3, 4)
+    assert counts[:, 3].sum() == 0
+    with pytest.raises(ValueError):
+        build_count_matrix(long_df, categories=["Medevac"])
+
+
+def test_build_count_matrix_from_categoricals(long_df):
+    # Unused categories out of sorted order must not change the matrix
+    decisions = pd.Categorical(
+        long_df["decision"], categories=["Remain", "Other", "Medevac", "Commercial"]
+    )
+    categorical_df = long_df.assign(decision=decisions)
+    for categories in [None, ["Medevac", "Commercial", "Remain"]]:
+        expected = build_count_matrix(long_df, categories=categories)
+        result = build_count_matrix(categorical_df, categories=categories)
+        for left, right in zip(result, expected):
+            np.testing.assert_array_equal(left, right)
+
+
+def test_percentage_agreement_matches_pair_enumeration(long_df):
+    assert calculate_percentage_agreement(long_df) == pytest.approx(
+        _brute_force_agreement(long_df)
+    )
+    by_question = calculate_percentage_agreement_by_question(long_df)
+    assert by_question.loc[1] == pytest.approx(3 / 6)
+    assert by_question.loc[2] == pytest.approx(1 / 3)
+    assert by_question.loc[3] == pytest.approx(1 / 6)
+    assert calculate_percentage_agreement(long_df, question=2) == pytest.approx(1 / 3)
+
+
+def test_percentage_agreement_single_rater_is_nan(long_df):
+    one_rater = long_df[long_df["physician_id"] == 1]
+    assert np.isnan(calculate_percentage_agreement(one_rater))
+    assert calculate_percentage_agreement_by_question(one_rater).isna().all()
+
+
+def _irr_kappam_fleiss(ratings):
+    """Port of irr::kappam.fleiss for a complete subjects × raters matrix."""
+    ratings = np.asarray(ratings)
+    n_subjects, n_raters = ratings.shape
+    levels = np.unique(ratings)
+    table = np.stack([(ratings == level).sum(axis=1) for level in levels], axis=1)
+    agree_p = np.sum(
+        (np.sum(table**2, axis=1) - n_raters) / (n_raters * (n_raters - 1)) / n_subjects
+    )
+    chance_p = np.sum(np.sum(table, axis=0) ** 2) / (n_subjects * n_raters) ** 2
+    return (agree_p - chance_p) / (1 - chance_p)
+
+
+def test_question_and_class_metrics(long_df):
+    long_df = long_df.assign(
+        vignette_class=long_df["question"].map({1: "A", 2: "A", 3: "B"}),
+        question_type="Any Option",
+    )
+    question_metrics, class_metrics = calculate_agreement_metrics(long_df)
+
+    for row in question_metrics.itertuples():
+        q_df = long_df[long_df["question"] == row.question]
+        counts = q_df["decision"].value_counts()
+        assert row.n_physicians == q_df["physician_id"].nunique()
+        assert row.decision_medevac == counts.get("Medevac", 0)
+        assert row.decision_remain == counts.get("Remain", 0)
+        assert row.percentage_agreement == pytest.approx(_brute_force_agreement(q_df))
+
+    rollup = question_metrics.groupby("vignette_class")["percentage_agreement"].agg(
+        ["size", "mean"]
+    )
+    assert list(class_metrics["vignette_class"]) == list(rollup.index)
+    np.testing.assert_array_equal(class_metrics["n_questions"], rollup["size"])
+    np.testing.assert_allclose(
+        class_metrics["mean_percentage_agreement"], rollup["mean"]
+    )
+    pd.testing.assert_frame_equal(class_metrics, calculate_agreement_by_class(long_df))
+
+
+def test_fleiss_kappa_matches_irr():
+    rng = np.random.default_rng(0)
+    ratings = rng.choice(
+        ["Medevac", "Commercial", "Remain"], size=(12, 6), p=[0.6, 0.3, 0.1]
+    )
+    df = pd.DataFrame(
+        {
+            "question": np.repeat(np.arange(1, 13), 6),
+            "physician_id": np.tile(np.arange(6), 12),
+            "decision": ratings.ravel(),
+            "vignette_class": np.repeat(["A", "B"], 36),
+        }
+    )
+    by_question, overall, by_class = calculate_fleiss_kappa_batch(df)
+
+    assert overall == pytest.approx(_irr_kappam_fleiss(ratings))
+    assert by_class.loc["A"] == pytest.approx(_irr_kappam_fleiss(ratings[:6]))
+    assert by_class.loc["B"] == pytest.approx(_irr_kappam_fleiss(ratings[6:]))
+    for q in range(1, 13):
+        row = ratings[q - 1 : q]
+        if len(set(row[0])) > 1:
+            assert by_question.loc[q] == pytest.approx(_irr_kappam_fleiss(row))
+            assert calculate_fleiss_kappa(df, q) == pytest.approx(by_question.loc[q])
+
+
+def test_fleiss_kappa_unanimous_is_nan(long_df):
+    unanimous = long_df[long_df["decision"] == "Medevac"]
+    assert np.isnan(calculate_fleiss_kappa(unanimous, 1))
+    _, overall, _ = calculate_fleiss_kappa_batch(unanimous)
+    assert np.isnan(overall)
+
+
+def test_fleiss_kappa_handles_skipped_ratings(long_df):
+    by_question, overall, by_class = calculate_fleiss_kappa_batch(long_df)
+    assert list(by_question.index) == [1, 2, 3]
+    assert list(by_class.index) == ["A", "B", "C"]
+    assert np.isfinite(overall)
+
+
+def _irrcac_gwet_ac1(ratings):
+    """Port of irrCAC::gwet.ac1.raw for a subjects × raters matrix (None = missing)."""
+    categories = sorted({r for row in ratings for r in row if r is not None})
+    q = len(categories)
+    table = np.array(
+        [[sum(r == c for r in row) for c in categories] for row in ratings], float
+    )
+    r_i = table.sum(axis=1)
+    keep = r_i > 0
+    table, r_i = table[keep], r_i[keep]
+    n = len(table)
+    pairable = r_i >= 2
+    p_a = np.mean(
+        (table[pairable] * (table[pairable] - 1)).sum(axis=1)
+        / (r_i[pairable] * (r_i[pairable] - 1))
+    )
+    pi_k = (table / r_i[:, None]).sum(axis=0) / n
+    p_e = (pi_k * (1 - pi_k)).sum() / (q - 1)
+    return (p_a - p_e) / (1 - p_e)
+
+
+def _ratings_frame(ratings, classes):
+    rows = [
+        (rater, q + 1, decision, classes[q])
+        for q, row in enumerate(ratings)
+        for rater, decision in enumerate(row)
+        if decision is not None
+    ]
+    return pd.DataFrame(
+        rows, columns=["physician_id", "question", "decision", "vignette_class"]
+    )
+
+
+@pytest.fixture
+def sparse_ratings():
+    """Eight vignettes rated by up to five physicians, with gaps."""
+    rng = np.random.default_rng(5)
+    ratings = rng.choice(list(DECISION_ORDER), size=(8, 5), p=[0.2, 0.3, 0.5]).tolist()
+    for q, rater in [(0, 1), (2, 4), (2, 3), (5, 0), (7, 2)]:
+        ratings[q][rater] = None
+    return ratings
+
+
+def test_gwet_ac1_matches_irrcac(sparse_ratings):
+    classes = ["A"] * 4 + ["B"] * 4
+    df = _ratings_frame(sparse_ratings, classes)
+    by_question, overall, by_class = calculate_gwet_ac1_batch(df)
+
+    assert overall == pytest.approx(_irrcac_gwet_ac1(sparse_ratings))
+    assert by_class.loc["A"] == pytest.approx(_irrcac_gwet_ac1(sparse_ratings[:4]))
+    assert by_class.loc["B"] == pytest.approx(_irrcac_gwet_ac1(sparse_ratings[4:]))
+    for q, row in enumerate(sparse_ratings):
+        if len({r for r in row if r is not None}) > 1:
+            assert by_question.loc[q + 1] == pytest.approx(_irrcac_gwet_ac1([row]))
+
+
+def test_gwet_ac1_unanimous_question_is_one(long_df):
+    by_question, _, _ = calculate_gwet_ac1_batch(
+        long_df[long_df["question"] == 1].iloc[:3]
+    )
+    assert by_question.loc[1] == 1.0
+
+
+def _reference_alpha(ratings, distance):
+    """Krippendorff's alpha by enumerating pairable values within each unit."""
+    units = [[r for r in row if r is not None] for row in ratings]
+    units = [u for u in units if len(u) >= 2]
+    values = [v for u in units for v in u]
+    n = len(values)
+    d_o = (
+        sum(
+            distance(a, b) / (len(u) - 1)
+            for u in units
+            for i, a in enumerate(u)
+            for j, b in enumerate(u)
+            if i != j
+        )
+        / n
+    )
+    d_e = sum(
+        distance(a, b)
+        for i, a in enumerate(values)
+        for j, b in enumerate(values)
+        if i != j
+    ) / (n * (n - 1))
+    return 1 - d_o / d_e
+
+
+def test_krippendorff_alpha_nominal(sparse_ratings):
+    df = _ratings_frame(sparse_ratings, ["A"] * 8)
+    _, overall, _ = calculate_krippendorff_alpha_batch(df, level="nominal")
+    assert overall == pytest.approx(
+        _reference_alpha(sparse_ratings, lambda a, b: float(a != b))
+    )
+
+
+def test_krippendorff_alpha_ordinal(sparse_ratings):
+    df = _ratings_frame(sparse_ratings, ["A"] * 8)
+    _, overall, _ = calculate_krippendorff_alpha_batch(df, level="ordinal")
+
+    # Ordinal distance uses the pooled frequency of each rank
+    values = [
+        DECISION_ORDER.index(r)
+        for row in sparse_ratings
+        if len([v for v in row if v is not None]) >= 2
+        for r in row
+        if r is not None
+    ]
+    freq = np.bincount(values, minlength=3)
+
+    def ordinal(a, b):
+        lo, hi = sorted((DECISION_ORDER.index(a), DECISION_ORDER.index(b)))
+        return (freq[lo : hi + 1].sum() - (freq[lo] + freq[hi]) / 2) ** 2
+
+    assert overall == pytest.approx(_reference_alpha(sparse_ratings, ordinal))
+
+    with pytest.raises(ValueError):
+        calculate_krippendorff_alpha_batch(df, level="interval")
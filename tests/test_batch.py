@@ -0,0 +1,94 @@
+"""
+Tests for the multi-survey batch runner.
+"""
+
+import multiprocessing
+import os
+
+import pandas as pd
+import pytest
+
+from medevac_interrater import batch
+from medevac_interrater.batch import SUMMARY_FILENAME, discover_exports, run_batch
+
+CONFIDENCE = "How confident are you of this decision (10 being very confident, and 1 being not confident at all)"
+
+
+@pytest.fixture
+def exports(tmp_path):
+    """Two sites with one valid export each and one unreadable export."""
+    source = tmp_path / "exports"
+    for site, answers in [
+        ("north", ["Activate medevac", "Activate medevac", "Remain"]),
+        ("south", ["Remain", "Commercial flight", "Remain"]),
+    ]:
+        (source / site).mkdir(parents=True)
+        pd.DataFrame(
+            {
+                "Record ID": [1, 2, 3],
+                "Question 1: crash": answers,
+                CONFIDENCE: [8, 6, 7],
+                "Question 2: wound": ["Remain", "Remain", "Commercial flight"],
+                CONFIDENCE + ".1": [5, 9, 4],
+            }
+        ).to_csv(source / site / "wave1.csv", index=False)
+    (source / "south" / "wave2.csv").write_text("not,a\nsurvey,export\n")
+    return source
+
+
+def test_discover_exports(exports):
+    found, root = discover_exports(exports / "**" / "*.csv")
+    assert root == exports
+    assert [p.relative_to(exports).as_posix() for p in found] == [
+        "north/wave1.csv",
+        "south/wave1.csv",
+        "south/wave2.csv",
+    ]
+    assert discover_exports(exports / "north")[0] == [exports / "north" / "wave1.csv"]
+
+
+@pytest.mark.parametrize("n_jobs", [1, 2])
+def test_run_batch_isolates_failures(exports, tmp_path, n_jobs):
+    output_dir = tmp_path / "results"
+    calls = []
+    summary = run_batch(
+        exports / "**" / "*.csv",
+        output_dir,
+        n_jobs=n_jobs,
+        progress=lambda done, total, row: calls.append((done, total)),
+    )
+
+    assert list(summary["survey"]) == ["north/wave1", "south/wave1", "south/wave2"]
+    assert list(summary["status"]) == ["ok", "ok", "failed"]
+    assert "No survey responses" in summary.loc[2, "error"]
+    assert list(summary["n_responses"][:2]) == [6, 6]
+    assert calls == [(1, 3), (2, 3), (3, 3)]
+
+    assert (output_dir / "north" / "wave1" / "question_level_metrics.csv").exists()
+    assert not (output_dir / "south" / "wave2").exists()
+    saved = pd.read_csv(output_dir / SUMMARY_FILENAME)
+    assert list(saved["status"]) == ["ok", "ok", "failed"]
+
+
+ANALYZE_EXPORT = batch.analyze_export
+
+
+def crash_on_north(csv_path, output_dir, cache_dir=None):
+    """analyze_export that kills its worker process on the north export."""
+    if "north" in str(csv_path):
+        os._exit(1)
+    return ANALYZE_EXPORT(csv_path, output_dir, cache_dir=cache_dir)
+
+
+@pytest.mark.skipif(
+    multiprocessing.get_start_method() != "fork",
+    reason="workers must inherit the patched analyze_export",
+)
+def test_crashed_worker_fails_only_its_export(exports, tmp_path, monkeypatch):
+    monkeypatch.setattr(batch, "analyze_export", crash_on_north)
+    summary = run_batch(exports / "**" / "*.csv", tmp_path / "results", n_jobs=2)
+
+    assert list(summary["status"]) == ["failed", "ok", "failed"]
+    assert summary.loc[0, "error"].startswith("BrokenProcessPool")
+    assert "No survey responses" in summary.loc[2, "error"]
+    assert summary.loc[1, "n_responses"] == 6
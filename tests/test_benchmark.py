@@ -0,0 +1,69 @@
+"""
+Tests for the synthetic survey generator and benchmark suite.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from medevac_interrater.analysis import calculate_percentage_agreement
+from medevac_interrater.benchmark import (
+    compare_to_baseline,
+    load_baseline,
+    run_benchmarks,
+    save_baseline,
+)
+from medevac_interrater.data_loader import load_export, reshape_to_long_format
+from medevac_interrater.synthetic import generate_survey, write_survey
+
+
+def test_generated_export_loads(tmp_path):
+    wide_df = generate_survey(n_physicians=30, n_vignettes=5, missing_rate=0.2, seed=1)
+    long_df = reshape_to_long_format(wide_df)
+    assert set(long_df["question"]) == {1, 2, 3, 4, 5}
+    assert 0.6 < len(long_df) / (30 * 5) < 0.95
+
+    csv_path = write_survey(
+        tmp_path / "survey.csv",
+        n_physicians=30,
+        n_vignettes=5,
+        missing_rate=0.2,
+        seed=1,
+    )
+    pd.testing.assert_frame_equal(
+        load_export(csv_path), long_df, check_column_type=False
+    )
+
+
+def test_agreement_structure():
+    unanimous = reshape_to_long_format(generate_survey(agreement=1.0, seed=2))
+    assert calculate_percentage_agreement(unanimous) == 1.0
+
+    # Per-vignette agreement: vignette 1 unanimous, vignette 2 never modal
+    mixed = reshape_to_long_format(
+        generate_survey(
+            n_vignettes=2, answers=["Remain", "Medevac"], agreement=[1.0, 0.0], seed=3
+        )
+    )
+    assert mixed.groupby("question")["decision"].nunique().tolist() == [1, 1]
+
+    with pytest.raises(ValueError):
+        generate_survey(n_vignettes=21)
+
+
+def test_benchmarks_and_baseline(tmp_path):
+    results = run_benchmarks(
+        tiers=["small"], names=["build_count_matrix", "load_export"], repeat=1
+    )
+    assert list(results["benchmark"]) == ["load_export", "build_count_matrix"]
+    assert (results["best_seconds"] > 0).all()
+
+    path = tmp_path / "baseline.json"
+    save_baseline(results, path)
+    baseline = load_baseline(path)
+    assert not compare_to_baseline(results, baseline)["regressed"].any()
+
+    slower = results.assign(best_seconds=results["best_seconds"] * 3 + 0.01)
+    compared = compare_to_baseline(slower, baseline)
+    assert compared["regressed"].all()
+    np.testing.assert_allclose(compared["baseline_seconds"], results["best_seconds"])
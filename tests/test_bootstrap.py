@@ -0,0 +1,68 @@
+"""
+Tests for the cluster-bootstrap confidence intervals.
+"""
+
+import pandas as pd
+import pytest
+
+from medevac_interrater.analysis import (
+    calculate_agreement_by_class,
+    calculate_fleiss_kappa_batch,
+    calculate_percentage_agreement,
+)
+from medevac_interrater.bootstrap import bootstrap_agreement
+
+
+@pytest.fixture
+def long_df(make_long_df):
+    """Twelve physicians rating eight vignettes in two classes."""
+    return make_long_df(12, 8, seed=3, p=[0.3, 0.6, 0.1], dropped=[5, 17])
+
+
+def test_estimates_match_point_metrics(long_df):
+    result = bootstrap_agreement(long_df, n_boot=200, seed=0)
+    by_key = result.set_index(["level", "unit", "metric"])["estimate"]
+
+    _, overall_kappa, kappa_by_class = calculate_fleiss_kappa_batch(long_df)
+    class_metrics = calculate_agreement_by_class(long_df).set_index("vignette_class")
+
+    assert by_key[("overall", "overall", "percentage_agreement")] == pytest.approx(
+        calculate_percentage_agreement(long_df)
+    )
+    assert by_key[("overall", "overall", "fleiss_kappa")] == pytest.approx(
+        overall_kappa
+    )
+    for v_class in ["A", "B"]:
+        assert by_key[("class", v_class, "fleiss_kappa")] == pytest.approx(
+            kappa_by_class[v_class]
+        )
+        assert by_key[("class", v_class, "mean_percentage_agreement")] == pytest.approx(
+            class_metrics.loc[v_class, "mean_percentage_agreement"]
+        )
+
+
+@pytest.mark.parametrize("resample", ["physicians", "vignettes", "both"])
+@pytest.mark.parametrize("method", ["percentile", "bca"])
+def test_intervals_are_ordered(long_df, resample, method):
+    result = bootstrap_agreement(
+        long_df, n_boot=300, resample=resample, method=method, seed=1
+    )
+    finite = result.dropna(subset=["ci_lower", "ci_upper"])
+    assert len(finite) > 0
+    assert (finite["ci_lower"] <= finite["ci_upper"]).all()
+    assert ("question" in set(result["level"])) == (resample != "vignettes")
+
+
+def test_reproducible_across_workers(long_df):
+    serial = bootstrap_agreement(long_df, n_boot=300, seed=7, batch_size=100)
+    parallel = bootstrap_agreement(
+        long_df, n_boot=300, seed=7, batch_size=100, n_jobs=2
+    )
+    pd.testing.assert_frame_equal(serial, parallel)
+
+
+def test_invalid_options(long_df):
+    with pytest.raises(ValueError):
+        bootstrap_agreement(long_df, resample="sites")
+    with pytest.raises(ValueError):
+        bootstrap_agreement(long_df, method="studentized")
@@ -0,0 +1,82 @@
+"""
+Tests for the content-addressed long-format cache.
+"""
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from medevac_interrater import cache, data_loader
+from medevac_interrater.data_loader import load_long_data
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    """Data directory with a small survey export."""
+    confidence = "How confident are you of this decision (10 being very confident, and 1 being not confident at all)"
+    pd.DataFrame(
+        {
+            "Record ID": [1, 2, 3],
+            "Question 1: crash": [
+                "Activate medevac immediately",
+                "Commercial flight",
+                None,
+            ],
+            confidence: [9, 5, None],
+            "Question 2: wound": [
+                "Remain in village",
+                "Remain in village",
+                "Activate medevac",
+            ],
+            confidence + ".1": [7, 8, 6],
+        }
+    ).to_csv(tmp_path / "survey_results.csv", index=False)
+    return tmp_path
+
+
+def test_warm_load_skips_parsing(data_dir, tmp_path, monkeypatch):
+    cache_dir = tmp_path / "cache"
+    cold = load_long_data(data_dir, cache_dir=cache_dir)
+    assert len(list(cache_dir.glob("survey_results-*.feather"))) == 1
+
+    def fail(*args, **kwargs):
+        raise AssertionError("export was parsed on a warm load")
+
+    hits = []
+
+    def read_cached(*args, **kwargs):
+        hits.append(cache.read_cached_long_data(*args, **kwargs))
+        return hits[-1]
+
+    monkeypatch.setattr(data_loader, "_clean_long_data", fail)
+    monkeypatch.setattr(data_loader, "read_cached_long_data", read_cached)
+    warm = load_long_data(data_dir, cache_dir=cache_dir)
+
+    assert len(hits) == 1 and warm is hits[0]
+    pd.testing.assert_frame_equal(warm, cold, check_column_type=False)
+
+
+def test_changed_export_invalidates_entry(data_dir, tmp_path):
+    cache_dir = tmp_path / "cache"
+    load_long_data(data_dir, cache_dir=cache_dir)
+    (old_entry,) = cache_dir.glob("*.feather")
+
+    csv_path = data_dir / "survey_results.csv"
+    raw = pd.read_csv(csv_path)
+    raw.loc[0, "Question 2: wound"] = "Commercial flight"
+    raw.to_csv(csv_path, index=False)
+
+    long_df = load_long_data(data_dir, cache_dir=cache_dir)
+    assert long_df["decision"].tolist()[:2] == ["Medevac", "Commercial"]
+    (new_entry,) = cache_dir.glob("*.feather")
+    assert new_entry != old_entry
+
+
+def test_key_depends_on_version_and_inputs(data_dir, monkeypatch):
+    csv_path = data_dir / "survey_results.csv"
+    key = cache.cache_key(csv_path, {"1": "A"})
+    assert cache.cache_key(csv_path, {"1": "B"}) != key
+
+    monkeypatch.setattr(cache, "__version__", "0.0.0-test")
+    assert cache.cache_key(csv_path, {"1": "A"}) != key
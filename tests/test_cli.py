@@ -0,0 +1,132 @@
+"""
+Tests for the medevac-irr command line.
+"""
+
+import subprocess
+import sys
+import time
+
+import pandas as pd
+import pytest
+
+from medevac_interrater.cache import pyarrow_available
+from medevac_interrater.cli import main
+from medevac_interrater.handoff import read_handoff
+from medevac_interrater.synthetic import write_survey
+
+HEAVY_MODULES = ["numpy", "pandas", "scipy", "pyarrow"]
+
+# Generous for a cold interpreter; typical runs take around 0.1 s
+STARTUP_BUDGET_SECONDS = 0.75
+
+
+@pytest.fixture
+def export(tmp_path):
+    """A synthetic export in a data directory."""
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    return write_survey(
+        data_dir / "survey_results.csv", n_physicians=6, n_vignettes=4, seed=0
+    )
+
+
+def run_cli(*args):
+    """Run the CLI in a fresh interpreter; return its output, heavy imports and duration."""
+    code = (
+        "import sys\n"
+        "from medevac_interrater.cli import main\n"
+        "try:\n"
+        f"    main({list(args)!r})\n"
+        "except SystemExit:\n"
+        "    pass\n"
+        f"print(sorted(m for m in {HEAVY_MODULES!r} if m in sys.modules))\n"
+    )
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    elapsed = time.perf_counter() - start
+    *output, imported = result.stdout.strip().splitlines()
+    return "\n".join(output), imported, elapsed
+
+
+@pytest.mark.parametrize(
+    "args", [["--help"], ["explore", "--help"], ["bench", "--help"]]
+)
+def test_help_starts_fast_without_heavy_imports(args):
+    output, imported, elapsed = run_cli(*args)
+
+    assert "usage: medevac-irr" in output
+    assert imported == "[]"
+    assert elapsed < STARTUP_BUDGET_SECONDS
+
+
+def test_explore_reads_only_the_header(export):
+    output, imported, elapsed = run_cli("explore", str(export), "--columns")
+
+    assert "Questions: 4" in output
+    assert "ID column: Record ID" in output
+    assert "What is your current degree?" in output
+    assert imported == "[]"
+    assert elapsed < STARTUP_BUDGET_SECONDS
+
+
+def test_explore_values_and_schema(export, capsys):
+    assert main(["explore", str(export), "--values", "--save-schema"]) == 0
+
+    output = capsys.readouterr().out
+    assert "Answers:" in output
+    assert export.with_name("survey_results.schema.json").exists()
+
+
+def test_process_and_analyze(export, tmp_path, capsys):
+    data_dir = export.parent
+    with pytest.warns(UserWarning, match="No covariates for 6 physicians"):
+        assert main(["process", "--data-dir", str(data_dir), "--no-cache"]) == 0
+    processed = pd.read_csv(data_dir / "processed" / "survey_data_processed.csv")
+    assert len(processed) == 24
+    if pyarrow_available():
+        handoff = read_handoff(data_dir / "processed" / "survey_data_processed.arrow")
+        assert len(handoff) == 24
+
+    output_dir = tmp_path / "output"
+    assert (
+        main(
+            [
+                "analyze",
+                "--data-dir",
+                str(data_dir),
+                "--output",
+                str(output_dir),
+                "--timings",
+            ]
+        )
+        == 0
+    )
+    assert (output_dir / "question_level_metrics.csv").exists()
+    assert "batch.analyze_export" in capsys.readouterr().out
+
+
+def test_analyze_batch(export, tmp_path):
+    output_dir = tmp_path / "batch"
+    assert (
+        main(
+            [
+                "analyze",
+                "--batch",
+                str(export.parent),
+                "--output",
+                str(output_dir),
+                "--jobs",
+                "1",
+                "--no-cache",
+            ]
+        )
+        == 0
+    )
+    assert (output_dir / "batch_summary.csv").exists()
+
+
+def test_missing_export_is_reported(tmp_path, capsys):
+    assert main(["analyze", str(tmp_path / "missing.csv"), "--no-cache"]) == 2
+    assert "missing.csv" in capsys.readouterr().err
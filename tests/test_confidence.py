@@ -0,0 +1,159 @@
+"""
+Tests for the confidence reliability statistics and derived features.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from medevac_interrater.analysis import build_count_matrix, fleiss_kappa_from_counts
+from medevac_interrater.confidence import (
+    add_confidence_features,
+    agreement_weights,
+    build_confidence_matrix,
+    calculate_confidence_icc,
+    calculate_weighted_confidence_agreement,
+    complete_ratings,
+    confidence_count_matrix,
+    confidence_tertiles,
+    icc_from_ratings,
+    weighted_agreement_from_counts,
+    weighted_kappa_from_counts,
+)
+
+# Shrout & Fleiss (1979), Table 2: six targets rated by four judges
+SHROUT_FLEISS = np.array(
+    [
+        [9, 2, 5, 8],
+        [6, 1, 3, 2],
+        [8, 4, 6, 8],
+        [7, 1, 2, 6],
+        [10, 5, 6, 9],
+        [6, 2, 4, 7],
+    ],
+    dtype=float,
+)
+
+
+@pytest.fixture
+def long_df(make_long_df):
+    """Six physicians rating eight vignettes in two classes, one rating missing."""
+    return make_long_df(
+        6, 8, seed=5, decisions=["Medevac", "Remain"], missing_confidence=[3]
+    )
+
+
+def test_icc_matches_shrout_fleiss():
+    iccs = icc_from_ratings(SHROUT_FLEISS)
+
+    assert iccs["icc1"] == pytest.approx(0.17, abs=0.005)
+    assert iccs["icc2_1"] == pytest.approx(0.29, abs=0.005)
+    assert iccs["icc3_1"] == pytest.approx(0.71, abs=0.005)
+
+
+def test_icc_is_batched():
+    shuffled = SHROUT_FLEISS[::-1, ::-1]
+    iccs = icc_from_ratings(np.stack([SHROUT_FLEISS, shuffled, shuffled + 1]))
+
+    assert iccs["icc1"].shape == (3,)
+    for name, values in iccs.items():
+        assert values == pytest.approx(icc_from_ratings(SHROUT_FLEISS)[name])
+
+
+def test_complete_ratings():
+    ratings = SHROUT_FLEISS.copy()
+    ratings[1, 2] = np.nan
+
+    by_subject, kept_subjects, _ = complete_ratings(ratings, "subjects")
+    assert by_subject.shape == (5, 4)
+    assert not kept_subjects[1]
+
+    by_rater, _, kept_raters = complete_ratings(ratings, "raters")
+    assert by_rater.shape == (6, 3)
+    assert not kept_raters[2]
+
+    with pytest.raises(ValueError):
+        complete_ratings(ratings, "cells")
+
+
+def test_weighted_statistics():
+    weights = agreement_weights(10, "quadratic")
+    assert weights[0, 9] == 0
+    assert weights[0, 3] == pytest.approx(1 - (3 / 9) ** 2)
+    assert np.allclose(weights, weights.T)
+
+    # Two ratings of 1 and 3 on a 10-point scale
+    counts = np.zeros((1, 10))
+    counts[0, [0, 2]] = 1
+    assert weighted_agreement_from_counts(counts, "linear")[0] == pytest.approx(
+        1 - 2 / 9
+    )
+
+    with pytest.raises(ValueError):
+        agreement_weights(10, "cubic")
+
+
+def test_weighted_kappa_reduces_to_fleiss_with_two_levels(long_df):
+    # With two levels both weighting schemes are the identity
+    counts, _, _ = build_count_matrix(long_df)
+    groups = (np.arange(len(counts)) >= 4).astype(int)
+
+    assert weighted_kappa_from_counts(counts, "linear", groups) == pytest.approx(
+        fleiss_kappa_from_counts(counts, groups)
+    )
+
+
+def test_confidence_matrix(long_df):
+    ratings, questions, physicians = build_confidence_matrix(long_df)
+
+    assert ratings.shape == (8, 6)
+    assert np.isnan(ratings[3, 0])
+    assert list(questions) == list(range(1, 9))
+    assert confidence_count_matrix(ratings).sum() == len(long_df) - 1
+
+
+def test_calculate_confidence_icc(long_df):
+    result = calculate_confidence_icc(long_df)
+
+    assert list(result["unit"]) == ["overall", "A", "B"]
+    assert list(result["n_subjects"]) == [7, 3, 4]
+    assert (result["n_raters"] == 6).all()
+
+    by_rater = calculate_confidence_icc(long_df, missing="raters")
+    assert list(by_rater["n_raters"]) == [5, 5, 6]
+
+
+def test_calculate_weighted_confidence_agreement(long_df):
+    result = calculate_weighted_confidence_agreement(long_df, "quadratic")
+
+    assert list(result["level"].unique()) == ["question", "class", "overall"]
+    assert len(result) == 8 + 2 + 1
+    assert result["weighted_agreement"].between(0, 1).all()
+    linear = calculate_weighted_confidence_agreement(long_df, "linear")
+    # Quadratic weights give more credit to near misses
+    assert (result["weighted_agreement"] >= linear["weighted_agreement"]).all()
+
+
+def test_confidence_features(long_df):
+    features = add_confidence_features(long_df)
+    by_physician = features.groupby("physician_id")
+
+    assert by_physician["confidence_within"].sum().abs().max() < 1e-9
+    assert by_physician["confidence_between"].nunique().max() == 1
+    assert features["confidence_between"].isna().sum() == 0
+    assert features["confidence_tertile"].isna().sum() == 1
+
+
+def test_confidence_tertiles():
+    df = pd.DataFrame(
+        {
+            "physician_id": [1] * 9 + [2] * 3,
+            "confidence": list(range(1, 10)) + [10, 10, 10],
+        }
+    )
+    tertiles = confidence_tertiles(df)
+
+    assert list(tertiles[:9]) == ["Low"] * 3 + ["Medium"] * 3 + ["High"] * 3
+    # All-tied ratings share the middle rank
+    assert list(tertiles[9:]) == ["Medium"] * 3
+    assert list(confidence_tertiles(df, within_physician=False)[9:]) == ["High"] * 3
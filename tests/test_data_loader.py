@@ -0,0 +1,112 @@
+"""
+Tests for the data loading and cleaning module.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from medevac_interrater.data_loader import (
+    iter_long_chunks,
+    reshape_to_long_format,
+    write_long_format,
+)
+
+CONFIDENCE = "How confident are you of this decision (10 being very confident, and 1 being not confident at all)"
+
+
+@pytest.fixture
+def raw_df():
+    """Wide export with three questions, a blank answer and a bad confidence."""
+    return pd.DataFrame(
+        {
+            "Record ID": [7, 8, 9],
+            "What is your current degree? ": ["MD/DO", "MD/DO", "PA"],
+            "Question 1: snowmachine crash": [
+                "Activate medevac immediately",
+                "Commercial flight next available",
+                np.nan,
+            ],
+            CONFIDENCE: [10, 6, np.nan],
+            "Question 2: stab wound": [
+                "Remain in village (for ongoing observation or treatment, if necessary)",
+                "  ",
+                "Activate medevac immediately",
+            ],
+            CONFIDENCE + ".1": ["7", "5", "n/a"],
+            "Question 3: found down": ["Commercial flight", "Remain", "Something else"],
+            CONFIDENCE + ".2": [8, 9, 4],
+        }
+    )
+
+
+def test_reshape_to_long_format(raw_df):
+    with pytest.warns(UserWarning, match="'Something else' \\(1\\)"):
+        long_df = reshape_to_long_format(raw_df)
+
+    assert list(long_df.columns) == [
+        "physician_id",
+        "question",
+        "vignette_label",
+        "decision",
+        "confidence",
+        "question_type",
+        "vignette_class",
+    ]
+    assert list(zip(long_df["physician_id"], long_df["question"])) == [
+        (7, 1),
+        (7, 2),
+        (7, 3),
+        (8, 1),
+        (8, 3),
+        (9, 2),
+    ]
+    assert list(long_df["decision"]) == [
+        "Medevac",
+        "Remain",
+        "Commercial",
+        "Commercial",
+        "Remain",
+        "Medevac",
+    ]
+    np.testing.assert_array_equal(
+        long_df["confidence"], [10.0, 7.0, 8.0, 6.0, 9.0, np.nan]
+    )
+    assert list(long_df["vignette_label"]) == ["A1", "B1", "C1", "A1", "C1", "B1"]
+    assert list(long_df["vignette_class"]) == ["A", "B", "C", "A", "C", "B"]
+
+    assert list(long_df["decision"].cat.categories) == [
+        "Commercial",
+        "Medevac",
+        "Remain",
+    ]
+    assert long_df["question"].dtype == np.int8
+    assert all(
+        isinstance(long_df[col].dtype, pd.CategoricalDtype)
+        for col in ["vignette_label", "question_type", "vignette_class"]
+    )
+
+
+@pytest.mark.filterwarnings("ignore:Dropped responses")
+def test_reshape_without_record_id_uses_row_index(raw_df):
+    long_df = reshape_to_long_format(raw_df.drop(columns="Record ID"))
+    assert list(long_df["physician_id"].unique()) == [0, 1, 2]
+
+
+@pytest.mark.filterwarnings("ignore:Dropped responses")
+def test_streaming_matches_in_memory_reshape(raw_df, tmp_path):
+    # Repeat question 1 in a second section that has more responses
+    raw_df["Complete?"] = "Yes"
+    raw_df["Question 1: second section"] = ["Remain", "Remain", "Activate medevac"]
+    raw_df[CONFIDENCE + ".3"] = [3, 4, 5]
+    csv_path = tmp_path / "survey_results.csv"
+    raw_df.to_csv(csv_path, index=False)
+
+    expected = reshape_to_long_format(pd.read_csv(csv_path))
+    chunks = list(iter_long_chunks(csv_path, chunksize=2))
+    assert len(chunks) == 2
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), expected)
+
+    output_path = tmp_path / "long.csv"
+    assert write_long_format(csv_path, output_path, chunksize=1) == len(expected)
+    assert output_path.read_text() == expected.to_csv(index=False)
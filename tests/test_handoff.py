@@ -0,0 +1,157 @@
+"""
+Tests for the Arrow IPC hand-off of the processed long-format data.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+feather = pytest.importorskip("pyarrow.feather")
+
+from medevac_interrater.handoff import (
+    HANDOFF_COLUMNS,
+    handoff_schema,
+    read_handoff,
+    write_handoff,
+)
+from medevac_interrater.physicians import PhysicianDimension
+
+
+@pytest.fixture
+def long_df():
+    """Three physicians answering two questions, one confidence missing."""
+    return pd.DataFrame(
+        {
+            "physician_id": np.repeat([1, 2, 3], 2),
+            "question": np.tile(np.array([1, 2], dtype=np.int8), 3),
+            "vignette_label": pd.Categorical(["A1", "B1"] * 3),
+            "decision": pd.Categorical(
+                ["Medevac", "Remain", "Medevac", "Commercial", "Remain", "Remain"],
+                categories=["Commercial", "Medevac", "Remain"],
+            ),
+            "confidence": [9.0, 7.0, np.nan, 5.0, 8.0, 6.0],
+            "question_type": pd.Categorical(["Clear Medevac", "Any Option"] * 3),
+            "vignette_class": pd.Categorical(["A", "B"] * 3),
+        }
+    )
+
+
+def write_covariates(data_dir, locations):
+    """Covariate files for physicians 1-3 with the given practice locations."""
+    pd.DataFrame(
+        {
+            "physician_id": [1, 2, 3],
+            "training_year": [2000, 2010, 2015],
+            "years_experience": [25, 15, 10],
+        }
+    ).to_csv(data_dir / "physician_experience.csv", index=False)
+    pd.DataFrame(
+        {
+            "physician_id": [1, 2, 3][: len(locations)],
+            "practice_location": locations,
+        }
+    ).to_csv(data_dir / "practice_location.csv", index=False)
+    pd.DataFrame(
+        {
+            "physician_id": [1, 2, 3],
+            "rural_experience": ["Yes", "No", "No"],
+        }
+    ).to_csv(data_dir / "rural_experience.csv", index=False)
+    return data_dir
+
+
+@pytest.fixture
+def covariates(tmp_path):
+    """Physician dimension where physician 3 has no practice location."""
+    write_covariates(tmp_path, ["Regional Hub", "Referral Hub"])
+    with pytest.warns(UserWarning, match="missing in practice_location.csv"):
+        return PhysicianDimension.from_files(tmp_path)
+
+
+def test_round_trip(long_df, covariates, tmp_path):
+    path = write_handoff(long_df, tmp_path / "data.arrow", covariates)
+    result = read_handoff(path)
+
+    assert list(result.columns) == list(HANDOFF_COLUMNS)
+    assert result["confidence"].dtype == np.float32
+    assert result["question"].dtype == np.int8
+    assert list(result["decision"].cat.categories) == [
+        "Commercial",
+        "Medevac",
+        "Remain",
+    ]
+    pd.testing.assert_frame_equal(
+        result[long_df.columns].astype({"confidence": "float64"}),
+        long_df,
+        check_categorical=False,
+    )
+    assert list(result["years_experience"]) == [25, 25, 15, 15, 10, 10]
+    assert result["practice_location"].isna().sum() == 2
+    assert list(result["rural_experience"][::2]) == ["Yes", "No", "No"]
+
+
+def test_fixed_schema(long_df, tmp_path):
+    path = write_handoff(long_df, tmp_path / "data.arrow")
+    with pa.memory_map(str(path)) as source:
+        schema = pa.ipc.open_file(source).schema
+
+    assert schema.equals(handoff_schema(), check_metadata=True)
+    assert schema.field("confidence").type == pa.float32()
+    assert schema.field("decision").type == pa.dictionary(pa.int8(), pa.string())
+
+
+def test_ordered_and_oversized_categories(long_df, tmp_path):
+    long_df["decision"] = long_df["decision"].cat.as_ordered()
+    path = write_handoff(long_df, tmp_path / "data.arrow")
+    result = read_handoff(path)
+
+    assert result["decision"].cat.ordered
+    assert not result["vignette_class"].cat.ordered
+    pd.testing.assert_series_equal(result["decision"], long_df["decision"])
+
+    labels = [f"L{i}" for i in range(200)]
+    many = long_df.assign(
+        vignette_label=pd.Categorical(["L0"] * len(long_df), categories=labels)
+    )
+    with pytest.raises(ValueError, match="200 categories"):
+        write_handoff(many, tmp_path / "many.arrow")
+
+
+def test_read_is_zero_copy(long_df, tmp_path):
+    covariates = PhysicianDimension.from_files(
+        write_covariates(tmp_path, ["Regional Hub", "Referral Hub", "Mixed"])
+    )
+    large = long_df.loc[np.tile(long_df.index, 50_000)].reset_index(drop=True)
+    path = write_handoff(large, tmp_path / "data.arrow", covariates)
+    before = pa.total_allocated_bytes()
+    result = read_handoff(path)
+
+    # Only small per-column wrappers are allocated, not the 300,000 rows
+    assert len(result) == len(large)
+    assert pa.total_allocated_bytes() - before < 16_384
+    # Buffers are read-only views of the memory-mapped file
+    assert not result["confidence"].to_numpy().flags.writeable
+    assert not result["decision"].array.codes.flags.writeable
+    with pytest.raises(ValueError):
+        result.loc[0, "confidence"] = 1.0
+    copied = result.copy()
+    copied.loc[0, "confidence"] = 1.0
+    assert copied.loc[0, "confidence"] == 1.0
+
+
+def test_read_columns_and_errors(long_df, tmp_path):
+    path = write_handoff(long_df, tmp_path / "data.arrow")
+
+    assert list(read_handoff(path, columns=["decision"]).columns) == ["decision"]
+    with pytest.raises(ValueError, match="Unknown"):
+        read_handoff(path, columns=["nope"])
+    with pytest.raises(FileNotFoundError):
+        read_handoff(tmp_path / "missing.arrow")
+    with pytest.raises(ValueError, match="missing columns"):
+        write_handoff(long_df.drop(columns="decision"), tmp_path / "bad.arrow")
+
+    other = tmp_path / "other.arrow"
+    feather.write_feather(pa.table({"x": [1]}), other)
+    with pytest.raises(ValueError, match="hand-off file"):
+        read_handoff(other)
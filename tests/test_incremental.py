@@ -0,0 +1,76 @@
+"""
+Tests for the incrementally maintained agreement state.
+"""
+
+import pandas as pd
+import pytest
+
+from medevac_interrater.analysis import (
+    calculate_agreement_by_class,
+    calculate_confidence_analysis,
+    calculate_question_level_metrics,
+)
+from medevac_interrater.incremental import AgreementState
+
+
+@pytest.fixture
+def long_df(make_long_df):
+    """Fifteen physicians rating six vignettes in three classes."""
+    return make_long_df(
+        15,
+        6,
+        seed=11,
+        n_classes=3,
+        first_id=100,
+        missing_confidence=[3, 40],
+        dropped=[7, 22, 23],
+    )
+
+
+def assert_matches_batch(state, df):
+    pd.testing.assert_frame_equal(
+        state.question_level_metrics(), calculate_question_level_metrics(df)
+    )
+    pd.testing.assert_frame_equal(
+        state.agreement_by_class(), calculate_agreement_by_class(df)
+    )
+    for result, expected in zip(
+        state.confidence_analysis(), calculate_confidence_analysis(df)
+    ):
+        pd.testing.assert_frame_equal(result, expected, check_dtype=False, atol=1e-12)
+
+
+def test_incremental_updates_match_batch(long_df):
+    state = AgreementState()
+    for _, chunk in long_df.groupby(long_df["physician_id"] % 4):
+        state.add_responses(chunk)
+    assert_matches_batch(state, long_df)
+
+    assert state.remove_physician(104) == 6
+    assert state.remove_physician(999) == 0
+    assert_matches_batch(state, long_df[long_df["physician_id"] != 104])
+
+
+def test_later_response_replaces_earlier(long_df):
+    state = AgreementState()
+    state.add_responses(long_df)
+    first = long_df.iloc[[0]].assign(decision="Remain", confidence=2.0)
+    state.add_responses(first)
+    assert state.n_responses == len(long_df)
+    assert_matches_batch(state, pd.concat([long_df.iloc[1:], first]))
+
+
+def test_persisted_state_only_adds_new_physicians(long_df, tmp_path):
+    path = tmp_path / "state.json"
+    old = long_df[long_df["physician_id"] < 110]
+    state = AgreementState.load_or_create(path)
+    state.add_responses(old)
+    state.save(path)
+
+    restored = AgreementState.load_or_create(path)
+    assert restored.physicians == set(old["physician_id"])
+    assert (
+        restored.add_responses(long_df, skip_known=True)
+        == (long_df["physician_id"] >= 110).sum()
+    )
+    assert_matches_batch(restored, long_df)
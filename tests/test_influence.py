@@ -0,0 +1,103 @@
+"""
+Tests for leave-one-rater-out influence.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from medevac_interrater.analysis import (
+    calculate_agreement_metrics,
+    calculate_confidence_analysis,
+    calculate_fleiss_kappa_batch,
+    calculate_percentage_agreement,
+)
+from medevac_interrater.influence import rater_influence
+
+
+def summary_row(summary, level, metric):
+    """The summary row of a one-unit statistic."""
+    rows = summary[(summary["level"] == level) & (summary["metric"] == metric)]
+    assert len(rows) == 1
+    return rows.iloc[0]
+
+
+@pytest.fixture
+def long_df(make_long_df):
+    """Eight physicians on six questions in two classes, with skipped answers."""
+    return make_long_df(
+        8,
+        6,
+        seed=11,
+        p=[0.2, 0.6, 0.2],
+        first_id=100,
+        missing_confidence=[5, 17],
+        dropped=[9, 30],
+    )
+
+
+def test_matches_dropping_each_physician(long_df):
+    influence, _ = rater_influence(long_df, chunk_size=3)
+    table = influence.set_index(["physician_id", "level", "unit", "metric"])[
+        "estimate_without"
+    ]
+
+    for physician in long_df["physician_id"].unique():
+        rest = long_df[long_df["physician_id"] != physician]
+        questions, classes = calculate_agreement_metrics(rest)
+        _, kappa, _ = calculate_fleiss_kappa_batch(rest)
+        by_decision, by_class = calculate_confidence_analysis(rest)
+        expected = {
+            (
+                "overall",
+                "overall",
+                "percentage_agreement",
+            ): calculate_percentage_agreement(rest),
+            ("overall", "overall", "fleiss_kappa"): kappa,
+            ("question", 2, "percentage_agreement"): questions.loc[
+                1, "percentage_agreement"
+            ],
+            ("class", "B", "fleiss_kappa"): classes.loc[1, "fleiss_kappa"],
+            ("class", "A", "mean_confidence"): by_class.loc[0, "mean_confidence"],
+            ("decision", "Remain", "mean_confidence"): by_decision.set_index(
+                "decision"
+            ).loc["Remain", "mean_confidence"],
+        }
+        for (level, unit, metric), value in expected.items():
+            assert table[(physician, level, unit, metric)] == pytest.approx(value)
+
+
+def test_influence_and_summary(long_df):
+    influence, summary = rater_influence(long_df)
+    n = long_df["physician_id"].nunique()
+
+    overall = summary_row(summary, "overall", "fleiss_kappa")
+    rows = influence[
+        (influence["level"] == "overall") & (influence["metric"] == "fleiss_kappa")
+    ]
+    assert len(rows) == n
+    assert rows["influence"].to_numpy() == pytest.approx(
+        (n - 1) * (overall["estimate"] - rows["estimate_without"].to_numpy())
+    )
+    assert overall["n_raters"] == n
+    assert (summary["jackknife_se"].dropna() >= 0).all()
+
+
+def test_jackknife_se_of_a_mean():
+    # With one rating per physician the jackknife SE of the mean is s / sqrt(n)
+    confidence = np.array([3.0, 7.0, 8.0, 5.0, 9.0])
+    df = pd.DataFrame(
+        {
+            "physician_id": np.arange(5),
+            "question": 1,
+            "decision": ["Medevac", "Medevac", "Remain", "Medevac", "Remain"],
+            "confidence": confidence,
+            "vignette_class": "A",
+        }
+    )
+    _, summary = rater_influence(df)
+    row = summary_row(summary, "overall", "mean_confidence")
+
+    assert row["estimate"] == pytest.approx(confidence.mean())
+    assert row["jackknife_se"] == pytest.approx(confidence.std(ddof=1) / np.sqrt(5))
+    assert row["jackknife_bias"] == pytest.approx(0.0)
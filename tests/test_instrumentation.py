@@ -0,0 +1,70 @@
+"""
+Tests for the per-stage instrumentation.
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+
+from medevac_interrater import instrumentation
+from medevac_interrater.analysis import calculate_agreement_metrics
+from medevac_interrater.instrumentation import span, summarize, traced, tracing
+
+
+def long_df():
+    return pd.DataFrame(
+        {
+            "physician_id": [1, 2, 3, 1, 2, 3],
+            "question": [1, 1, 1, 2, 2, 2],
+            "decision": ["Medevac", "Medevac", "Remain", "Remain", "Remain", "Remain"],
+            "question_type": "Any Option",
+            "vignette_class": "C",
+        }
+    )
+
+
+def test_spans_nest_and_count_rows(tmp_path):
+    path = tmp_path / "trace.json"
+    with tracing(path) as trace:
+        with span("stage", note="x"):
+            calculate_agreement_metrics(long_df())
+
+    names = [(record.name, record.depth) for record in trace.spans]
+    assert names == [
+        ("stage", 0),
+        ("analysis.calculate_agreement_metrics", 1),
+        ("analysis.build_count_matrix", 2),
+    ]
+    metrics_span = trace.spans[1]
+    assert (metrics_span.rows_in, metrics_span.rows_out) == (6, 2)
+    assert metrics_span.parent == 0
+    assert trace.spans[0].attributes == {"note": "x"}
+    assert all(record.wall_seconds >= 0 for record in trace.spans)
+
+    saved = json.loads(path.read_text())
+    assert [s["name"] for s in saved["spans"]] == [name for name, _ in names]
+    assert list(summarize(trace)["calls"]) == [1, 1, 1]
+
+
+def test_disabled_tracing_records_nothing():
+    assert instrumentation.active_trace() is None
+    with span("stage"):
+        calculate_agreement_metrics(long_df())
+    assert instrumentation.active_trace() is None
+
+
+def test_memory_peaks_include_children():
+    @traced
+    def allocate(n):
+        return np.ones(n).sum()
+
+    with tracing(trace_memory=True) as trace:
+        with span("outer"):
+            allocate(1_000_000)
+            allocate(10)
+
+    outer, big, small = trace.spans
+    assert big.peak_traced_bytes >= 8_000_000
+    assert small.peak_traced_bytes < 1_000_000
+    assert outer.peak_traced_bytes >= big.peak_traced_bytes
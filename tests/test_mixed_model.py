@@ -0,0 +1,216 @@
+"""
+Tests for the crossed random-intercept medevac propensity model.
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from medevac_interrater.mixed_model import (
+    FIXED_EFFECTS,
+    bootstrap_variance_components,
+    design_matrix,
+    fit_crossed_logit,
+    fit_medevac_model,
+    prepare_model_data,
+    variance_component_summary,
+)
+
+
+def simulate(n_physicians, n_vignettes, beta, sigma, seed):
+    """Responses from a crossed random-intercept logistic model."""
+    rng = np.random.default_rng(seed)
+    physician = np.repeat(np.arange(n_physicians), n_vignettes)
+    vignette = np.tile(np.arange(n_vignettes), n_physicians)
+    X = pd.DataFrame(
+        {
+            "(Intercept)": 1.0,
+            "x": rng.normal(size=n_physicians * n_vignettes),
+        }
+    )
+    eta = (
+        X.to_numpy() @ beta
+        + sigma[0] * rng.normal(size=n_physicians)[physician]
+        + sigma[1] * rng.normal(size=n_vignettes)[vignette]
+    )
+    y = (rng.random(len(eta)) < 1 / (1 + np.exp(-eta))).astype(int)
+    return y, X, physician, vignette
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    """Covariate files and normative mapping for four physicians."""
+    pd.DataFrame(
+        {
+            "physician_id": [1, 2, 3, 4],
+            "training_year": [2000, 2010, 2015, 2020],
+            "years_experience": [25, 15, 10, 5],
+        }
+    ).to_csv(tmp_path / "physician_experience.csv", index=False)
+    pd.DataFrame(
+        {
+            "physician_id": [1, 2, 3, 4],
+            "practice_location": [
+                "Regional Hub",
+                "Referral Hub",
+                "Mixed",
+                "Referral Hub",
+            ],
+        }
+    ).to_csv(tmp_path / "practice_location.csv", index=False)
+    pd.DataFrame(
+        {
+            "physician_id": [1, 2, 3, 4],
+            "rural_experience": ["Yes", "Yes", "No", "No"],
+        }
+    ).to_csv(tmp_path / "rural_experience.csv", index=False)
+    pd.DataFrame(
+        {
+            "question": [1, 2, 3],
+            "question_type": ["Trauma", "Medical", "Medical"],
+            "medevac_status_label": [
+                "Always Medevac",
+                "Special Considerations",
+                "Never Medevac",
+            ],
+        }
+    ).to_csv(tmp_path / "medevac_normative_mapping_simplified.csv", index=False)
+    return tmp_path
+
+
+def test_recovers_simulated_parameters():
+    beta = np.array([-0.5, 1.0])
+    y, X, physician, vignette = simulate(150, 20, beta, (0.8, 1.2), seed=0)
+    fit = fit_crossed_logit(y, X, physician, vignette)
+
+    assert fit.converged
+    assert fit.coefficients.to_numpy() == pytest.approx(beta, abs=0.5)
+    assert fit.sigma_physician == pytest.approx(0.8, abs=0.25)
+    assert fit.sigma_vignette == pytest.approx(1.2, abs=0.6)
+    assert fit.physician_effects.shape == (150,)
+    assert fit.vignette_effects.shape == (20,)
+    assert fit.aic == pytest.approx(fit.deviance + 8)
+
+    table = fit.fixed_effects()
+    assert list(table["term"]) == ["(Intercept)", "x"]
+    assert (table["or_lower"] < table["odds_ratio"]).all()
+    assert (table["odds_ratio"] < table["or_upper"]).all()
+
+
+def test_warm_start_reaches_the_same_fit():
+    y, X, physician, vignette = simulate(
+        40, 10, np.array([0.0, 0.7]), (0.6, 1.0), seed=1
+    )
+    fit = fit_crossed_logit(y, X, physician, vignette)
+    restarted = fit_crossed_logit(
+        y,
+        X,
+        physician,
+        vignette,
+        start=(
+            fit.coefficients.to_numpy() + 0.1,
+            (fit.sigma_physician + 0.1, fit.sigma_vignette + 0.1),
+        ),
+    )
+
+    assert restarted.deviance == pytest.approx(fit.deviance, abs=1e-4)
+    assert restarted.sigma_vignette == pytest.approx(fit.sigma_vignette, abs=1e-2)
+
+
+def test_variance_component_summary():
+    summary = variance_component_summary(1.0, 2.0)
+    total = 3.0 + math.pi**2 / 3
+
+    assert summary["icc_physician"] == pytest.approx(1.0 / total)
+    assert summary["icc_vignette"] == pytest.approx(2.0 / total)
+    assert summary["mor_physician"] == pytest.approx(
+        math.exp(math.sqrt(2) * 0.6744897502)
+    )
+    assert variance_component_summary(0.0, 0.0)["mor_vignette"] == 1.0
+
+
+def test_prepare_model_data(data_dir):
+    long_df = pd.DataFrame(
+        {
+            "physician_id": np.repeat([1, 2, 3, 4], 3),
+            "question": np.tile([1, 2, 3], 4),
+            "decision": ["Medevac", "Remain", "Commercial"] * 3
+            + ["Medevac", "Medevac", None],
+            "confidence": [8, 6, 10, 5, 5, 5, 9, 7, 8, 4, 6, np.nan],
+        }
+    )
+    model_df = prepare_model_data(long_df, data_dir)
+
+    assert len(model_df) == 11
+    assert model_df["chose_medevac"].sum() == 5
+    assert list(model_df["vignette_type_collapsed"].cat.categories) == [
+        "Possible/Ambiguous",
+        "Never Medevac",
+        "Always Medevac",
+    ]
+    assert model_df.loc[1, "vignette_type_collapsed"] == "Possible/Ambiguous"
+    assert model_df.loc[0, "confidence_within"] == pytest.approx(0.0)
+    assert (
+        model_df.groupby("physician_id")["confidence_within"].sum().abs().max() < 1e-12
+    )
+    assert model_df["years_experience_centered"].mean() == pytest.approx(0.0)
+    assert list(model_df.drop_duplicates("physician_id")["rural_experience"]) == [
+        "Yes",
+        "No",
+        "Yes",
+        "No",
+    ]
+
+    survey = prepare_model_data(long_df, data_dir, rural_source="survey")
+    assert list(survey.drop_duplicates("physician_id")["rural_experience"]) == [
+        "Yes",
+        "Yes",
+        "No",
+        "No",
+    ]
+    assert list(design_matrix(model_df).columns) == FIXED_EFFECTS
+
+
+def test_fit_medevac_model(data_dir):
+    rng = np.random.default_rng(2)
+    n_physicians = 4
+    long_df = pd.DataFrame(
+        {
+            "physician_id": np.repeat(np.arange(1, n_physicians + 1), 30),
+            "question": np.tile(np.repeat([1, 2, 3], 10), n_physicians),
+            "decision": rng.choice(["Medevac", "Remain"], size=n_physicians * 30),
+            "confidence": rng.integers(1, 11, size=n_physicians * 30).astype(float),
+        }
+    )
+    fit = fit_medevac_model(prepare_model_data(long_df, data_dir))
+
+    assert list(fit.coefficients.index) == FIXED_EFFECTS
+    assert fit.n_obs == len(long_df)
+
+
+def test_bootstrap_variance_components():
+    y, X, physician, vignette = simulate(
+        30, 10, np.array([0.0, 0.5]), (0.7, 1.0), seed=4
+    )
+    fit = fit_crossed_logit(y, X, physician, vignette)
+    result = bootstrap_variance_components(fit, n_boot=12, seed=0, batch_size=5)
+
+    assert list(result["parameter"]) == [
+        "var_physician",
+        "var_vignette",
+        "icc_physician",
+        "icc_vignette",
+        "mor_physician",
+        "mor_vignette",
+    ]
+    assert (result["ci_lower"] <= result["ci_upper"]).all()
+    assert (result["n_valid"] > 0).all()
+    estimates = result.set_index("parameter")["estimate"]
+    assert estimates["var_vignette"] == pytest.approx(fit.sigma_vignette**2)
+
+    parallel = bootstrap_variance_components(
+        fit, n_boot=12, seed=0, batch_size=5, n_jobs=2
+    )
+    pd.testing.assert_frame_equal(result, parallel)
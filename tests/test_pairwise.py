@@ -0,0 +1,102 @@
+"""
+Tests for the pairwise rater matrices and rater clustering.
+"""
+
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from medevac_interrater.analysis import calculate_percentage_agreement
+from medevac_interrater.pairwise import cluster_raters, pairwise_rater_matrices
+
+DECISIONS = ["Commercial", "Medevac", "Remain"]
+
+
+@pytest.fixture
+def long_df(make_long_df):
+    """Seven physicians on eight questions in two classes, with skipped answers."""
+    return make_long_df(
+        7, 8, seed=4, p=[0.2, 0.5, 0.3], first_id=10, dropped=[3, 12, 13, 40]
+    )
+
+
+def cohens_kappa(x, y):
+    """Cohen's Kappa of two aligned decision arrays."""
+    observed = np.mean(x == y)
+    chance = sum(np.mean(x == c) * np.mean(y == c) for c in DECISIONS)
+    return (observed - chance) / (1 - chance) if chance < 1 else np.nan
+
+
+def test_matches_pair_loop(long_df):
+    matrices = pairwise_rater_matrices(long_df)
+    wide = long_df.pivot(index="physician_id", columns="question", values="decision")
+    classes = long_df.drop_duplicates("question").set_index("question")[
+        "vignette_class"
+    ]
+
+    for unit in ["overall", "A", "B"]:
+        columns = wide.columns if unit == "overall" else classes.index[classes == unit]
+        for p1, p2 in combinations(wide.index, 2):
+            pair = wide.loc[[p1, p2], columns].dropna(axis=1)
+            x, y = pair.loc[p1].to_numpy(), pair.loc[p2].to_numpy()
+            assert matrices[(unit, "n_shared")].loc[p1, p2] == len(x)
+            assert matrices[(unit, "percentage_agreement")].loc[
+                p2, p1
+            ] == pytest.approx(np.mean(x == y))
+            assert matrices[(unit, "cohens_kappa")].loc[p1, p2] == pytest.approx(
+                cohens_kappa(x, y), nan_ok=True
+            )
+
+
+def test_pools_to_overall_agreement(long_df):
+    matrices = pairwise_rater_matrices(long_df, by_class=False)
+    agreement = matrices[("overall", "percentage_agreement")].to_numpy()
+    n_shared = matrices[("overall", "n_shared")].to_numpy()
+    upper = np.triu_indices(len(agreement), 1)
+
+    assert {unit for unit, _ in matrices} == {"overall"}
+    assert (agreement * n_shared)[upper].sum() / n_shared[upper].sum() == pytest.approx(
+        calculate_percentage_agreement(long_df)
+    )
+    assert np.diag(agreement) == pytest.approx(1.0)
+
+
+def test_cluster_raters_finds_blocs():
+    pytest.importorskip("scipy")
+    # Two blocs that answer every question differently from each other
+    rng = np.random.default_rng(0)
+    n_questions = 12
+    first = rng.integers(len(DECISIONS), size=n_questions)
+    blocs = {0: np.array(DECISIONS)[first], 1: np.array(DECISIONS)[(first + 1) % 3]}
+    rows = []
+    for physician in range(8):
+        decisions = blocs[physician % 2].copy()
+        decisions[rng.integers(n_questions)] = "Commercial"
+        rows.append(
+            pd.DataFrame(
+                {
+                    "physician_id": physician,
+                    "question": np.arange(1, n_questions + 1),
+                    "decision": decisions,
+                }
+            )
+        )
+    df = pd.concat(rows, ignore_index=True)
+
+    matrix = pairwise_rater_matrices(df, by_class=False)[
+        ("overall", "percentage_agreement")
+    ]
+    clusters, linkage = cluster_raters(matrix, n_clusters=2)
+
+    assert linkage.shape == (7, 4)
+    assert (
+        clusters.groupby(clusters["physician_id"] % 2)["cluster"].nunique().eq(1).all()
+    )
+    assert clusters["cluster"].nunique() == 2
+    assert sorted(clusters["leaf_order"]) == list(range(8))
+    with pytest.raises(ValueError):
+        cluster_raters(matrix)
+    with pytest.raises(ValueError):
+        cluster_raters(matrix.iloc[:, :-1], n_clusters=2)
@@ -0,0 +1,80 @@
+"""
+Tests for the between-class permutation test.
+"""
+
+from itertools import permutations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from medevac_interrater.analysis import calculate_agreement_by_class
+from medevac_interrater.permutation import (
+    count_distinct_assignments,
+    permutation_test_by_class,
+)
+
+
+@pytest.fixture
+def long_df():
+    """Ten physicians rating six vignettes, three per class."""
+    rng = np.random.default_rng(11)
+    probabilities = [[0.9, 0.05, 0.05]] * 3 + [[0.4, 0.3, 0.3]] * 3
+    rows = []
+    for q_idx, p in enumerate(probabilities):
+        decisions = rng.choice(["Medevac", "Commercial", "Remain"], size=10, p=p)
+        for physician, decision in enumerate(decisions):
+            rows.append((physician, q_idx + 1, decision, "A" if q_idx < 3 else "B"))
+    return pd.DataFrame(
+        rows, columns=["physician_id", "question", "decision", "vignette_class"]
+    )
+
+
+def test_count_distinct_assignments():
+    assert count_distinct_assignments(np.array([0, 0, 0, 1, 1, 1])) == 20
+    assert count_distinct_assignments(np.array([0, 0, 1, 2])) == 12
+
+
+def test_exact_test_matches_brute_force(long_df):
+    result = permutation_test_by_class(long_df).set_index(["metric", "comparison"])
+    row = result.loc[("mean_percentage_agreement", "A vs B")]
+    assert row["exact"]
+    assert row["n_permutations"] == 20
+
+    # Brute force: relabel the questions and recompute the class table
+    observed = calculate_agreement_by_class(long_df).set_index("vignette_class")
+    observed_diff = abs(
+        observed.loc["A", "mean_percentage_agreement"]
+        - observed.loc["B", "mean_percentage_agreement"]
+    )
+    assert row["observed"] == pytest.approx(observed_diff)
+
+    labelings = set(permutations("AAABBB"))
+    exceed = 0
+    for labels in labelings:
+        relabeled = long_df.assign(
+            vignette_class=long_df["question"].map(dict(zip(range(1, 7), labels)))
+        )
+        metrics = calculate_agreement_by_class(relabeled).set_index("vignette_class")
+        diff = abs(
+            metrics.loc["A", "mean_percentage_agreement"]
+            - metrics.loc["B", "mean_percentage_agreement"]
+        )
+        exceed += diff >= observed_diff - 1e-12
+    assert row["p_value"] == pytest.approx(exceed / len(labelings))
+
+
+def test_monte_carlo_test(long_df):
+    result = permutation_test_by_class(
+        long_df, n_permutations=500, max_exact=10, chunk_size=64, seed=0
+    )
+    assert not result["exact"].any()
+    assert (result["n_permutations"] == 500).all()
+    assert result["p_value"].between(1 / 501, 1).all()
+    assert set(result["comparison"]) == {"A vs B", "omnibus"}
+
+    # Chunking only bounds memory; it does not change the relabelings drawn
+    rechunked = permutation_test_by_class(
+        long_df, n_permutations=500, max_exact=10, chunk_size=128, seed=0
+    )
+    pd.testing.assert_frame_equal(result, rechunked)
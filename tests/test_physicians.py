@@ -0,0 +1,127 @@
+"""
+Tests for the physician dimension.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from medevac_interrater.physicians import PhysicianDimension
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    """Covariate files for six physicians; IDs 6 and 3 have gaps and repeats."""
+    pd.DataFrame(
+        {
+            "physician_id": [1, 2, 3, 4, 5, 6],
+            "training_year": [2000, 2005, 2010, 2015, 2020, 2022],
+            "years_experience": [25, 20, 15, 10, 5, 3],
+        }
+    ).to_csv(tmp_path / "physician_experience.csv", index=False)
+    pd.DataFrame(
+        {
+            "physician_id": [1, 2, 3, 3, 4, 5],
+            "practice_location": [
+                "Regional Hub",
+                "Referral Hub",
+                "Mixed",
+                "Referral Hub",
+                "Referral Hub",
+                "Mixed",
+            ],
+        }
+    ).to_csv(tmp_path / "practice_location.csv", index=False)
+    pd.DataFrame(
+        {
+            "physician_id": [1, 2, 3, 4, 5, 6],
+            "rural_experience": ["Yes", "Yes", "No", "No", "Yes", "No"],
+        }
+    ).to_csv(tmp_path / "rural_experience.csv", index=False)
+    return tmp_path
+
+
+@pytest.fixture
+def physicians(data_dir):
+    with pytest.warns(UserWarning, match="inconsistent IDs"):
+        return PhysicianDimension.from_files(data_dir)
+
+
+def test_typed_table(physicians):
+    table = physicians.table
+
+    assert list(table.index) == [1, 2, 3, 4, 5, 6]
+    assert table["training_year"].dtype == "Int64"
+    assert table["years_experience"].dtype == np.float64
+    assert list(table["rural_experience"].cat.categories) == ["No", "Yes"]
+    # The first row of a repeated ID is kept
+    assert table.loc[3, "practice_location"] == "Mixed"
+    assert list(table["rural_by_location"].astype(object).fillna("-")) == [
+        "Yes",
+        "No",
+        "Yes",
+        "No",
+        "Yes",
+        "-",
+    ]
+    assert (
+        list(table["experience_tertile"]) == ["High"] * 2 + ["Medium"] * 2 + ["Low"] * 2
+    )
+
+
+def test_issues(physicians, data_dir):
+    issues = physicians.issues.sort_values("issue").reset_index(drop=True)
+
+    assert list(issues["issue"]) == ["duplicate", "missing"]
+    assert list(issues["physician_id"]) == [3, 6]
+    assert set(issues["source"]) == {"practice_location.csv"}
+    with pytest.raises(ValueError, match="duplicate in practice_location.csv: \\[3\\]"):
+        PhysicianDimension.from_files(data_dir, strict=True)
+
+
+def test_join_matches_merge(physicians):
+    long_df = pd.DataFrame(
+        {
+            "physician_id": [5, 1, 1, 7, 3, 6],
+            "question": [1, 1, 2, 1, 1, 2],
+        },
+        index=[10, 11, 12, 13, 14, 15],
+    )
+    with pytest.warns(UserWarning, match="No covariates for 1 physicians: 7"):
+        joined = physicians.join(long_df)
+
+    merged = long_df.merge(
+        physicians.table, left_on="physician_id", right_index=True, how="left"
+    )
+    pd.testing.assert_frame_equal(joined, merged)
+    assert (
+        joined["experience_tertile"].dtype
+        == physicians.table["experience_tertile"].dtype
+    )
+    assert list(physicians.positions([6, 1, 8])) == [5, 0, -1]
+
+
+def test_select(physicians):
+    assert list(physicians.select(rural_experience="Yes")) == [1, 2, 5]
+    assert list(
+        physicians.select(rural_experience="Yes", experience_tertile="High")
+    ) == [1, 2]
+    assert list(physicians.select(practice_location=["Mixed", "Regional Hub"])) == [
+        1,
+        3,
+        5,
+    ]
+    with pytest.raises(ValueError):
+        physicians.select(specialty="ER")
+
+
+def test_missing_files(tmp_path):
+    physicians = PhysicianDimension.from_files(tmp_path)
+
+    assert len(physicians) == 0
+    assert physicians.issues.empty
+    with pytest.warns(UserWarning):
+        joined = physicians.join(
+            pd.DataFrame({"physician_id": [1, 2]}), ["years_experience"]
+        )
+    assert joined["years_experience"].isna().all()
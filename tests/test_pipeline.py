@@ -0,0 +1,174 @@
+"""
+Tests for the content-hashed pipeline runner.
+"""
+
+import threading
+from pathlib import Path
+
+import pytest
+
+from medevac_interrater.pipeline import Pipeline, Stage, command_stage, default_stages
+
+
+def copy_stage(name, source, target, calls, transform=str.upper):
+    """A stage writing a transformed copy of a file and counting its runs."""
+
+    def run(root):
+        calls.append(name)
+        (root / target).write_text(transform((root / source).read_text()))
+
+    return Stage(name, [Path(source)], [Path(target)], run)
+
+
+@pytest.fixture
+def root(tmp_path):
+    (tmp_path / "a.txt").write_text("a")
+    (tmp_path / "b.txt").write_text("b")
+    return tmp_path
+
+
+def chain(calls):
+    """a.txt → upper.txt → twice.txt, and an independent b.txt → b_upper.txt."""
+    return [
+        copy_stage("upper", "a.txt", "upper.txt", calls),
+        copy_stage("twice", "upper.txt", "twice.txt", calls, lambda s: s * 2),
+        copy_stage("other", "b.txt", "b_upper.txt", calls),
+    ]
+
+
+def test_reruns_only_stale_stages(root):
+    calls = []
+    pipeline = Pipeline(chain(calls), root=root)
+
+    first = pipeline.run(jobs=1)
+    assert list(first["status"]) == ["ran"] * 3
+    assert (root / "twice.txt").read_text() == "AA"
+
+    calls.clear()
+    assert list(pipeline.run(jobs=1)["status"]) == ["fresh"] * 3
+    assert calls == []
+
+    (root / "a.txt").write_text("c")
+    assert pipeline.plan() == ["upper", "twice"]
+    pipeline.run(jobs=1)
+    assert sorted(calls) == ["twice", "upper"]
+    assert (root / "twice.txt").read_text() == "CC"
+
+
+def test_unchanged_contents_are_fresh(root):
+    calls = []
+    pipeline = Pipeline(chain(calls), root=root)
+    pipeline.run(jobs=1)
+    calls.clear()
+
+    # A new modification time with the same contents is not a change
+    (root / "a.txt").write_text("a")
+    assert pipeline.plan() == []
+
+    # Editing an output reruns the stage that writes it
+    (root / "upper.txt").write_text("edited")
+    assert pipeline.plan() == ["upper", "twice"]
+
+
+def test_version_and_targets(root):
+    calls = []
+    pipeline = Pipeline(chain(calls), root=root)
+    pipeline.run(["twice"], jobs=1)
+    assert sorted(calls) == ["twice", "upper"]
+    assert not (root / "b_upper.txt").exists()
+
+    stages = chain(calls)
+    stages[0] = Stage(
+        "upper", [Path("a.txt")], [Path("upper.txt")], stages[0].action, version="2"
+    )
+    assert Pipeline(stages, root=root).plan(["twice"]) == ["upper", "twice"]
+
+
+def test_independent_stages_run_concurrently(root):
+    barrier = threading.Barrier(2, timeout=5)
+
+    def waiting(target):
+        def run(root):
+            barrier.wait()
+            (root / target).write_text("done")
+
+        return run
+
+    stages = [
+        Stage("left", [Path("a.txt")], [Path("left.txt")], waiting("left.txt")),
+        Stage("right", [Path("b.txt")], [Path("right.txt")], waiting("right.txt")),
+    ]
+    result = Pipeline(stages, root=root).run(jobs=2)
+    assert list(result["status"]) == ["ran", "ran"]
+
+
+def test_failures_skip_downstream_stages(root):
+    calls = []
+
+    def fail(root):
+        raise RuntimeError("boom")
+
+    stages = chain(calls)
+    stages[0] = Stage("upper", [Path("a.txt")], [Path("upper.txt")], fail)
+    stages.append(
+        Stage("silent", [Path("a.txt")], [Path("never.txt")], lambda root: None)
+    )
+    result = Pipeline(stages, root=root).run(jobs=1).set_index("stage")
+
+    assert result.loc["upper", "status"] == "failed"
+    assert "boom" in result.loc["upper", "error"]
+    assert result.loc["twice", "status"] == "skipped"
+    assert result.loc["other", "status"] == "ran"
+    assert result.loc["silent", "status"] == "failed"
+    assert "never.txt" in result.loc["silent", "error"]
+
+
+def test_missing_input_and_command(root):
+    stages = [
+        command_stage(
+            "missing-program",
+            ["medevac-irr-no-such-program"],
+            [Path("a.txt")],
+            [Path("out.txt")],
+        ),
+        copy_stage("missing-input", "nope.txt", "out2.txt", []),
+    ]
+    result = Pipeline(stages, root=root).run(jobs=1).set_index("stage")
+
+    assert result.loc["missing-program", "error"].startswith("FileNotFoundError")
+    assert "nope.txt" in result.loc["missing-input", "error"]
+
+
+def test_invalid_pipelines(root):
+    calls = []
+    with pytest.raises(ValueError, match="unique"):
+        Pipeline(chain(calls) + chain(calls), root=root)
+    with pytest.raises(ValueError, match="written by both"):
+        Pipeline(
+            [
+                copy_stage("x", "a.txt", "o.txt", calls),
+                copy_stage("y", "b.txt", "o.txt", calls),
+            ],
+            root=root,
+        )
+    with pytest.raises(ValueError, match="cycle"):
+        Pipeline(
+            [
+                copy_stage("x", "p.txt", "q.txt", calls),
+                copy_stage("y", "q.txt", "p.txt", calls),
+            ],
+            root=root,
+        )
+    with pytest.raises(ValueError, match="Unknown"):
+        Pipeline(chain(calls), root=root).plan(["nope"])
+
+
+def test_default_stages():
+    pipeline = Pipeline(default_stages(engine="r", reports=["final_report2"]))
+
+    assert pipeline.order[:2] == ["process", "metrics"]
+    assert pipeline.dependencies["model"] == {"process"}
+    # Reports recompute metrics and refit the model from the processed data
+    assert pipeline.dependencies["report:final_report2"] == {"process"}
+    with pytest.raises(ValueError):
+        default_stages(engine="stata")
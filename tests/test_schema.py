@@ -0,0 +1,64 @@
+"""
+Tests for survey schema inference.
+"""
+
+import numpy as np
+import pandas as pd
+
+from medevac_interrater.schema import (
+    SurveySchema,
+    infer_schema,
+    load_survey_schema,
+    schema_path,
+)
+
+CONFIDENCE = "How confident are you of this decision (10 being very confident, and 1 being not confident at all)"
+
+
+def _export():
+    """Wide export whose second section repeats question 1."""
+    return pd.DataFrame(
+        {
+            "Record ID": [1, 2, 3],
+            "Question 1: first section": [np.nan, "Remain", np.nan],
+            CONFIDENCE: [np.nan, 5, np.nan],
+            "Question 2: only once": ["Remain", "Remain", "Remain"],
+            "Complete?": ["Yes", "Yes", "Yes"],
+            "Question 1: second section": ["Remain", "Remain", "Remain"],
+            CONFIDENCE + ".1": [9, 8, 7],
+        }
+    )
+
+
+def test_infer_schema_single_pass():
+    df = _export()
+    schema = infer_schema(df.columns)
+
+    assert schema.id_column == "Record ID"
+    assert schema.questions == [1, 2]
+    assert len(schema.candidates[1]) == 2
+    assert infer_schema(list(df.columns)) is schema
+
+    decision_cols, confidence_cols = schema.resolve(df)
+    assert decision_cols == {
+        1: "Question 1: second section",
+        2: "Question 2: only once",
+    }
+    assert confidence_cols == {1: CONFIDENCE + ".1"}
+
+    first_cols, _ = schema.resolve()
+    assert first_cols[1] == "Question 1: first section"
+
+
+def test_schema_saved_next_to_csv(tmp_path):
+    df = _export()
+    csv_path = tmp_path / "survey_results.csv"
+
+    schema = load_survey_schema(csv_path, df.columns, save=True)
+    assert schema_path(csv_path) == tmp_path / "survey_results.schema.json"
+    assert SurveySchema.load(schema_path(csv_path)) == schema
+
+    # A different header invalidates the saved schema
+    other = load_survey_schema(csv_path, list(df.columns[:4]), save=True)
+    assert other.header_hash != schema.header_hash
+    assert SurveySchema.load(schema_path(csv_path)) == other
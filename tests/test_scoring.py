@@ -0,0 +1,203 @@
+"""
+Tests for normative accuracy scoring.
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from medevac_interrater.analysis import build_rating_matrix
+from medevac_interrater.physicians import PhysicianDimension
+from medevac_interrater.scoring import (
+    CORRECT,
+    OTHER_ERROR,
+    OVER_TRIAGE,
+    UNDER_TRIAGE,
+    UNSCORED,
+    NormativeKey,
+    accuracy_rates,
+    calculate_normative_accuracy,
+    load_normative_mapping,
+    score_counts,
+    score_outcomes,
+    score_responses,
+)
+
+DATA_DIR = Path(__file__).resolve().parents[1] / "data"
+
+
+@pytest.fixture
+def mapping():
+    """Four questions: clear medevac, clear remain, conflict, any option."""
+    return pd.DataFrame(
+        {
+            "question": [1, 2, 3, 4],
+            "question_type": [
+                "Clear Medevac",
+                "Clear Remain",
+                "Conflict Between Physiology/Logistics",
+                "Any Option",
+            ],
+            "medevac_normative_status": [
+                "medevac_only_correct",
+                "medevac_one_of_two_wrong",
+                "medevac_or_remain",
+                "ambiguous_all_plausible",
+            ],
+            "medevac_status_label": [
+                "Always Medevac",
+                "Possible Medevac",
+                "Special Considerations",
+                "Possible Medevac",
+            ],
+        }
+    )
+
+
+@pytest.fixture
+def long_df():
+    """Three physicians; physician 3 skipped question 4."""
+    return pd.DataFrame(
+        {
+            "physician_id": [1, 1, 1, 1, 2, 2, 2, 2, 3, 3, 3],
+            "question": [1, 2, 3, 4] * 2 + [1, 2, 3],
+            "decision": [
+                "Medevac",
+                "Remain",
+                "Remain",
+                "Medevac",
+                "Remain",
+                "Medevac",
+                "Commercial",
+                "Remain",
+                "Commercial",
+                "Commercial",
+                "Medevac",
+            ],
+        }
+    )
+
+
+def test_outcome_table(mapping):
+    key = NormativeKey.from_mapping(mapping)
+    outcomes = pd.DataFrame(key.outcomes, index=key.questions, columns=key.decisions)
+
+    assert list(key.decisions) == ["Commercial", "Medevac", "Remain"]
+    assert list(outcomes.loc[1]) == [UNDER_TRIAGE, CORRECT, UNDER_TRIAGE]
+    assert list(outcomes.loc[2]) == [OVER_TRIAGE, OVER_TRIAGE, CORRECT]
+    assert list(outcomes.loc[3]) == [OTHER_ERROR, CORRECT, CORRECT]
+    assert list(outcomes.loc[4]) == [UNSCORED] * 3
+
+
+def test_load_normative_mapping(tmp_path):
+    full = load_normative_mapping(DATA_DIR, "full")
+    simplified = load_normative_mapping(DATA_DIR, "simplified")
+
+    assert len(full) == len(simplified) == 20
+    assert full["medevac_status_label"].nunique() == 5
+    assert simplified["medevac_status_label"].nunique() == 4
+    with pytest.raises(ValueError):
+        load_normative_mapping(DATA_DIR, "detailed")
+
+    bad = full.copy()
+    bad.loc[0, "medevac_normative_status"] = "medevac_only_wrong"
+    bad.to_csv(tmp_path / "medevac_normative_mapping.csv", index=False)
+    with pytest.raises(ValueError, match="contradicts"):
+        load_normative_mapping(tmp_path, "full")
+
+
+def test_score_responses(long_df, mapping):
+    scored = score_responses(long_df, mapping)
+
+    assert list(scored["outcome"]) == [
+        "correct",
+        "correct",
+        "correct",
+        "unscored",
+        "under_triage",
+        "over_triage",
+        "other_error",
+        "unscored",
+        "under_triage",
+        "over_triage",
+        "correct",
+    ]
+    assert scored["correct"].isna().sum() == 2
+    assert scored["correct"].sum() == 4
+    assert scored.loc[0, "medevac_status_label"] == "Always Medevac"
+    with pytest.raises(ValueError, match="not in the normative mapping"):
+        score_responses(long_df.assign(question=long_df["question"] + 10), mapping)
+
+
+def test_calculate_normative_accuracy(long_df, mapping, tmp_path):
+    pd.DataFrame(
+        {
+            "physician_id": [1, 2, 3],
+            "training_year": [2005, 2015, 2020],
+            "years_experience": [20, 10, 5],
+        }
+    ).to_csv(tmp_path / "physician_experience.csv", index=False)
+    pd.DataFrame(
+        {
+            "physician_id": [1, 2, 3],
+            "rural_experience": ["Yes", "No", "Yes"],
+        }
+    ).to_csv(tmp_path / "rural_experience.csv", index=False)
+    physicians = PhysicianDimension.from_files(tmp_path)
+
+    by_physician, by_class, by_covariate = calculate_normative_accuracy(
+        long_df, mapping, physicians, covariates=["rural_experience"]
+    )
+
+    assert list(by_physician["n_scored"]) == [3, 3, 3]
+    assert list(by_physician["accuracy"]) == pytest.approx([1, 0, 1 / 3])
+    assert list(by_physician["over_triage_rate"]) == pytest.approx([0, 1 / 3, 1 / 3])
+    assert list(by_physician["under_triage_rate"]) == pytest.approx([0, 1 / 3, 1 / 3])
+
+    by_class = by_class.set_index("unit")
+    assert by_class.loc["Always Medevac", "accuracy"] == pytest.approx(1 / 3)
+    assert by_class.loc["Possible Medevac", "n_scored"] == 3
+    assert by_class.loc["overall", "accuracy"] == pytest.approx(4 / 9)
+
+    assert list(by_covariate["value"]) == ["No", "Yes"]
+    assert list(by_covariate["n_physicians"]) == [1, 2]
+    assert list(by_covariate["accuracy"]) == pytest.approx([0, 4 / 6])
+
+    _, _, empty = calculate_normative_accuracy(long_df, mapping)
+    assert empty.empty
+
+
+def test_mappings_agree_on_scores():
+    long_df = pd.read_csv(DATA_DIR / "processed" / "survey_data_processed.csv")
+    full = score_responses(long_df, load_normative_mapping(DATA_DIR, "full"))
+    simplified = score_responses(
+        long_df, load_normative_mapping(DATA_DIR, "simplified")
+    )
+
+    # The mappings differ only in how questions are labelled
+    assert (full["outcome"] == simplified["outcome"]).all()
+
+
+def test_resampled_counts_match_recomputation(long_df, mapping):
+    key = NormativeKey.from_mapping(mapping)
+    codes, _, questions, _ = build_rating_matrix(long_df, categories=key.decisions)
+    rows = key.rows(questions)
+    counts = score_counts(
+        score_outcomes(codes, rows, key), key.label_codes[rows], len(key.labels)
+    )
+
+    # Physician 1 drawn twice and physician 3 once
+    draws = np.array([[2.0, 0.0, 1.0]])
+    rates = accuracy_rates(np.tensordot(draws, counts.sum(axis=1), axes=1))
+
+    resampled = pd.concat(
+        [
+            long_df[long_df["physician_id"] == 1],
+            long_df[long_df["physician_id"] == 1].assign(physician_id=4),
+            long_df[long_df["physician_id"] == 3],
+        ]
+    )
+    _, overall, _ = calculate_normative_accuracy(resampled, mapping)
+    assert rates["accuracy"][0] == pytest.approx(overall["accuracy"].iloc[-1])
@@ -0,0 +1,128 @@
+"""
+Tests for the Monte Carlo precision and power simulator.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from medevac_interrater.bootstrap import batch_agreement_statistics
+from medevac_interrater.simulation import (
+    population_statistics,
+    power_curve,
+    precision_curve,
+    simulate_studies,
+)
+
+
+def test_reproducible_across_workers():
+    kwargs = dict(n_physicians=[4, 8], n_studies=30, seed=5, batch_size=7)
+    serial = simulate_studies(**kwargs)
+    parallel = simulate_studies(n_jobs=2, **kwargs)
+
+    pd.testing.assert_frame_equal(serial, parallel)
+    assert len(serial) == 2 * 30 * (20 + 4 + 4 + 1 + 1)
+    assert set(serial["unit"][serial["level"] == "class"]) == {"A", "B", "C", "D"}
+
+
+def test_population_statistics_match_large_counts():
+    rng = np.random.default_rng(0)
+    probabilities = rng.dirichlet(np.ones(3), size=(2, 6))
+    class_codes = np.array([0, 0, 1, 1, 1, 0])
+    expected = population_statistics(probabilities, class_codes, 2)
+
+    observed = batch_agreement_statistics(probabilities * 1e7, class_codes, 2)
+    for key, values in expected.items():
+        assert observed[key] == pytest.approx(values, abs=1e-5)
+
+
+def test_precision_and_power_improve_with_raters():
+    studies = simulate_studies([5, 40], n_studies=200, accuracy=0.8, seed=2)
+    precision = precision_curve(studies, target_width=0.2)
+    overall = precision[
+        (precision["level"] == "overall") & (precision["metric"] == "fleiss_kappa")
+    ].set_index("n_physicians")
+
+    assert overall.loc[40, "mean_ci_width"] < overall.loc[5, "mean_ci_width"]
+    assert overall.loc[40, "prob_within_target"] > overall.loc[5, "prob_within_target"]
+    assert overall.loc[40, "coverage"] == pytest.approx(0.95, abs=0.05)
+    assert abs(overall.loc[40, "bias"]) < 0.02
+
+    power = power_curve(studies, null_value=0.3)
+    kappa = power[
+        (power["level"] == "overall") & (power["metric"] == "fleiss_kappa")
+    ].set_index("n_physicians")
+    assert kappa.loc[40, "power"] > kappa.loc[5, "power"]
+    assert kappa.loc[40, "power"] > 0.9
+
+
+def test_vignettes_per_class():
+    studies = simulate_studies(
+        [6], n_studies=20, vignettes_per_class={"C": 5, "A": 2}, seed=4
+    )
+    questions = studies[studies["level"] == "question"]
+
+    # Class A keeps its first two questions (1, 4), class C its three
+    # (3, 12, 20) plus 21 and 22; classes B and D keep the survey's
+    assert set(questions["unit"]) == {
+        1,
+        2,
+        3,
+        4,
+        5,
+        6,
+        7,
+        10,
+        12,
+        14,
+        16,
+        17,
+        18,
+        20,
+        21,
+        22,
+    }
+    assert (studies["n_vignettes"] == 16).all()
+
+    designs = pd.concat(
+        [
+            simulate_studies([10], n_studies=100, vignettes_per_class=n, seed=5)
+            for n in (3, 12)
+        ]
+    )
+    precision = precision_curve(designs)
+    kappa = precision[
+        (precision["unit"] == "overall") & (precision["metric"] == "fleiss_kappa")
+    ].set_index("n_vignettes")
+    assert list(kappa.index) == [12, 48]
+    assert kappa.loc[48, "empirical_se"] < kappa.loc[12, "empirical_se"]
+    assert set(power_curve(designs, 0.2)["n_vignettes"]) == {12, 48}
+
+    with pytest.raises(ValueError, match="at least one vignette"):
+        simulate_studies([5], vignettes_per_class={"D": 0})
+    with pytest.raises(ValueError, match="Unknown vignette classes"):
+        simulate_studies([5], vignettes_per_class={"E": 3})
+
+
+def test_class_accuracy_and_prevalence():
+    studies = simulate_studies(
+        [10],
+        n_studies=50,
+        prevalence={"Medevac": 1.0},
+        accuracy={"A": 1.0, "B": 0.5, "C": 0.5, "D": 0.5},
+        seed=3,
+    )
+    class_a = studies[
+        (studies["unit"] == "A") & (studies["metric"] == "mean_percentage_agreement")
+    ]
+    assert (class_a["estimate"] == 1.0).all()
+    # Every vignette in class A has the same true decision, so kappa is undefined
+    kappa_a = studies[(studies["unit"] == "A") & (studies["metric"] == "fleiss_kappa")]
+    assert kappa_a["estimate"].isna().all()
+
+    with pytest.raises(ValueError, match="No accuracy"):
+        simulate_studies([10], accuracy={"A": 0.9})
+    with pytest.raises(ValueError, match="Unknown decisions"):
+        simulate_studies([10], prevalence={"Helicopter": 1.0})
+    with pytest.raises(ValueError):
+        simulate_studies([1])